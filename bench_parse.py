@@ -0,0 +1,42 @@
+# bench_parse.py
+# Vergleicht die Parse-Zeit pro Spielerseite: BeautifulSoup (html.parser, ganze Seite)
+# gegen den lxml-Pfad, der nur #playerStatsTable parst. Prüft, dass beide dasselbe dict liefern.
+#   python bench_parse.py [--repeat 50] [fixtures/*.html]
+import glob
+import time
+import argparse
+
+from get_player_stats import parse_player_stats, parse_player_stats_bs4
+
+
+def time_per_page(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            parse(html, "0", "Fixture")
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: Parsen von playerStatsTable")
+    parser.add_argument("files", nargs="*", default=sorted(glob.glob("fixtures/player_stats_*.html")))
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    if not pages:
+        raise SystemExit("Keine Fixture-Seiten gefunden")
+
+    for path, html in zip(args.files, pages):
+        if parse_player_stats(html, "0", "Fixture") != parse_player_stats_bs4(html, "0", "Fixture"):
+            raise SystemExit(f"❌ Unterschiedliches Ergebnis für {path}")
+
+    slow = time_per_page(parse_player_stats_bs4, pages, args.repeat)
+    fast = time_per_page(parse_player_stats, pages, args.repeat)
+    print(f"{len(pages)} Seiten, je {args.repeat} Durchläufe – Ergebnisse identisch")
+    print(f"BeautifulSoup html.parser: {slow * 1000:8.3f} ms/Seite")
+    print(f"lxml (nur Tabelle):        {fast * 1000:8.3f} ms/Seite")
+    print(f"Faktor:                    {slow / fast:8.1f}x")
@@ -0,0 +1,225 @@
+# bench_simulate.py
+# Benchmark der Monte-Carlo-Engines (legs, batch, scalar, uncompiled) über mehrere Formate und
+# Spielstärke-Unterschiede: Matches/s, Legs/s und Spitzen-Speicher je Fall. Die Siegquoten
+# und 180er je Match werden gegen eine gespeicherte Baseline geprüft (z-Test), damit Änderungen an
+# simulate_player.py / simulate_match.py, die das Ergebnis verschieben, auffallen.
+# legs, batch und der Solver der Baseline lesen die Aufnahme-Tabellen aus simulate_batch, scalar
+# die daraus kompilierten Tabellen; nur uncompiled (MatchSimulator.play_match mit
+# SimulatedPlayer.throw_visit/attempt_checkout ohne Tabellen) prüft die Heuristik selbst.
+# Läuft offline mit festen Kunstspielern, Ausgabe zusätzlich als JSON.
+#   python bench_simulate.py [--quick] [--engines legs,batch,scalar,uncompiled] [--output bench_simulate.json]
+#   python bench_simulate.py --write-baseline   # Baseline aus dem exakten Solver neu schreiben
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from simulate_batch import empty_summary, play_matches_batch, play_matches_legs
+from simulate_match import MatchSimulator
+from simulate_parallel import play_matches_scalar
+from simulate_player import SimulatedPlayer
+from solve_match import match_probabilities
+
+BASELINE_PATH = "fixtures/bench_simulate_baseline.json"
+OUTPUT_PATH = "bench_simulate.json"
+
+# (Name, legs_to_win, sets_to_win)
+FORMATS = [("FT3 Legs", 3, None), ("FT6 Legs", 6, None), ("FT3 Sets à FT3 Legs", 3, 3)]
+# Unterschied im Average zwischen Spieler A (95, 40 % Checkout) und Spieler B
+SKILL_GAPS = [0, 5, 15]
+# Matches je Engine und Fall (--quick: ein Zehntel)
+MATCHES = {"legs": 50000, "batch": 20000, "scalar": 2000, "uncompiled": 2000}
+# |z| darüber gilt als Abweichung von der Baseline (bei 27 Fällen kaum Fehlalarme)
+Z_LIMIT = 4.0
+# Varianz der 180er je Match höchstens DISPERSION_180 * Mittelwert (gemessen: 1.5 bis 3.1)
+DISPERSION_180 = 4.0
+SEED = 2024
+
+
+def bench_players(gap):
+    a = SimulatedPlayer("A", 95.0, 40.0, stats={"p180_per_leg": 0.20})
+    b = SimulatedPlayer("B", 95.0 - gap, 40.0 - 0.6 * gap,
+                        stats={"p180_per_leg": max(0.02, 0.20 - 0.01 * gap)})
+    return a, b
+
+
+def case_id(format_name, gap):
+    return f"{format_name} / Gap {gap}"
+
+
+def play_matches_uncompiled(player1, player2, legs_to_win, n, sets_to_win=None):
+    """
+    n Matches mit MatchSimulator.play_match; die Spieler bleiben unkompiliert (tables None),
+    jede Aufnahme läuft durch SimulatedPlayer.throw_visit/attempt_checkout.
+    """
+    summary = empty_summary(player1.name, player2.name)
+    sim = MatchSimulator(player1, player2, legs_to_win=legs_to_win, sets_to_win=sets_to_win)
+    for _ in range(n):
+        winner, scoreline, history = sim.play_match()
+        summary["wins"][winner] += 1
+        summary["scorelines"][scoreline] += 1
+        summary["total_legs"] += len(history)
+        for _, _, _, leg_180s in history:
+            for name, count in leg_180s.items():
+                summary["total_180s"][name] += count
+        if sets_to_win is not None:
+            summary["total_sets"] += len(sim.set_scores)
+            summary["set_scorelines"].update(sim.set_scores)
+    summary["simulations"] = n
+    return summary
+
+
+def run_engine(engine, a, b, legs_to_win, sets_to_win, n, seed):
+    if engine in ("scalar", "uncompiled"):
+        # eigene Spieler mit eigenem Zufallsgenerator, wie in simulate_parallel._run_shard
+        rng = random.Random(seed)
+        a = SimulatedPlayer(a.name, a.avg, a.checkout_pct, a.form, a.max_checkout, {"p180_per_leg": a.p180}, rng)
+        b = SimulatedPlayer(b.name, b.avg, b.checkout_pct, b.form, b.max_checkout, {"p180_per_leg": b.p180}, rng)
+        if engine == "uncompiled":
+            return play_matches_uncompiled(a, b, legs_to_win, n, sets_to_win)
+        return play_matches_scalar(a, b, legs_to_win, n, sets_to_win)
+    play = play_matches_legs if engine == "legs" else play_matches_batch
+    return play(a, b, legs_to_win, n, rng=np.random.default_rng(seed), sets_to_win=sets_to_win)
+
+
+def z_score(p, n, p_base, n_base=None):
+    """Abstand zweier Siegquoten in Standardfehlern; n_base None = exakter Baseline-Wert."""
+    var = p_base * (1.0 - p_base) / n
+    if n_base:
+        var += p_base * (1.0 - p_base) / n_base
+    return (p - p_base) / math.sqrt(var) if var > 0 else 0.0
+
+
+def bench_case(engine, format_name, legs_to_win, sets_to_win, gap, n, baseline):
+    a, b = bench_players(gap)
+    # Aufwärmen: Tabellen-Caches (Aliastabellen, Leg-Verteilungen) sind danach gefüllt
+    run_engine(engine, a, b, legs_to_win, sets_to_win, max(1, n // 50), SEED + 1)
+
+    start = time.perf_counter()
+    summary = run_engine(engine, a, b, legs_to_win, sets_to_win, n, SEED)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    run_engine(engine, a, b, legs_to_win, sets_to_win, n, SEED)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    key = case_id(format_name, gap)
+    win_rate = summary["wins"]["A"] / n
+    result = {
+        "engine": engine,
+        "case": key,
+        "legs_to_win": legs_to_win,
+        "sets_to_win": sets_to_win,
+        "skill_gap": gap,
+        "matches": n,
+        "legs": summary["total_legs"],
+        "seconds": seconds,
+        "matches_per_sec": n / seconds,
+        "legs_per_sec": summary["total_legs"] / seconds,
+        "peak_memory_bytes": peak,
+        "win_rate": win_rate,
+        "legs_per_match": summary["total_legs"] / n,
+        "avg_180s": (summary["total_180s"]["A"] + summary["total_180s"]["B"]) / n,
+    }
+    if key in baseline:
+        base = baseline[key]
+        z = z_score(win_rate, n, base["win_rate"], base.get("matches"))
+        result.update(baseline_win_rate=base["win_rate"], z=z, equivalent=abs(z) <= Z_LIMIT)
+        if base.get("avg_180s"):
+            # die Sieganteile reagieren kaum auf Änderungen, die beide Spieler gleich treffen
+            # (z. B. TRY_CHECKOUT_PROB), die Zahl der Aufnahmen und damit der 180er schon
+            z180 = (result["avg_180s"] - base["avg_180s"]) / math.sqrt(base["avg_180s"] * DISPERSION_180 / n)
+            result.update(baseline_avg_180s=base["avg_180s"], z_180=z180,
+                          equivalent=result["equivalent"] and abs(z180) <= Z_LIMIT)
+    return result
+
+
+def write_baseline(path):
+    """Baseline-Siegquoten aus dem exakten Solver (A beginnt das Match, wie in den Engines)."""
+    baseline = {}
+    for format_name, legs_to_win, sets_to_win in FORMATS:
+        for gap in SKILL_GAPS:
+            a, b = bench_players(gap)
+            exact = match_probabilities(a, b, legs_to_win, sets_to_win)
+            baseline[case_id(format_name, gap)] = {
+                "win_rate": exact["wins"]["A"],
+                "legs_per_match": exact["expected_legs"],
+                "avg_180s": sum(exact["expected_180s"].values()),
+                "matches": None,
+            }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"source": "solve_match.match_probabilities", "cases": baseline}, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark: Monte-Carlo-Engines")
+    parser.add_argument("--engines", default="legs,batch,scalar,uncompiled")
+    parser.add_argument("--quick", action="store_true", help="ein Zehntel der Matches")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="JSON-Ergebnis ('-' = nur Konsole)")
+    args = parser.parse_args()
+
+    if args.write_baseline:
+        write_baseline(args.baseline)
+        print(f"✅ Baseline geschrieben: {args.baseline}")
+        sys.exit(0)
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["cases"]
+    except FileNotFoundError:
+        print(f"⚠️ Keine Baseline unter {args.baseline} – nur Zeiten")
+        baseline = {}
+
+    results = []
+    print(f"{'Engine':10} {'Fall':28} {'Matches/s':>11} {'Legs/s':>11} {'Peak MB':>8} {'Sieg A':>7} {'z':>6} {'z 180':>6}")
+    for engine in args.engines.split(","):
+        n = MATCHES[engine] // (10 if args.quick else 1)
+        for format_name, legs_to_win, sets_to_win in FORMATS:
+            for gap in SKILL_GAPS:
+                r = bench_case(engine, format_name, legs_to_win, sets_to_win, gap, n, baseline)
+                results.append(r)
+                flag = "" if r.get("equivalent", True) else " ❌"
+                print(f"{engine:10} {r['case']:28} {r['matches_per_sec']:11.0f} {r['legs_per_sec']:11.0f} "
+                      f"{r['peak_memory_bytes'] / 1e6:8.2f} {r['win_rate'] * 100:6.1f}% {r.get('z', float('nan')):6.2f} "
+                      f"{r.get('z_180', float('nan')):6.2f}{flag}")
+
+    failed = [r for r in results if not r.get("equivalent", True)]
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "z_limit": Z_LIMIT,
+        "results": results,
+        "failed": [f"{r['engine']}: {r['case']}" for r in failed],
+    }
+    if args.output != "-":
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Ergebnis: {args.output}")
+    if failed:
+        print(f"❌ {len(failed)} Fälle weichen von der Baseline ab (|z| > {Z_LIMIT})")
+        sys.exit(1)
+    print("✅ Siegquoten und 180er passen zur Baseline")
@@ -1,23 +1,51 @@
 import pandas as pd
 
+import diagnostics
+from normalize_stats import clean_numbers
+
+# Gewichte des Form-Scores je normalisierter Spalte
+FORM_WEIGHTS = {"Averages": 0.4, "Checkout Pcnt": 0.3, "Pcnt Legs Won": 0.2, "180's": 0.1}
+# Feste Skalen (Wert -> 0..10) für fixed_form: Spektrum der Datenbank mit Luft nach oben, damit
+# die Spitze nicht am Rand klebt (Höchstwerte zuletzt: Average 100.95, 983 180er)
+FORM_BOUNDS = {"Averages": (40.0, 115.0), "Checkout Pcnt": (0.0, 50.0), "Pcnt Legs Won": (0.0, 100.0),
+               "180's": (0.0, 1200.0)}
+
 def normalize(series, scale=10):
     """Min-Max Normalisierung auf 0–scale"""
     return (series - series.min()) / (series.max() - series.min()) * scale
 
+def fixed_form(df, bounds=FORM_BOUNDS, scale=10):
+    """
+    Form-Score mit denselben Gewichten wie add_form, aber auf festen Skalen (bounds, auf
+    0–scale beschnitten) statt Min/Max des ganzen Feldes: hängt nur von den eigenen Werten ab
+    und lässt sich daher je Spieler neu berechnen (snapshot_store). Fehlende Werte zählen 0.
+    """
+    score = 0.0
+    for col, weight in FORM_WEIGHTS.items():
+        low, high = bounds[col]
+        values = clean_numbers(df[col]) if col in df.columns else pd.Series(float("nan"), index=df.index)
+        score = score + weight * ((values - low) / (high - low) * scale).clip(0, scale).fillna(0.0)
+    return score
+
 def clean_number(s):
-    """Hilfsfunktion: Kommas und Prozentzeichen entfernen"""
+    """Hilfsfunktion: Kommas und Prozentzeichen entfernen (skalare Referenz zu normalize_stats.clean_numbers)"""
     if pd.isna(s):
         return None
     return str(s).replace(",", "").replace("%", "").strip()
 
-def calculate_form(input_csv="all_players_stats.csv", output_csv="all_players_with_form.csv"):
-    df = pd.read_csv(input_csv, sep=";")
+def add_form(df):
+    """Säubert die Kernspalten und ergänzt Normalisierungen und Form-Score (auf einer Kopie)."""
+    with diagnostics.timed("Form: berechnen"):
+        return _add_form(df)
+
+def _add_form(df):
+    df = df.copy()
 
     # Spalten säubern
-    df["Averages"] = pd.to_numeric(df["Averages"].apply(clean_number), errors="coerce")
-    df["Checkout Pcnt"] = pd.to_numeric(df["Checkout Pcnt"].apply(clean_number), errors="coerce")
-    df["Pcnt Legs Won"] = pd.to_numeric(df["Pcnt Legs Won"].apply(clean_number), errors="coerce")
-    df["180's"] = pd.to_numeric(df["180's"].apply(clean_number), errors="coerce")
+    df["Averages"] = clean_numbers(df["Averages"])
+    df["Checkout Pcnt"] = clean_numbers(df["Checkout Pcnt"])
+    df["Pcnt Legs Won"] = clean_numbers(df["Pcnt Legs Won"])
+    df["180's"] = clean_numbers(df["180's"])
 
     # Normalisierung
     df["AvgNorm"] = normalize(df["Averages"])
@@ -27,14 +55,22 @@ def calculate_form(input_csv="all_players_stats.csv", output_csv="all_players_wi
 
     # Gewichtete Summe → Form Score
     df["Form"] = (
-        0.4 * df["AvgNorm"] +
-        0.3 * df["CheckoutNorm"] +
-        0.2 * df["LegsNorm"] +
-        0.1 * df["180Norm"]
+        FORM_WEIGHTS["Averages"] * df["AvgNorm"] +
+        FORM_WEIGHTS["Checkout Pcnt"] * df["CheckoutNorm"] +
+        FORM_WEIGHTS["Pcnt Legs Won"] * df["LegsNorm"] +
+        FORM_WEIGHTS["180's"] * df["180Norm"]
     )
 
+    return df
+
+def calculate_form(input_csv="all_players_stats.csv", output_csv="all_players_with_form.csv"):
+    with diagnostics.timed("Form: CSV lesen"):
+        df = pd.read_csv(input_csv, sep=";")
+    df = add_form(df)
+
     # Speichern
-    df.to_csv(output_csv, sep=";", index=False, encoding="utf-8")
+    with diagnostics.timed("Form: CSV schreiben"):
+        df.to_csv(output_csv, sep=";", index=False, encoding="utf-8")
     print(f"✅ Form-Scores berechnet und gespeichert in {output_csv}")
     print(df[["Name", "Averages", "Checkout Pcnt", "Pcnt Legs Won", "180's", "Form"]].head())
 
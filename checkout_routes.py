@@ -0,0 +1,352 @@
+# checkout_routes.py
+"""
+Dart-für-Dart-Modell: statt einer Aufnahme als Ganzes wird jeder Dart auf ein Ziel geworfen
+und landet nach einer Trefferverteilung des Spielers in einem Feld.
+
+- Die Checkout-Tabelle (route_table) legt für jeden Rest 2..501 und 1-3 verbleibende Darts
+  das Ziel fest: Finish-Wege, Stellwürfe auf gute Doppel-Reste, sonst Scoring. Sie wird
+  einmal per dynamischer Programmierung für einen Referenzspieler berechnet.
+- Je Spieler gibt es Trefferverteilungen je Ziel (DartTables), geschätzt aus den
+  Scraper-Werten: Checkout Pcnt 1/2/3 Darter, Treble 20/19 Hit Pcnt, Stray Treble,
+  Bullseye Checkout Pcnt und First 9 Averages (dart_model_from_row).
+- build_visit_tables rechnet das Modell exakt in die Aufnahme-Tabellen von simulate_batch um;
+  Batch-, Leg- und Skalar-Engine und der exakte Solver laufen damit unverändert schnell.
+  throw_darts wirft eine Aufnahme Dart für Dart (Live-Modus), jeder Dart ein Tabellen-Lookup.
+
+    python checkout_routes.py 170 121 40   # Wege aus der Tabelle anzeigen
+"""
+import sys
+from bisect import bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from normalize_stats import to_number
+from simulate_batch import CHECKOUT, OUTCOMES, START_SCORE, VisitTables
+
+# Zahlen im Uhrzeigersinn ab der 20 (Nachbarfelder für Streuwürfe)
+BOARD = [20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5]
+NEIGHBOURS = {n: (BOARD[i - 1], BOARD[(i + 1) % 20]) for i, n in enumerate(BOARD)}
+
+# Felder: S1..S20, D1..D20, T1..T20, Single Bull, Bull, daneben; Ziele sind alle außer "daneben"
+SEGMENTS = ([f"S{n}" for n in range(1, 21)] + [f"D{n}" for n in range(1, 21)]
+            + [f"T{n}" for n in range(1, 21)] + ["25", "Bull", "0"])
+OUTER_BULL, BULL, MISS = 60, 61, 62
+TARGETS = len(SEGMENTS) - 1
+SEGMENT_POINTS = np.array([n for n in range(1, 21)] + [2 * n for n in range(1, 21)]
+                          + [3 * n for n in range(1, 21)] + [25, 50, 0])
+SEGMENT_DOUBLE = np.array([False] * 20 + [True] * 20 + [False] * 20 + [False, True, False])
+_POINTS = SEGMENT_POINTS.tolist()
+_DOUBLE = SEGMENT_DOUBLE.tolist()
+_POINTS_BY_NAME = dict(zip(SEGMENTS, _POINTS))
+
+
+def single(n):
+    return n - 1
+
+
+def double(n):
+    return 19 + n
+
+
+def treble(n):
+    return 39 + n
+
+
+# Trefferquoten je Dart (0..1): Treble 20/19, Streuung auf die Nachbar-Treble, übrige Treble
+# (Finish-Wege), Singles (Stellwürfe), Doppel, Bull
+DartModel = namedtuple("DartModel", "treble20 treble19 stray20 stray19 treble single double bull")
+# typischer Tour-Spieler: für die Checkout-Tabelle und als Ersatz fehlender Werte
+REFERENCE_MODEL = DartModel(0.40, 0.37, 0.07, 0.07, 0.33, 0.85, 0.40, 0.28)
+# Spalten der Spielerdaten, die dart_model_from_row liest
+DART_COLUMNS = [
+    "Checkout Pcnt 1 Darter", "Checkout Pcnt 2 Darter", "Checkout Pcnt 3 Darter",
+    "Treble 20 Hit Pcnt", "Stray Treble 20 Pcnt", "Treble 19 Hit Pcnt", "Stray Treble 19 Pcnt",
+    "Bullseye Checkout Pcnt", "First 9 Averages",
+]
+# ohne First 9 Averages: Average * Faktor (die ersten 9 Darts liegen über dem Gesamtschnitt)
+FIRST9_FACTOR = 1.08
+
+# Fehlwürfe: beim Treble landen so viele im Single derselben Zahl (Rest Nachbar-Singles),
+# beim Doppel so viele außerhalb des Boards bzw. im Single derselben Zahl
+TREBLE_MISS_SINGLE = 0.8
+DOUBLE_MISS_OUTSIDE = 0.45
+DOUBLE_MISS_SINGLE = 0.4
+# Bewertung in der Checkout-Tabelle: Rest mit Finish-Chance in der nächsten Aufnahme
+# (gewichtet) und ein kleiner Bonus je erzielten Punkt, damit ohne Finish gescort wird
+LEAVE_WEIGHT = 0.6
+SCORE_WEIGHT = 0.01
+
+
+def hit_row(target, model):
+    """Verteilung über SEGMENTS, wenn auf SEGMENTS[target] gezielt wird."""
+    row = np.zeros(len(SEGMENTS))
+    if target >= OUTER_BULL:
+        hit = model.bull if target == BULL else min(0.9, 0.45 + model.bull / 2)
+        row[target] = hit
+        if target == BULL:
+            row[OUTER_BULL] = (1.0 - hit) * 0.5
+        else:
+            row[BULL] = min(model.bull / 3, 1.0 - hit)
+        row[:20] += (1.0 - row.sum()) / 20   # Rest verteilt sich über die Singles
+        return row
+
+    kind, n = divmod(target, 20)
+    n += 1
+    left, right = NEIGHBOURS[n]
+    if kind == 2:
+        hit = model.treble20 if n == 20 else model.treble19 if n == 19 else model.treble
+        stray = model.stray20 if n == 20 else model.stray19 if n == 19 else (model.stray20 + model.stray19) / 2
+        stray = min(stray, 1.0 - hit)
+        rest = 1.0 - hit - stray
+        row[treble(n)] = hit
+        row[treble(left)] += stray / 2
+        row[treble(right)] += stray / 2
+        row[single(n)] += rest * TREBLE_MISS_SINGLE
+        neighbours = rest * (1.0 - TREBLE_MISS_SINGLE)
+    elif kind == 1:
+        rest = 1.0 - model.double
+        row[double(n)] = model.double
+        row[MISS] = rest * DOUBLE_MISS_OUTSIDE
+        row[single(n)] += rest * DOUBLE_MISS_SINGLE
+        neighbours = rest * (1.0 - DOUBLE_MISS_OUTSIDE - DOUBLE_MISS_SINGLE)
+    else:
+        rest = 1.0 - model.single
+        row[single(n)] = model.single
+        row[treble(n)] += rest * 0.3
+        row[double(n)] += rest * 0.2
+        neighbours = rest * 0.5
+    row[single(left)] += neighbours / 2
+    row[single(right)] += neighbours / 2
+    return row
+
+
+def hit_matrix(model):
+    """Trefferverteilungen aller Ziele (TARGETS x SEGMENTS)."""
+    return np.array([hit_row(target, model) for target in range(TARGETS)])
+
+
+def _with_form(model, form):
+    # Form wirkt wie im Aufnahme-Modell auf die Finish-Quoten
+    modifier = 1.0 + (form - 5.0) / 25.0
+    return model._replace(double=min(max(model.double * modifier, 0.01), 0.95),
+                          bull=min(max(model.bull * modifier, 0.01), 0.95))
+
+
+def _pct(row, column):
+    value = to_number(row.get(column), None)
+    return min(value, 100.0) / 100.0 if value is not None and value > 0 else None
+
+
+def _clip(value, low, high):
+    return min(max(value, low), high)
+
+
+def _treble_from_average(first9, stray):
+    # Treble-20-Quote, bei der drei Darts auf T20 im Mittel first9 Punkte bringen
+    points = lambda t: float(hit_row(treble(20), REFERENCE_MODEL._replace(treble20=t, stray20=stray))
+                             @ SEGMENT_POINTS)
+    low, high = points(0.0), points(1.0 - stray)
+    return _clip((first9 / 3.0 - low) / (high - low) * (1.0 - stray), 0.05, 0.8)
+
+
+def dart_model_from_row(row):
+    """
+    DartModel aus einer Zeile der Spielerdaten. "Checkout Pcnt n Darter" sind Erfolgsquoten je
+    Aufnahme auf ein Finish mit n nötigen Darts: Doppelquote d aus 1 - (1 - c1)^(1/3),
+    Stellwurf-Quote aus c2 / (1 - (1 - d)^2), übrige Treble aus c3 / (Single * d).
+    Fehlende Werte: aus First 9 Averages bzw. Average oder vom Referenzspieler.
+    """
+    ref = REFERENCE_MODEL
+    c1 = _pct(row, "Checkout Pcnt 1 Darter")
+    dbl = 1.0 - (1.0 - min(c1, 0.999)) ** (1.0 / 3.0) if c1 else _pct(row, "Checkout Pcnt") or ref.double
+    dbl = _clip(dbl, 0.05, 0.9)
+    c2 = _pct(row, "Checkout Pcnt 2 Darter")
+    sgl = _clip(c2 / (1.0 - (1.0 - dbl) ** 2), 0.5, 0.97) if c2 else ref.single
+
+    stray20 = _clip(_pct(row, "Stray Treble 20 Pcnt") or ref.stray20, 0.0, 0.3)
+    stray19 = _clip(_pct(row, "Stray Treble 19 Pcnt") or stray20, 0.0, 0.3)
+    t20 = _pct(row, "Treble 20 Hit Pcnt")
+    if t20 is None:
+        first9 = to_number(row.get("First 9 Averages"), None)
+        if first9 is None:
+            avg = to_number(row.get("Averages", row.get("Avg")), None)
+            first9 = avg * FIRST9_FACTOR if avg else None
+        t20 = _treble_from_average(first9, stray20) if first9 else ref.treble20
+    t20 = _clip(t20, 0.05, 0.8)
+    t19 = _clip(_pct(row, "Treble 19 Hit Pcnt") or t20 * ref.treble19 / ref.treble20, 0.05, 0.8)
+
+    c3 = _pct(row, "Checkout Pcnt 3 Darter")
+    other = _clip(c3 / (sgl * dbl), 0.05, 0.7) if c3 else min(t20, t19)
+    bull = _clip(_pct(row, "Bullseye Checkout Pcnt") or dbl * ref.bull / ref.double, 0.02, 0.8)
+    return DartModel(t20, t19, stray20, stray19, other, sgl, dbl, bull)
+
+
+def _transitions():
+    # je Rest r und getroffenem Feld: Rest danach, Checkout (0 über ein Doppel), Bust
+    rest = np.arange(START_SCORE + 1)[:, None] - SEGMENT_POINTS[None, :]
+    finish = (rest == 0) & SEGMENT_DOUBLE[None, :]
+    bust = ~finish & (rest < 2)
+    return np.clip(rest, 0, START_SCORE), finish, bust
+
+
+def _solve_routes(hits):
+    after, finish, bust = _transitions()
+
+    def best(value, bust_value):
+        outcome = np.where(finish, 1.0, np.where(bust, bust_value[:, None], value[after]))
+        scores = outcome @ hits.T
+        return scores.max(axis=1), scores.argmax(axis=1)
+
+    # Chance, in einer Aufnahme (3 Darts) auszuchecken
+    chance = np.zeros(START_SCORE + 1)
+    for _ in range(3):
+        chance, _ = best(chance, np.zeros(START_SCORE + 1))
+    # Wert nach der Aufnahme: Finish-Chance der nächsten plus Punkte-Bonus; Bust lässt den Rest stehen
+    remaining = np.arange(START_SCORE + 1)
+    leave = LEAVE_WEIGHT * chance + SCORE_WEIGHT * (START_SCORE - remaining) / START_SCORE
+    routes = np.zeros((4, START_SCORE + 1), dtype=np.int16)
+    value = leave
+    for darts in (1, 2, 3):
+        value, routes[darts] = best(value, leave)
+    routes[:, :2] = treble(20)   # Reste 0 und 1 kommen nicht vor
+    routes[0] = -1
+    return routes, chance
+
+
+_ROUTES = None
+
+
+def route_table():
+    """
+    Checkout-Tabelle (Referenzspieler): routes[d][r] = Ziel (Index in SEGMENTS) bei Rest r und
+    d verbleibenden Darts (1..3); chance[r] = P(Finish in einer Aufnahme). Einmal berechnet,
+    nur lesen.
+    """
+    global _ROUTES
+    if _ROUTES is None:
+        routes, chance = _solve_routes(hit_matrix(REFERENCE_MODEL))
+        routes.flags.writeable = False
+        chance.flags.writeable = False
+        _ROUTES = routes, chance, [row.tolist() for row in routes]
+    return _ROUTES[0], _ROUTES[1]
+
+
+def describe_route(remaining, darts=3):
+    """Weg bei lauter Treffern, z. B. describe_route(170) -> ["T20", "T20", "Bull"]."""
+    routes, _ = route_table()
+    path = []
+    while darts and remaining >= 2:
+        target = int(routes[darts][remaining])
+        path.append(SEGMENTS[target])
+        remaining -= _POINTS[target]
+        if remaining == 0 and _DOUBLE[target] or remaining < 2:
+            break
+        darts -= 1
+    return path
+
+
+def darts_points(darts):
+    """Punkte der getroffenen Felder (Namen aus SEGMENTS), auch wenn die Aufnahme überworfen war."""
+    return sum(_POINTS_BY_NAME[name] for name in darts)
+
+
+class DartTables:
+    """Trefferverteilungen eines Spielers je Ziel: hits (TARGETS x SEGMENTS) und kumuliert als Listen."""
+
+    __slots__ = ("model", "hits", "hit_rows")
+
+    def __init__(self, model):
+        self.model = model
+        self.hits = hit_matrix(model)
+        cdf = np.minimum(np.cumsum(self.hits, axis=1), 1.0)
+        cdf[:, -1] = 1.0
+        self.hit_rows = [row.tolist() for row in cdf]
+        self.hits.flags.writeable = False
+
+
+_DART_TABLES = {}
+
+
+def dart_tables(model, form=5.0):
+    """DartTables für model bei Form form, gecacht."""
+    key = (tuple(model), form)
+    if key not in _DART_TABLES:
+        if len(_DART_TABLES) >= 256:
+            _DART_TABLES.clear()
+        _DART_TABLES[key] = DartTables(_with_form(model, form))
+    return _DART_TABLES[key]
+
+
+def throw_darts(tables, remaining, rng):
+    """
+    Eine Aufnahme Dart für Dart nach der Checkout-Tabelle (Ziel je Rest und verbleibenden
+    Darts, Feld per Inverse-CDF aus der Trefferverteilung).
+    Gibt (getroffene Felder, Punkte, Checkout) zurück; ein Bust zählt 0 Punkte.
+    """
+    route_table()
+    routes = _ROUTES[2]
+    left = START_SCORE if remaining is None else min(int(remaining), START_SCORE)
+    start = left
+    darts = []
+    for n in (3, 2, 1):
+        segment = bisect_right(tables.hit_rows[routes[n][left]], rng.random())
+        darts.append(SEGMENTS[segment])
+        left -= _POINTS[segment]
+        if left == 0 and _DOUBLE[segment]:
+            return darts, start, True
+        if left < 2:
+            return darts, 0, False
+    return darts, start - left, False
+
+
+def build_visit_tables(model, form=5.0):
+    """
+    Exakte Aufnahme-Verteilung des Dart-Modells als simulate_batch.VisitTables: je Rest werden
+    die drei Darts über die Checkout-Tabelle als Übergangsmatrizen (Rest -> Rest, Checkout,
+    Bust) durchgerechnet. Bust = 0 Punkte; eine Aufnahme genau auf den Rest ist immer ein
+    Checkout (attempt_checkout gelingt dann sicher).
+    """
+    hits = dart_tables(model, form).hits
+    routes, _ = route_table()
+    after, finish, bust = _transitions()
+    size = START_SCORE + 1
+    rows = np.arange(size)
+
+    state = np.eye(size)
+    checked_out = np.zeros(size)
+    busted = np.zeros(size)
+    for darts in (3, 2, 1):
+        chosen = hits[routes[darts]]            # Trefferverteilung des Ziels je Rest
+        step = np.zeros((size, size))
+        np.add.at(step, (np.broadcast_to(rows[:, None], after.shape), after), np.where(finish | bust, 0.0, chosen))
+        step[:2] = 0.0
+        step[0, 0] = step[1, 1] = 1.0           # Reste 0 und 1: kein Wurf
+        to_finish = np.where(rows >= 2, (chosen * finish).sum(axis=1), 0.0)
+        to_bust = np.where(rows >= 2, (chosen * bust).sum(axis=1), 0.0)
+        checked_out += state @ to_finish
+        busted += state @ to_bust
+        state = state @ step
+
+    # state[r0, r] = P(nach der Aufnahme Rest r); Punkte = r0 - r (höchstens 180)
+    points = np.arange(181)
+    source = rows[:, None] - points[None, :]
+    outcomes = np.zeros((size, OUTCOMES))
+    outcomes[:, :181] = np.where(source >= 0, state[rows[:, None], np.maximum(source, 0)], 0.0)
+    outcomes[:, 0] += busted
+    outcomes[:, CHECKOUT] = checked_out
+
+    throw = outcomes.copy()
+    throw[:, CHECKOUT] = 0.0
+    finishable = rows[rows <= 180]
+    throw[finishable, finishable] += checked_out[finishable]
+    success = np.where(checked_out > 0, 1.0, 0.0)
+    return VisitTables(throw, success, outcomes)
+
+
+if __name__ == "__main__":
+    routes, chance = route_table()
+    for text in sys.argv[1:] or ["170", "121", "100", "81", "40", "32"]:
+        remaining = int(text)
+        print(f"{remaining:3d}: {' '.join(describe_route(remaining)):16} "
+              f"(Finish-Chance Referenzspieler {chance[remaining] * 100:.1f}%)")
@@ -0,0 +1,3 @@
+# conftest.py
+# Liegt im Projektverzeichnis, damit pytest es in sys.path aufnimmt und die Tests unter tests/
+# die Module (normalize_stats, calculate_form, ...) direkt importieren können.
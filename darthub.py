@@ -1,119 +1,146 @@
 # darthub.py
-import re
 import os
-import sys
+import json
 import time
 import random
-import subprocess
-from collections import Counter
+from bisect import bisect_right
+from datetime import datetime
 
 import pandas as pd
 import streamlit as st
 
 # unsere Simulator-Klassen
-from simulate_player import SimulatedPlayer
-from simulate_match import MatchSimulator
+from simulate_player import player_from_row
+from checkout_routes import DART_COLUMNS
+from simulate_match import PAUSE_AFTER, MatchSimulator
+from result_cache import RESULTS_DIR, ResultCache, run_cached
+from simulate_adaptive import run_adaptive, wilson_interval
+from simulate_sweep import SWEEP_PARAMETERS, grid_around, surface_frame, sweep
+from pipeline import STAGES, PipelineBusy
+from pipeline_job import current_job, start_job
+from solve_match import match_probabilities
+from simulate_tournament import (FIELD_SIZES, load_field, parse_legs_per_round, round_names,
+                                 simulate_tournament)
+from player_store import STORE_PATH, load_players, store_metadata
+from normalize_stats import to_number
+from player_index import PlayerIndex
+from head_to_head import load_matrix, matrix_path
+import diagnostics
 
 # ---------------------
 # Hilfsfunktionen
 # ---------------------
-def parse_number(x, default=None):
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return default
-    try:
-        s = str(x).strip()
-        if s == "":
-            return default
-        s = re.sub(r"[^\d\.,\-]", "", s)
-        if "." in s and "," in s:
-            if s.find(".") < s.find(","):
-                s = s.replace(".", "").replace(",", ".")
-            else:
-                s = s.replace(",", "")
-        elif "," in s and "." not in s:
-            s = s.replace(",", ".")
-        return float(s)
-    except:
-        return default
-
-def run_pipeline_ui(progress_container, log_container):
-    steps = [
-        (["get_dartoracle.py"], "Spielerübersicht scrapen (players.csv)"),
-        (["get_player_stats.py"], "Spieler-Stats scrapen (all_players_stats.csv)"),
-        (["calculate_form.py"], "Form berechnen (all_players_with_form.csv)"),
-    ]
-    env = os.environ.copy()
-    env["PYTHONIOENCODING"] = "utf-8"
-    for i, (cmd, desc) in enumerate(steps, start=1):
-        log_container.info(f"⏳ {desc} ...")
-        proc = subprocess.run([sys.executable] + cmd, capture_output=True, text=True, env=env)
-        if proc.returncode != 0:
-            log_container.error(f"❌ Fehler bei '{desc}':\n\n{proc.stderr}")
-            return False
-        if proc.stdout:
-            log_container.code(proc.stdout)
-        progress_container.progress(i / len(steps))
-        time.sleep(0.2)
-    log_container.success("✅ Pipeline fertig – Daten aktualisiert!")
-    return True
-
-def estimate_p180_from_history(p, avg_legs_per_match=8):
-    # tries to compute a reasonable per-visit 180 probability
-    total_180s = None
-    for cand in ["180's", "180s", "Total180s", "Total 180s"]:
-        if cand in p:
-            total_180s = parse_number(p[cand], None)
-            if total_180s is not None:
-                break
-    matches = None
-    for cand in ["Matches_Played", "Matches", "MatchesPlayed", "Matches Played", "match_count"]:
-        if cand in p:
-            matches = parse_number(p[cand], None)
-            if matches is not None:
-                break
-    if total_180s and matches and matches > 0:
-        per_leg = total_180s / (matches * avg_legs_per_match)
-        # clamp
-        return float(max(0.002, min(per_leg, 0.5)))
-    # fallback estimate from average
-    avg = parse_number(p.get("Averages", p.get("Avg", None)), 90.0)
-    est = 0.03 + max(0.0, (avg - 80.0)) * 0.008
-    return float(min(max(est, 0.005), 0.30))
+def pipeline_status():
+    """Fortschritt, Log und Abbrechen des Hintergrund-Jobs; schaltet nach Erfolg auf die neuen Daten."""
+    job = current_job()
+    if job is None:
+        return
+    state = job.snapshot()
+    if state["status"] == "running":
+        st.progress(min(state["value"], 1.0), text=f"{STAGES[state['stage'] - 1]} – {state['message']}")
+        if state["cancelling"]:
+            st.caption("⏹️ Wird abgebrochen …")
+        elif st.button("⏹️ Abbrechen", key=f"cancel_{state['id']}"):
+            job.cancel()
+        if state["log"]:
+            st.code("\n".join(state["log"][-LOG_SHOWN:]))
+        return
+
+    if st.session_state.get("loaded_job") != state["id"]:
+        # Lauf beendet: eingefrorenen Datenstand freigeben und die ganze Seite neu aufbauen
+        st.session_state["loaded_job"] = state["id"]
+        st.session_state.pop("data_key", None)
+        if state["status"] == "done":
+            st.rerun()
+    log = "\n".join(state["log"])
+    if state["status"] == "done":
+        st.success(f"✅ Pipeline fertig ({state['seconds']:.0f} s) – Daten aktualisiert!\n\n{log}")
+    elif state["status"] == "failed":
+        st.error(f"❌ Fehler in der Pipeline:\n\n{state['error']}")
+    else:
+        st.warning(f"⏹️ Pipeline abgebrochen – bisherige Daten bleiben aktiv.\n\n{log}")
+
+def file_mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_player_data(store_mtime, csv_mtime):
+    """
+    Spielerdaten und Index, einmal pro Datenstand gebaut und über alle Reruns/Sessions
+    geteilt (nur lesen!). Die Datei-Zeitstempel sind Teil des Cache-Schlüssels, ein neuer
+    Pipeline-Lauf oder eine geänderte CSV lädt also automatisch neu.
+    """
+    df = load_players(APP_COLUMNS, path=STORE_PATH, csv_file=CSV_FILE)
+    return df, PlayerIndex(df)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_head_to_head(path, mtime):
+    """Vorberechnete Head-to-Head-Matrix (head_to_head.py) je Datei und Zeitstempel."""
+    return load_matrix(path)
+
+@st.cache_resource(show_spinner=False)
+def get_result_cache():
+    """Monte-Carlo-Ergebnisse über Reruns/Sessions (LRU + Dateien), verfällt mit neuer Form-CSV."""
+    return ResultCache(disk_dir=RESULTS_DIR, version_path=CSV_FILE)
 
 # ---------------------
 # App Start
 # ---------------------
 CSV_FILE = "all_players_with_form.csv"
+# Log-Zeilen des laufenden Pipeline-Jobs in der Sidebar
+LOG_SHOWN = 15
+# Live-Modus: Ereignisse im Ringpuffer (angezeigte Zeilen)
+LIVE_BUFFER = 200
+# Live-Modus: Bildrate der Anzeige
+LIVE_FPS = 10
+# Spalten, die die App tatsächlich liest (Projektion beim Laden des Stores)
+APP_COLUMNS = [
+    "Id", "Name", "Averages", "Avg", "180's", "Checkout Pcnt", "Pcnt Legs Won", "Highest Checkout", "Form",
+    "Matches_Played", "Matches", "MatchesPlayed", "Matches Played", "match_count",
+] + DART_COLUMNS
 st.set_page_config(page_title="🎯 DartsHub", layout="wide")
 
-# Sidebar - Pipeline
+# Sidebar - Pipeline (läuft im Hintergrund, höchstens ein Lauf für alle Sitzungen)
 st.sidebar.title("⚙️ Datenverwaltung")
-progress_placeholder = st.sidebar.empty()
-log_placeholder = st.sidebar.empty()
-
-if st.sidebar.button("🔄 Daten neu laden (Pipeline starten)"):
-    progress_bar = st.sidebar.progress(0)
-    success = run_pipeline_ui(progress_bar, log_placeholder)
-    if success:
-        st.experimental_rerun()
+job = current_job()
+if st.sidebar.button("🔄 Daten neu laden (Pipeline starten)", disabled=bool(job and job.running)):
+    try:
+        job, _ = start_job()
+    except PipelineBusy as e:
+        st.sidebar.warning(f"⚠️ {e}")
+with st.sidebar:
+    if job is not None and job.running:
+        # nur dieser Teil läuft jede Sekunde neu, der Rest der Seite bleibt bedienbar
+        st.fragment(run_every=1.0)(pipeline_status)()
+    else:
+        pipeline_status()
 
-if os.path.exists(CSV_FILE):
+store_meta = store_metadata(STORE_PATH)
+if store_meta and store_meta.get("scraped_at"):
+    scraped_at = datetime.fromisoformat(store_meta["scraped_at"])
+    st.sidebar.info(f"📅 Letztes Update: {scraped_at.strftime('%d.%m.%Y %H:%M')}")
+elif os.path.exists(CSV_FILE):
     modified_time = os.path.getmtime(CSV_FILE)
     st.sidebar.info(f"📅 Letztes Update: {time.strftime('%d.%m.%Y %H:%M', time.localtime(modified_time))}")
 else:
     st.sidebar.warning("⚠️ Noch keine Daten vorhanden. Bitte Pipeline starten!")
 
-# CSV laden (oder stoppen)
+# Spielerdaten laden (Store, beim ersten Start aus der CSV gebaut) oder stoppen.
+# Während eines Pipeline-Laufs bleibt die Sitzung beim bisherigen Datenstand; umgeschaltet
+# wird erst, wenn der Job fertig ist (pipeline_status).
+data_key = (file_mtime(STORE_PATH), file_mtime(CSV_FILE))
+if job is not None and job.running and "data_key" in st.session_state:
+    data_key = st.session_state["data_key"]
+st.session_state["data_key"] = data_key
 try:
-    df = pd.read_csv(CSV_FILE, sep=";")
-    df.columns = [c.strip() for c in df.columns]
+    df, index = get_player_data(*data_key)
 except Exception as e:
-    st.error(f"❌ Fehler beim Laden der CSV: {e}")
+    st.error(f"❌ Fehler beim Laden der Spielerdaten: {e}")
     st.stop()
 
 # Navigation
 st.sidebar.title("📂 Navigation")
-page = st.sidebar.radio("Seite auswählen:", ["👤 Spielerprofil", "🎲 Match Simulation"])
+page = st.sidebar.radio("Seite auswählen:", ["👤 Spielerprofil", "🎲 Match Simulation", "🏆 Turnier", "🩺 Diagnose"])
 
 # -----------------
 # Spielerprofil
@@ -127,12 +154,12 @@ if page == "👤 Spielerprofil":
         st.error("❌ CSV enthält keine Spalte 'Name'")
         st.stop()
 
-    filtered = df[df["Name"].str.contains(search, case=False, na=False)] if search else df
-    if filtered.empty:
+    matches = index.search(search)
+    if not matches:
         st.warning("⚠️ Kein Spieler gefunden")
         st.stop()
-    selected = st.sidebar.selectbox("👤 Spieler auswählen", sorted(filtered["Name"].unique()))
-    player_data = df[df["Name"] == selected].iloc[0]
+    selected = st.sidebar.selectbox("👤 Spieler auswählen", matches)
+    player_data = index.row(selected)
 
     st.subheader(f"📊 Stats für {selected} (letzte 12 Monate)")
     col1, col2, col3 = st.columns(3)
@@ -148,7 +175,7 @@ if page == "👤 Spielerprofil":
     with col5:
         st.metric("🔝 Highest Checkout", player_data.get("Highest Checkout", "n/a"))
     with col6:
-        form_value = parse_number(player_data.get("Form", 0), 0.0)
+        form_value = to_number(player_data.get("Form", 0), 0.0)
         st.metric("🔥 Form", f"{form_value}/10")
 
     st.divider()
@@ -172,9 +199,9 @@ if page == "🎲 Match Simulation":
     st.title("🎲 Match Simulation")
     left, right = st.columns([1,1])
     with left:
-        player1 = st.selectbox("👤 Spieler 1", df["Name"].unique(), index=0)
+        player1 = st.selectbox("👤 Spieler 1", index.ordered_names, index=0)
     with right:
-        player2 = st.selectbox("👤 Spieler 2", df["Name"].unique(), index=1)
+        player2 = st.selectbox("👤 Spieler 2", index.ordered_names, index=1)
 
     if player1 == player2:
         st.warning("⚠️ Bitte zwei verschiedene Spieler auswählen")
@@ -184,121 +211,298 @@ if page == "🎲 Match Simulation":
     if mode == "Best of Legs":
         best_of = st.selectbox("Best of wie viele Legs?", [3,5,7,9,11,13,15,17,19])
         legs_to_win = (best_of // 2) + 1
+        sets_to_win = None
     else:
-        sets = st.selectbox("Best of wie viele Sets?", [3,5,7,9])
-        legs_per_set = st.selectbox("Legs pro Set", [3,5,7])
-        # einfache Behandlung: treat as (sets, legs_per_set) for now; Monte Carlo supports legs only currently
-        legs_to_win = None
+        sets = st.selectbox("Best of wie viele Sets?", [3,5,7,9,11,13])
+        legs_per_set = st.selectbox("Legs pro Set (Best of)", [3,5,7])
+        # legs_to_win gilt dann je Set
+        sets_to_win = (sets // 2) + 1
+        legs_to_win = (legs_per_set // 2) + 1
 
     st.markdown("**Simulation-Modus**")
-    sim_mode = st.selectbox("Modus:", ["Live (Wurf-für-Wurf)", "Monte Carlo (viele Matches)"])
+    dart_model = st.checkbox(
+        "🎯 Dart-für-Dart-Modell (Checkout-Wege, Treble-, Doppel- und Bull-Quoten)",
+        help="Jeder Dart wird nach der Checkout-Tabelle auf ein Feld geworfen; Trefferquoten aus "
+             "Checkout Pcnt 1/2/3 Darter, Treble 20/19, Bullseye und First 9 Averages. "
+             "Gilt nicht für den Parameter-Sweep.")
+    sim_mode = st.selectbox("Modus:", ["Live (Wurf-für-Wurf)", "Monte Carlo (viele Matches)", "Exakt (Markov-Kette)",
+                                       "Was-wäre-wenn (Parameter-Sweep)"])
 
     # Optionen
     if sim_mode == "Live (Wurf-für-Wurf)":
-        delay = st.slider("Delay pro Aufnahme (Sekunden)", 0.1, 2.0, 0.6, 0.1)
-    else:
-        simulations = st.slider("Anzahl Monte-Carlo-Simulationen", 100, 5000, 1000, 100)
+        fast_forward = st.checkbox("⏩ Vorspulen (ohne Pausen)")
+        delay = 0.0 if fast_forward else st.slider("Delay pro Aufnahme (Sekunden)", 0.1, 2.0, 0.6, 0.1)
+    elif sim_mode == "Was-wäre-wenn (Parameter-Sweep)":
+        sweep_player = st.radio("Parameter ändern für", [player1, player2], horizontal=True)
+        sweep_params = st.multiselect("Parameter (einer oder zwei)", list(SWEEP_PARAMETERS), default=["avg"],
+                                      format_func=SWEEP_PARAMETERS.get, max_selections=2)
+        spread = st.slider("Spannweite (± % um den aktuellen Wert)", 5, 50, 20, 5) / 100
+        steps = st.slider("Rasterpunkte je Parameter", 3, 21, 9, 2)
+    elif sim_mode == "Monte Carlo (viele Matches)":
+        # der exakte Modus braucht weder Anzahl noch Prozesse noch Seed
+        adaptive = st.checkbox("🎯 Adaptiv: stoppen, sobald die Zielgenauigkeit erreicht ist")
+        if adaptive:
+            precision = st.slider("Zielgenauigkeit Siegwahrscheinlichkeit (± Prozentpunkte, 95%)", 0.2, 5.0, 1.0, 0.1) / 100
+            time_budget = st.slider("Zeitbudget (Sekunden)", 1, 60, 10)
+        else:
+            simulations = st.slider("Anzahl Monte-Carlo-Simulationen", 1000, 200000, 20000, 1000)
+            # adaptiv läuft in kleinen, nacheinander folgenden Blöcken in diesem Prozess
+            workers = int(st.number_input("Prozesse", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1, step=1))
+        seed_text = st.text_input("Seed (optional, für reproduzierbare Ergebnisse)", "")
+        seed = int(seed_text) if seed_text.strip().isdigit() else None
 
     # prepare player objects
-    p1_row = df[df["Name"] == player1].iloc[0]
-    p2_row = df[df["Name"] == player2].iloc[0]
-
-    # build stats dicts (p180_per_leg if available)
-    p1_stats = {}
-    p2_stats = {}
-    p1_p180 = estimate_p180_from_history(p1_row)
-    p2_p180 = estimate_p180_from_history(p2_row)
-    p1_stats["p180_per_leg"] = p1_p180
-    p2_stats["p180_per_leg"] = p2_p180
-
-    # create simulated players
-    p1_sim = SimulatedPlayer(
-        player1,
-        avg=parse_number(p1_row.get("Averages", p1_row.get("Avg", 90)), 90.0),
-        checkout_pct=parse_number(p1_row.get("Checkout Pcnt", 35), 35.0),
-        form=parse_number(p1_row.get("Form", 5), 5.0),
-        stats={"p180_per_leg": p1_p180}
-    )
-    p2_sim = SimulatedPlayer(
-        player2,
-        avg=parse_number(p2_row.get("Averages", p2_row.get("Avg", 90)), 90.0),
-        checkout_pct=parse_number(p2_row.get("Checkout Pcnt", 35), 35.0),
-        form=parse_number(p2_row.get("Form", 5), 5.0),
-        stats={"p180_per_leg": p2_p180}
-    )
+    p1_row = index.row(player1)
+    p2_row = index.row(player2)
+
+    # create simulated players (p180_per_leg aus der Historie, falls vorhanden)
+    darts = dart_model and sim_mode != "Was-wäre-wenn (Parameter-Sweep)"
+    p1_sim = player_from_row(player1, p1_row, darts=darts)
+    p2_sim = player_from_row(player2, p2_row, darts=darts)
+
+    # Vorberechnete Head-to-Head-Matrix für dieses Format (python head_to_head.py)
+    h2h_path = matrix_path(legs_to_win, sets_to_win)
+    h2h = get_head_to_head(h2h_path, file_mtime(h2h_path))
+    # die Matrix rechnet mit dem Aufnahme-Modell
+    if h2h is not None and not darts and player1 in h2h and player2 in h2h:
+        p_h2h = h2h.probability(player1, player2)
+        note = "" if h2h.is_current(p1_sim) and h2h.is_current(p2_sim) else " – Spielerdaten seitdem geändert, Matrix neu bauen"
+        st.info(f"⚡ Head-to-Head (vorberechnet {h2h.built_at[:10]}): {player1} {p_h2h*100:.1f}% – "
+                f"{player2} {(1 - p_h2h)*100:.1f}% (Anwurf ausgebullt){note}")
 
     # ACTIONS
     if sim_mode == "Live (Wurf-für-Wurf)":
-        if legs_to_win is None:
-            st.info("Live-Modus unterstützt momentan nur Best-of-Legs. Wähle 'Best of Legs'.")
-        else:
-            if st.button("▶️ Live Simulation starten"):
-                sim = MatchSimulator(p1_sim, p2_sim, legs_to_win=legs_to_win)
-                placeholder = st.empty()
-                lines = []
-                for event in sim.play_match_live(delay=delay):
-                    lines.append(event)
-                    # show full history as text block (keeps scrollable)
-                    placeholder.text("\n".join(lines[-200:]))  # zeige nur die letzten 200 Zeilen für Performance
-                # am Ende evtl. Zusammenfassung
+        live_key = (player1, player2, legs_to_win, sets_to_win, darts)
+        if st.button("▶️ Live Simulation starten"):
+            # ganzes Match vorab erzeugen; angezeigt wird danach nur noch nach der Uhr, ohne
+            # dass der Skript-Thread schläft (die Seite bleibt bedienbar)
+            sim = MatchSimulator(p1_sim, p2_sim, legs_to_win=legs_to_win, sets_to_win=sets_to_win)
+            lines, scores, times = [], [], []
+            at = 0.0
+            for event in sim.play_match_events():
+                score = f"**{player1}** {sim.legs[player1]} : {sim.legs[player2]} **{player2}** (Legs)"
+                if sets_to_win is not None:
+                    score = (f"**{player1}** {sim.sets[player1]} : {sim.sets[player2]} **{player2}** (Sets) · "
+                             f"{sim.legs[player1]} : {sim.legs[player2]} (Legs)")
+                lines.append(sim.describe(event))
+                scores.append(score)
+                times.append(at)
+                if event.kind in PAUSE_AFTER:
+                    at += delay
+            st.session_state["live"] = {"key": live_key, "lines": lines, "scores": scores, "times": times,
+                                        "start": time.perf_counter()}
+
+        live = st.session_state.get("live")
+        if live is not None and live["key"] == live_key:
+            def live_frame():
+                # Ereignisse, deren Zeitpunkt erreicht ist; höchstens LIVE_BUFFER Zeilen angezeigt
+                shown = bisect_right(live["times"], time.perf_counter() - live["start"])
+                st.markdown(live["scores"][shown - 1])
+                st.text("\n".join(live["lines"][max(0, shown - LIVE_BUFFER):shown]))
+                if shown < len(live["lines"]):
+                    return False
                 st.success("Live-Simulation beendet.")
+                return True
+
+            if time.perf_counter() - live["start"] >= live["times"][-1]:
+                live_frame()   # fertig oder vorgespult: einmal zeichnen
+            else:
+                @st.fragment(run_every=1.0 / LIVE_FPS)
+                def live_fragment():
+                    if live_frame():
+                        st.rerun()   # Ende erreicht: Polling beenden
+
+                live_fragment()
+
+    elif sim_mode == "Exakt (Markov-Kette)":
+        exact = match_probabilities(p1_sim, p2_sim, legs_to_win, sets_to_win)
+
+        st.subheader("📊 Exakte Wahrscheinlichkeiten")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric(f"🏆 {player1} Siegwahrscheinlichkeit", f"{exact['wins'][player1]*100:.1f}%")
+            st.metric(f"💥 Ø 180s {player1}", f"{exact['expected_180s'][player1]:.2f}")
+        with col2:
+            st.metric(f"🏆 {player2} Siegwahrscheinlichkeit", f"{exact['wins'][player2]*100:.1f}%")
+            st.metric(f"💥 Ø 180s {player2}", f"{exact['expected_180s'][player2]:.2f}")
+
+        st.divider()
+        st.subheader("📜 Wahrscheinlichste Endstände (Top 10)")
+        for score, prob in exact["scorelines"].most_common(10):
+            st.write(f"**{score}** – {prob * 100:.1f}%")
+
+        st.divider()
+        st.write(f"📌 Ø Legs pro Spiel: {exact['expected_legs']:.2f}")
+        if sets_to_win is not None:
+            st.write(f"📌 Ø Sets pro Spiel: {exact['expected_sets']:.2f}")
+            st.write("📌 Häufigste Legstände je Set: " + ", ".join(
+                f"{score} ({count / exact['expected_sets'] * 100:.1f}%)"
+                for score, count in exact["set_scorelines"].most_common(4)))
+
+    elif sim_mode == "Was-wäre-wenn (Parameter-Sweep)":
+        if not sweep_params:
+            st.warning("⚠️ Bitte mindestens einen Parameter auswählen")
+            st.stop()
+        if st.button("📈 Sweep starten"):
+            target = 0 if sweep_player == player1 else 1
+            grid = {name: grid_around((p1_sim, p2_sim)[target], name, spread, steps) for name in sweep_params}
+            progress = st.progress(0)
+            result = sweep(p1_sim, p2_sim, legs_to_win, grid, sets_to_win=sets_to_win,
+                           player=target, progress=progress.progress)
+            surface = surface_frame(result)
+
+            st.subheader(f"📈 Siegwahrscheinlichkeit {player1} (%) bei geänderten Werten von {sweep_player}")
+            st.line_chart(surface)
+            st.caption(
+                f"Ausgangswert {result['base']*100:.1f}% · exakt (Markov-Kette) je Rasterpunkt · "
+                f"{result['seconds']:.1f} s"
+            )
+            st.dataframe(surface.round(1))
 
     else:  # Monte Carlo
         if st.button("🚀 Monte Carlo Simulation starten"):
-            if legs_to_win is None:
-                st.info("Monte Carlo unterstützt derzeit nur Best of Legs (no sets). Wähle 'Best of Legs'.")
+            # viele Matches vektorisiert, verteilt auf mehrere Prozesse
+            progress = st.progress(0)
+            if adaptive:
+                summary = run_adaptive(
+                    p1_sim, p2_sim, legs_to_win, precision=precision, time_budget=time_budget,
+                    seed=seed, sets_to_win=sets_to_win, progress=progress.progress
+                )
+                info = summary["adaptive"]
+                reason = {"precision": "Zielgenauigkeit erreicht", "time": "Zeitbudget aufgebraucht",
+                          "max": "Maximalanzahl erreicht"}[info["stopped"]]
+                st.caption(f"🎯 {summary['simulations']} Matches in {info['seconds']:.1f} s – {reason}")
             else:
-                # run many matches (non-live)
-                winners = []
-                scorelines = []
-                total_180s_p1 = []
-                total_180s_p2 = []
-                total_legs_list = []
-
-                progress = st.progress(0)
-                for i in range(simulations):
-                    sim = MatchSimulator(
-                        SimulatedPlayer(player1, p1_sim.avg, p1_sim.checkout_pct, p1_sim.form, stats=p1_sim.stats),
-                        SimulatedPlayer(player2, p2_sim.avg, p2_sim.checkout_pct, p2_sim.form, stats=p2_sim.stats),
-                        legs_to_win=legs_to_win
-                    )
-                    winner, scoreline, match_history = sim.play_match()
-                    # collect stats: count 180s in match_history
-                    p1_180 = 0
-                    p2_180 = 0
-                    total_legs = 0
-                    for starter, leg_winner, leg_hist, leg_180s in match_history:
-                        p1_180 += leg_180s.get(player1, 0)
-                        p2_180 += leg_180s.get(player2, 0)
-                        total_legs += 1
-                    winners.append(winner)
-                    scorelines.append(scoreline)
-                    total_180s_p1.append(p1_180)
-                    total_180s_p2.append(p2_180)
-                    total_legs_list.append(total_legs)
-                    if i % max(1, simulations//100) == 0:
-                        progress.progress(i / simulations)
-                progress.progress(1.0)
-
-                win_count = Counter(winners)
-                score_count = Counter(scorelines)
-
-                st.subheader("📊 Monte Carlo Resultate")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric(f"🏆 {player1} Siegwahrscheinlichkeit", f"{(win_count[player1]/simulations)*100:.1f}%")
-                    st.metric(f"💥 Ø 180s {player1}", f"{(sum(total_180s_p1)/len(total_180s_p1)):.2f}")
-                with col2:
-                    st.metric(f"🏆 {player2} Siegwahrscheinlichkeit", f"{(win_count[player2]/simulations)*100:.1f}%")
-                    st.metric(f"💥 Ø 180s {player2}", f"{(sum(total_180s_p2)/len(total_180s_p2)):.2f}")
-
-                st.divider()
-                st.subheader("📜 Häufigste Endstände (Top 10)")
-                for score, count in score_count.most_common(10):
-                    st.write(f"**{score}** – {count}x ({(count / simulations) * 100:.1f}%)")
-
-                st.divider()
-                st.subheader("📋 Weitere Statistiken")
-                st.write(f"📌 Ø Legs pro Spiel: {(sum(total_legs_list)/len(total_legs_list)):.2f}")
-                st.write(f"📌 Ø 180s Gesamt {player1}: {(sum(total_180s_p1)/len(total_180s_p1)):.2f}")
-                st.write(f"📌 Ø 180s Gesamt {player2}: {(sum(total_180s_p2)/len(total_180s_p2)):.2f}")
+                summary, from_cache = run_cached(
+                    get_result_cache(), p1_sim, p2_sim, legs_to_win, simulations,
+                    workers=workers, seed=seed, progress=progress.progress, sets_to_win=sets_to_win
+                )
+                if from_cache:
+                    st.caption("♻️ Ergebnis aus dem Cache (gleiche Spieler, Format, Anzahl und Seed)")
+            progress.progress(1.0)
+
+            simulations = summary["simulations"]
+            low, high = wilson_interval(summary["wins"][player1], simulations)
+            win_count = summary["wins"]
+            score_count = summary["scorelines"]
+            avg_180s_p1 = summary["total_180s"][player1] / simulations
+            avg_180s_p2 = summary["total_180s"][player2] / simulations
+            avg_legs = summary["total_legs"] / simulations
+
+            st.subheader("📊 Monte Carlo Resultate")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric(f"🏆 {player1} Siegwahrscheinlichkeit", f"{(win_count[player1]/simulations)*100:.1f}%")
+                st.caption(f"95%-Intervall: {low*100:.1f} – {high*100:.1f}%")
+                st.metric(f"💥 Ø 180s {player1}", f"{avg_180s_p1:.2f}")
+            with col2:
+                st.metric(f"🏆 {player2} Siegwahrscheinlichkeit", f"{(win_count[player2]/simulations)*100:.1f}%")
+                st.caption(f"95%-Intervall: {(1 - high)*100:.1f} – {(1 - low)*100:.1f}%")
+                st.metric(f"💥 Ø 180s {player2}", f"{avg_180s_p2:.2f}")
+
+            st.divider()
+            st.subheader("📜 Häufigste Endstände (Top 10)")
+            for score, count in score_count.most_common(10):
+                st.write(f"**{score}** – {count}x ({(count / simulations) * 100:.1f}%)")
+
+            st.divider()
+            st.subheader("📋 Weitere Statistiken")
+            st.write(f"📌 Ø Legs pro Spiel: {avg_legs:.2f}")
+            if sets_to_win is not None:
+                total_sets = summary["total_sets"]
+                st.write(f"📌 Ø Sets pro Spiel: {total_sets / simulations:.2f}")
+                st.write("📌 Häufigste Legstände je Set: " + ", ".join(
+                    f"{score} ({count / total_sets * 100:.1f}%)"
+                    for score, count in summary["set_scorelines"].most_common(4)))
+            st.write(f"📌 Ø 180s Gesamt {player1}: {avg_180s_p1:.2f}")
+            st.write(f"📌 Ø 180s Gesamt {player2}: {avg_180s_p2:.2f}")
+
+# -----------------
+# Turnier
+# -----------------
+if page == "🏆 Turnier":
+    st.title("🏆 Turnier-Simulation")
+    size = st.selectbox("Feldgröße (gesetzt nach Average)", list(FIELD_SIZES))
+    rounds = round_names(size)
+    legs_text = st.text_input(
+        f"Legs zum Sieg je Runde ({', '.join(rounds)}) – eine Zahl für alle Runden",
+        ",".join(["4"] * (len(rounds) - 3) + ["5", "6", "7"]),
+    )
+    tournaments = st.slider("Anzahl Turniere", 1000, 200000, 20000, 1000)
+    workers = int(st.number_input("Prozesse", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1, step=1))
+    seed_text = st.text_input("Seed (optional, für reproduzierbare Ergebnisse)", "")
+    seed = int(seed_text) if seed_text.strip().isdigit() else None
+
+    try:
+        legs_per_round = parse_legs_per_round(legs_text, len(rounds))
+    except ValueError:
+        legs_per_round = []
+    if len(legs_per_round) != len(rounds) or min(legs_per_round) < 1:
+        st.warning(f"⚠️ Bitte eine Zahl oder {len(rounds)} Zahlen (kommagetrennt) angeben")
+        st.stop()
+
+    if st.button("🚀 Turnier simulieren"):
+        progress = st.progress(0)
+        phases = {"Paarungen": 0, "Turniere": 1}
+        result = simulate_tournament(
+            load_field(size, df=df), legs_per_round, tournaments, seed=seed, workers=workers,
+            progress=lambda phase, fraction: progress.progress(
+                min(1.0, (phases[phase] + fraction) / 2), text=phase),
+        )
+        progress.progress(1.0)
+
+        st.subheader("📊 Wahrscheinlichkeit, die Runde zu erreichen")
+        shown = result.copy()
+        for col in rounds + ["Titel"]:
+            shown[col] = (shown[col] * 100).round(1)
+        st.dataframe(shown, hide_index=True)
+
+# -----------------
+# Diagnose
+# -----------------
+if page == "🩺 Diagnose":
+    st.title("🩺 Diagnose")
+    st.caption("Messwerte dieses App-Prozesses seit dem Start bzw. dem letzten Zurücksetzen: "
+               "Pipeline-Stufen, HTTP-Anfragen und Monte-Carlo-Durchsatz.")
+    profiling = st.checkbox("cProfile-Mitschnitt für Pipeline und Monte Carlo aktivieren",
+                            value=diagnostics.METRICS.profiling)
+    diagnostics.set_profiling(profiling)
+    if st.button("🧹 Messwerte zurücksetzen"):
+        diagnostics.reset()
+    report = diagnostics.report()
+
+    st.subheader("🎲 Simulation")
+    sim = report["simulation"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Läufe", sim["runs"])
+    col2.metric("Matches/s", f"{sim['matches_per_sec']:,.0f}" if sim["matches_per_sec"] else "–")
+    col3.metric("Legs/s", f"{sim['legs_per_sec']:,.0f}" if sim["legs_per_sec"] else "–")
+    col4.metric("Aufnahmen/s", f"{sim['visits_per_sec']:,.0f}" if sim["visits_per_sec"] else "–")
+
+    st.subheader("⏱️ Stufen")
+    if report["stages"]:
+        st.dataframe(pd.DataFrame([
+            {"Stufe": name, "Aufrufe": s["count"], "Summe (s)": round(s["seconds"], 3),
+             "Mittel (ms)": round(s["mean"] * 1000, 1), "Max (ms)": round(s["max"] * 1000, 1)}
+            for name, s in report["stages"].items()
+        ]), hide_index=True)
+    else:
+        st.info("Noch keine Messwerte – Pipeline starten oder eine Simulation laufen lassen.")
+
+    if report["requests"]:
+        st.subheader("🌐 HTTP-Anfragen")
+        st.dataframe(pd.DataFrame([
+            {"Art": kind, "Anfragen": r["count"], "Fehler": r["errors"], "MB": round(r["bytes"] / 1e6, 2),
+             "Median (ms)": round(r["p50"] * 1000, 1), "p95 (ms)": round(r["p95"] * 1000, 1),
+             "Max (ms)": round(r["max"] * 1000, 1)}
+            for kind, r in report["requests"].items()
+        ]), hide_index=True)
+    if report["counters"]:
+        st.subheader("🔢 Zähler")
+        st.dataframe(pd.DataFrame(list(report["counters"].items()), columns=["Zähler", "Wert"]), hide_index=True)
+    for label, profile in report["profiles"].items():
+        with st.expander(f"cProfile: {label} ({profile['created']})"):
+            st.code(profile["stats"])
+
+    st.download_button("📥 Report als JSON", json.dumps(report, indent=2, ensure_ascii=False),
+                       file_name="darthub_diagnose.json", mime="application/json")
@@ -0,0 +1,172 @@
+# diagnostics.py
+"""
+Messpunkte für Pipeline und Simulation: Zeiten je Stufe, HTTP-Anfragen (Anzahl, Latenz,
+Bytes, Fehler), Zähler und Durchsatz der Monte-Carlo-Läufe (Matches, Legs, Aufnahmen pro
+Sekunde), optional cProfile-Mitschnitte.
+
+Alles landet im prozessweiten Recorder METRICS (threadsicher, Scraper-Threads schreiben
+mit). report() liefert ein JSON-fähiges dict für das Diagnose-Panel der App und den Export.
+cProfile ist aus; einschalten mit set_profiling(True) oder DARTHUB_PROFILE=1. Profiliert
+wird nur der aufrufende Thread, nicht Worker-Threads oder -Prozesse.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+REPORT_PATH = os.path.join(".cache", "diagnostics.json")
+PROFILE_DIR = os.path.join(".cache", "profiles")
+# Latenzen je Anfrageart, aus denen Median/p95 berechnet werden
+MAX_SAMPLES = 5000
+# Zeilen der cProfile-Auswertung im Report
+PROFILE_LINES = 30
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profiling = os.environ.get("DARTHUB_PROFILE", "") not in ("", "0")
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = datetime.now()
+            self.stages = {}      # name -> [anzahl, summe, maximum]
+            self.requests = {}    # art -> {"count", "errors", "bytes", "latencies"}
+            self.counters = {}
+            self.simulation = {"runs": 0, "seconds": 0.0, "matches": 0, "legs": 0,
+                               "visits": 0, "visit_seconds": 0.0}
+            self.profiles = {}
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    @contextmanager
+    def timed(self, name):
+        """Misst die Dauer des Blocks als Stufe name (auch bei Ausnahmen)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_request(self, kind, seconds, nbytes=0, status=None):
+        """Eine HTTP-Anfrage; status None oder >= 400 zählt als Fehler."""
+        with self.lock:
+            entry = self.requests.setdefault(kind, {"count": 0, "errors": 0, "bytes": 0, "latencies": []})
+            entry["count"] += 1
+            entry["bytes"] += nbytes
+            if status is None or status >= 400:
+                entry["errors"] += 1
+            if len(entry["latencies"]) < MAX_SAMPLES:
+                entry["latencies"].append(seconds)
+
+    def record_simulation(self, summary, seconds):
+        """Ein Monte-Carlo-Lauf (Zusammenfassung im Format von simulate_batch.empty_summary)."""
+        with self.lock:
+            sim = self.simulation
+            sim["runs"] += 1
+            sim["seconds"] += seconds
+            sim["matches"] += summary["simulations"]
+            sim["legs"] += summary["total_legs"]
+            visits = summary.get("total_visits", 0)
+            if visits:
+                # Aufnahmen/s nur über Engines, die Aufnahmen einzeln simulieren (nicht "legs")
+                sim["visits"] += visits
+                sim["visit_seconds"] += seconds
+
+    @contextmanager
+    def profiled(self, label):
+        """cProfile um den Block, wenn eingeschaltet; Auswertung in report()["profiles"][label]."""
+        if not self.profiling:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{label.replace(' ', '_').lower()}.prof")
+            profile.dump_stats(path)
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            with self.lock:
+                self.profiles[label] = {"path": path, "created": datetime.now().isoformat(timespec="seconds"),
+                                        "stats": text.getvalue()}
+
+    def report(self):
+        with self.lock:
+            stages = {
+                name: {"count": n, "seconds": total, "mean": total / n, "max": longest}
+                for name, (n, total, longest) in self.stages.items()
+            }
+            requests = {
+                kind: {
+                    "count": e["count"], "errors": e["errors"], "bytes": e["bytes"],
+                    "seconds": sum(e["latencies"]),
+                    "p50": _percentile(e["latencies"], 0.5), "p95": _percentile(e["latencies"], 0.95),
+                    "max": max(e["latencies"], default=None),
+                }
+                for kind, e in self.requests.items()
+            }
+            sim = dict(self.simulation)
+            for name, seconds in (("matches", sim["seconds"]), ("legs", sim["seconds"]),
+                                  ("visits", sim["visit_seconds"])):
+                sim[f"{name}_per_sec"] = sim[name] / seconds if seconds and sim[name] else None
+            return {
+                "started": self.started.isoformat(timespec="seconds"),
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "profiling": self.profiling,
+                "stages": stages,
+                "requests": requests,
+                "counters": dict(self.counters),
+                "simulation": sim,
+                "profiles": dict(self.profiles),
+            }
+
+    def save(self, path=REPORT_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+
+METRICS = Recorder()
+timed = METRICS.timed
+count = METRICS.count
+record_request = METRICS.record_request
+record_simulation = METRICS.record_simulation
+profiled = METRICS.profiled
+report = METRICS.report
+save_report = METRICS.save
+reset = METRICS.reset
+
+
+def set_profiling(enabled):
+    METRICS.profiling = bool(enabled)
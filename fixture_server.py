@@ -0,0 +1,69 @@
+# fixture_server.py
+# Lokaler Ersatz für app.dartsorakel.com: liefert die gespeicherten Seiten aus fixtures/
+# aus, damit der Scraper ohne Netz laufen kann, z. B.
+#   python fixture_server.py --port 8765
+#   python get_player_stats.py --base-url http://127.0.0.1:8765
+import os
+import re
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+STATS_PATH = re.compile(r"^/player/stats/(\d+)$")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # Spieler-IDs ohne eigene Fixture bekommen diese Seite (None = 404)
+    fallback_id = None
+
+    def do_GET(self):
+        match = STATS_PATH.match(self.path)
+        if not match:
+            self.send_error(404)
+            return
+        path = os.path.join(FIXTURE_DIR, f"player_stats_{match.group(1)}.html")
+        if not os.path.exists(path) and self.fallback_id:
+            path = os.path.join(FIXTURE_DIR, f"player_stats_{self.fallback_id}.html")
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, fallback_id=None):
+    """Startet den Server im Hintergrund-Thread. Gibt (server, base_url) zurück."""
+    handler = type("Handler", (FixtureHandler,), {"fallback_id": fallback_id})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixture-Seiten lokal ausliefern")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fallback-id", default=None, help="Fixture für unbekannte Spieler-IDs")
+    args = parser.parse_args()
+    server, url = start_server(args.port, args.fallback_id)
+    print(f"Fixture-Server läuft auf {url} (Strg+C beendet)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
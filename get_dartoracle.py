@@ -1,6 +1,10 @@
+import time
+
 import requests
 import pandas as pd
 
+import diagnostics
+
 # API-URL
 url = "https://app.dartsorakel.com/api/stats/player"
 
@@ -10,28 +14,42 @@ headers = {
     "Accept": "application/json"
 }
 
-# Anfrage senden
-r = requests.get(url, headers=headers)
-r.raise_for_status()
-
-# JSON-Daten laden
-data = r.json()
-
-# Liste mit Spielern extrahieren
-players = []
-for p in data["data"]:
-    players.append({
-        "name": p["player_name"].strip(),
-        "country": p["country"],
-        "avg": p["stat"],
-        "url": f"https://app.dartsorakel.com/player/details/{p['player_key']}"
-    })
-
-# In DataFrame umwandeln
-df = pd.DataFrame(players)
-
-# CSV speichern
-df.to_csv("players.csv", index=False, encoding="utf-8")
 
-print(f"{len(df)} Spieler gespeichert → players.csv")
-print(df.head())
+def fetch_players(api_url=url):
+    """Lädt die Spielerübersicht der API und gibt sie als DataFrame (name, country, avg, url) zurück."""
+    # Anfrage senden
+    start = time.perf_counter()
+    try:
+        r = requests.get(api_url, headers=headers)
+    except requests.RequestException:
+        diagnostics.record_request("Spielerübersicht", time.perf_counter() - start)
+        raise
+    diagnostics.record_request("Spielerübersicht", time.perf_counter() - start, len(r.content), r.status_code)
+    r.raise_for_status()
+
+    # JSON-Daten laden
+    with diagnostics.timed("Übersicht: JSON parsen"):
+        data = r.json()
+
+    # Liste mit Spielern extrahieren
+    players = []
+    for p in data["data"]:
+        players.append({
+            "name": p["player_name"].strip(),
+            "country": p["country"],
+            "avg": p["stat"],
+            "url": f"https://app.dartsorakel.com/player/details/{p['player_key']}"
+        })
+
+    # In DataFrame umwandeln
+    return pd.DataFrame(players)
+
+
+if __name__ == "__main__":
+    df = fetch_players()
+
+    # CSV speichern
+    df.to_csv("players.csv", index=False, encoding="utf-8")
+
+    print(f"{len(df)} Spieler gespeichert → players.csv")
+    print(df.head())
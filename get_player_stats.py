@@ -1,14 +1,105 @@
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+import lxml.html
 import pandas as pd
 
-def get_player_overview(player_id, player_name):
-    url = f"https://app.dartsorakel.com/player/stats/{player_id}"
-    headers = {"User-Agent": "Mozilla/5.0", "Accept": "text/html"}
-    r = requests.get(url, headers=headers)
-    r.raise_for_status()
+import diagnostics
+from scrape_cache import CACHE_PATH, ScrapeCache, content_hash
+
+BASE_URL = "https://app.dartsorakel.com"
+STATS_CSV = "all_players_stats.csv"
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept": "text/html"}
+# Statuscodes, bei denen ein erneuter Versuch sinnvoll ist
+RETRY_STATUS = {429, 500, 502, 503, 504}
+STATS_TABLE_ID = 'id="playerStatsTable"'
+# Cache nach so vielen abgerufenen Spielern zwischenspeichern
+CHECKPOINT_EVERY = 50
+
+
+class RetryableStatus(requests.HTTPError):
+    pass
+
+
+class Cancelled(Exception):
+    """Lauf auf Wunsch abgebrochen (should_stop); der Checkpoint bleibt für die Fortsetzung."""
+
+
+class RateLimiter:
+    """Begrenzt die Anfragen auf höchstens `rate` pro Sekunde (threadsicher, über alle Worker)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_session(pool_size=8):
+    """requests.Session mit Connection-Pool passend zur Anzahl paralleler Worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
 
-    soup = BeautifulSoup(r.text, "html.parser")
+
+def fetch(url, session=None, retries=3, backoff=0.5, limiter=None, timeout=20, headers=None):
+    """
+    Lädt eine Seite und gibt die Response zurück (auch 304 Not Modified).
+    Verbindungsfehler, Timeouts und 429/5xx werden mit exponentiellem Backoff
+    (backoff, 2*backoff, ...) wiederholt; andere HTTP-Fehler nicht.
+    Jeder Versuch wird in diagnostics als Anfrage "Spielerseite" erfasst (Latenz, Bytes, Status).
+    """
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.wait()
+        if attempt:
+            diagnostics.count("HTTP: Wiederholungen")
+        start = time.perf_counter()
+        try:
+            if session is not None:
+                r = session.get(url, timeout=timeout, headers=headers)
+            else:
+                r = requests.get(url, headers={**HEADERS, **(headers or {})}, timeout=timeout)
+            diagnostics.record_request("Spielerseite", time.perf_counter() - start, len(r.content), r.status_code)
+            if r.status_code in RETRY_STATUS:
+                raise RetryableStatus(f"{r.status_code} für {url}", response=r)
+            r.raise_for_status()
+            return r
+        except (requests.ConnectionError, requests.Timeout, RetryableStatus) as e:
+            if e.response is None:
+                # keine Antwort erhalten (Statusfehler sind oben schon erfasst)
+                diagnostics.record_request("Spielerseite", time.perf_counter() - start)
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+
+def fetch_html(url, session=None, retries=3, backoff=0.5, limiter=None, timeout=20):
+    return fetch(url, session=session, retries=retries, backoff=backoff, limiter=limiter, timeout=timeout).text
+
+
+def parse_player_stats_bs4(html, player_id, player_name):
+    """Liest die Tabelle #playerStatsTable mit BeautifulSoup über die ganze Seite (Referenz)."""
+    soup = BeautifulSoup(html, "html.parser")
 
     # Basisdaten
     stats = {"Id": player_id, "Name": player_name}
@@ -26,23 +117,230 @@ def get_player_overview(player_id, player_name):
     return stats
 
 
+def _stats_table_fragment(html):
+    """
+    Schneidet nur das <table id="playerStatsTable">…</table> aus dem Seitentext.
+    None, wenn die Tabelle nicht eindeutig abgegrenzt werden kann.
+    """
+    pos = html.find(STATS_TABLE_ID)
+    if pos < 0:
+        return None
+    start = html.rfind("<table", 0, pos)
+    end = html.find("</table>", pos)
+    if start < 0 or end < 0 or html.find("<table", pos, end) >= 0:
+        return None   # verschachtelte Tabelle o. ä. -> ganze Seite parsen
+    return html[start:end + len("</table>")]
+
+
+def _cell_text(td):
+    # entspricht BeautifulSoup get_text(strip=True): Textstücke einzeln strippen und verbinden
+    return "".join(t.strip() for t in td.itertext())
+
+
+def parse_player_stats(html, player_id, player_name):
+    """
+    Liest die Tabelle #playerStatsTable einer Spielerseite in ein dict.
+    Parst mit lxml nur den ausgeschnittenen Tabellen-Abschnitt statt der ganzen Seite;
+    liefert dieselben Werte wie parse_player_stats_bs4.
+    """
+    stats = {"Id": player_id, "Name": player_name}
+
+    fragment = _stats_table_fragment(html)
+    if fragment is not None:
+        table = lxml.html.fragment_fromstring(fragment)
+    else:
+        found = lxml.html.fromstring(html).xpath('//table[@id="playerStatsTable"]')
+        table = found[0] if found else None
+    tbody = table.xpath(".//tbody") if table is not None else []
+    if not tbody:
+        return stats
+
+    # wie find_all(): rekursive Suche nach Zeilen und Zellen
+    for tr in tbody[0].xpath(".//tr"):
+        tds = tr.xpath(".//td")
+        if len(tds) == 2:
+            stats[_cell_text(tds[0])] = _cell_text(tds[1])
+    return stats
+
+
+def get_player_overview(player_id, player_name, session=None, base_url=BASE_URL, retries=3, limiter=None):
+    url = f"{base_url}/player/stats/{player_id}"
+    html = fetch_html(url, session=session, retries=retries, limiter=limiter)
+    return parse_player_stats(html, player_id, player_name)
+
+
+def fetch_player_stats(player_id, player_name, cache, session=None, base_url=BASE_URL, retries=3, limiter=None):
+    """
+    Bedingter Abruf einer Spielerseite mit den Validatoren aus dem Cache.
+    Bei 304 oder unverändertem Inhalts-Hash werden die gecachten Stats ohne Parsen übernommen.
+    Gibt (stats, meta) zurück; meta enthält etag, last_modified, digest und source
+    ("fetched", "not_modified" oder "unchanged").
+    """
+    url = f"{base_url}/player/stats/{player_id}"
+    entry = cache.get(player_id)
+    r = fetch(url, session=session, retries=retries, limiter=limiter,
+              headers=cache.conditional_headers(player_id))
+    meta = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+    if r.status_code == 304 and entry:
+        meta.update(etag=meta["etag"] or entry.get("etag"),
+                    last_modified=meta["last_modified"] or entry.get("last_modified"),
+                    digest=entry.get("hash"), source="not_modified")
+        return {**entry["stats"], "Name": player_name}, meta
+
+    digest = content_hash(r.text)
+    meta["digest"] = digest
+    if entry and entry.get("hash") == digest:
+        meta["source"] = "unchanged"
+        return {**entry["stats"], "Name": player_name}, meta
+    meta["source"] = "fetched"
+    with diagnostics.timed("Stats: HTML parsen"):
+        stats = parse_player_stats(r.text, player_id, player_name)
+    return stats, meta
+
+
+def player_list(players_df):
+    """(player_id, name, avg) je Zeile von players.csv; ID aus der URL extrahiert."""
+    avgs = players_df["avg"] if "avg" in players_df.columns else [None] * len(players_df)
+    return [(str(url).split("/")[-1], name, None if pd.isna(avg) else avg)
+            for name, url, avg in zip(players_df["name"], players_df["url"], avgs)]
+
+
+def load_checkpoint(partial_path):
+    """Bereits gespeicherte Ergebnisse eines abgebrochenen Laufs (JSON-Zeilen)."""
+    results = {}
+    if not os.path.exists(partial_path):
+        return results
+    with open(partial_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                stats = json.loads(line)
+            except ValueError:
+                continue   # letzte Zeile evtl. beim Abbruch nur halb geschrieben
+            results[str(stats["Id"])] = stats
+    return results
+
+
+def scrape_all(players, output_csv=STATS_CSV, workers=8, rate=5.0, retries=3,
+               base_url=BASE_URL, progress=None, cache_path=CACHE_PATH, full=False, should_stop=None):
+    """
+    Holt die Stats aller Spieler parallel über eine gemeinsame Session.
+    Inkrementell: Spieler, deren Übersichts-avg sich seit dem letzten Lauf nicht geändert
+    hat, werden aus dem Cache übernommen; alle anderen werden bedingt abgerufen
+    (ETag/Last-Modified, Inhalts-Hash) und nur bei geändertem Inhalt neu geparst.
+    Jeder Treffer wird sofort als JSON-Zeile nach <output_csv>.partial.jsonl geschrieben;
+    diese Datei ist der Checkpoint, ein abgebrochener Lauf setzt dort wieder auf.
+    Fehler einzelner Spieler brechen den Lauf nicht ab, sondern werden gesammelt; für diese
+    Spieler werden die letzten Stats aus dem Cache übernommen (counts["stale"]), fehlen sie
+    dort, fällt der Spieler weg.
+    Am Ende wird die CSV in der Reihenfolge von `players` geschrieben
+    (output_csv=None: nur DataFrame zurückgeben, z. B. im In-Process-Pipeline-Lauf).
+    full=True ignoriert Cache und Checkpoint.
+    progress: optionaler Callback (erledigt, gesamt, name).
+    should_stop: optionale Funktion; liefert sie True, werden keine weiteren Seiten abgerufen,
+    Cache und Checkpoint gesichert und Cancelled ausgelöst (ein neuer Lauf setzt dort fort).
+    Gibt (DataFrame, failures, counts) zurück; failures = Liste (player_id, name, fehlertext),
+    counts = Anzahl Spieler je Quelle (resumed, cached, fetched, not_modified, unchanged, stale).
+    """
+    partial_path = (output_csv or STATS_CSV) + ".partial.jsonl"
+    cache = ScrapeCache(cache_path)
+    # letzte gute Stats je Spieler als Ersatz bei Fehlern, auch mit full=True
+    fallback = dict(cache.entries)
+    if full:
+        cache.entries = {}
+    results = {} if full else load_checkpoint(partial_path)
+    counts = {"resumed": 0, "cached": 0, "fetched": 0, "not_modified": 0, "unchanged": 0, "stale": 0}
+    failures = []
+
+    todo = []
+    for pid, name, avg in players:
+        if pid in results:
+            counts["resumed"] += 1
+        elif cache.is_fresh(pid, avg):
+            results[pid] = {**cache.get(pid)["stats"], "Name": name}
+            counts["cached"] += 1
+        else:
+            todo.append((pid, name, avg))
+
+    session = make_session(pool_size=workers)
+    limiter = RateLimiter(rate)
+
+    def job(player_id, name):
+        if should_stop and should_stop():
+            raise Cancelled()
+        return fetch_player_stats(player_id, name, cache, session=session, base_url=base_url,
+                                  retries=retries, limiter=limiter)
+
+    with open(partial_path, "w" if full else "a", encoding="utf-8") as partial, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(job, pid, name): (pid, name, avg) for pid, name, avg in todo}
+        for done, future in enumerate(as_completed(futures), start=1):
+            pid, name, avg = futures[future]
+            try:
+                stats, meta = future.result()
+            except Cancelled:
+                pass
+            except Exception as e:
+                failures.append((pid, name, str(e)))
+                print(f"⚠️ Fehler bei {name} (ID {pid}): {e}")
+                entry = fallback.get(str(pid))
+                if entry and entry.get("stats"):
+                    results[pid] = {**entry["stats"], "Name": name}
+                    counts["stale"] += 1
+            else:
+                results[pid] = stats
+                counts[meta["source"]] += 1
+                diagnostics.count(f"Stats: {meta['source']}")
+                cache.put(pid, avg, stats, meta["etag"], meta["last_modified"], meta["digest"])
+                partial.write(json.dumps(stats, ensure_ascii=False) + "\n")
+                partial.flush()
+                if done % CHECKPOINT_EVERY == 0:
+                    cache.save()
+            if progress:
+                progress(done, len(futures), name)
+            if should_stop and should_stop():
+                # noch nicht gestartete Abrufe verwerfen, laufende beenden sich von selbst
+                for pending in futures:
+                    pending.cancel()
+                break
+    cache.save()
+    if should_stop and should_stop():
+        raise Cancelled()
+
+    df = pd.DataFrame([results[pid] for pid, _, _ in players if pid in results])
+    if df.empty:
+        # nichts überschreiben, Teilergebnis-Datei bleibt zur Analyse liegen
+        return df, failures, counts
+    if output_csv:
+        with diagnostics.timed("Stats: CSV schreiben"):
+            df.to_csv(output_csv, sep=";", index=False, encoding="utf-8")
+    os.remove(partial_path)
+    return df, failures, counts
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spieler-Stats von dartsorakel scrapen")
+    parser.add_argument("--input", default="players.csv")
+    parser.add_argument("--output", default=STATS_CSV)
+    parser.add_argument("--workers", type=int, default=8, help="parallele Anfragen")
+    parser.add_argument("--rate", type=float, default=5.0, help="max. Anfragen pro Sekunde (0 = unbegrenzt)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--base-url", default=BASE_URL, help="z. B. lokaler Fixture-Server")
+    parser.add_argument("--full", action="store_true", help="Cache und Checkpoint ignorieren, alles neu laden")
+    args = parser.parse_args()
+
     # Spielerbasis laden
-    players_df = pd.read_csv("players.csv")
-
-    all_stats = []
-    for _, row in players_df.iterrows():
-        name = row["name"]
-        url = row["url"]
-        player_id = url.split("/")[-1]  # ID aus URL extrahieren
-        print(f"Hole Stats für {name} (ID {player_id}) ...")
-
-        stats = get_player_overview(player_id, name)
-        all_stats.append(stats)
-
-    # Alles in eine CSV
-    df = pd.DataFrame(all_stats)
-    filename = "all_players_stats.csv"
-    df.to_csv(filename, sep=";", index=False, encoding="utf-8")
-    print(f"✅ {len(df)} Spieler-Stats gespeichert in {filename}")
+    players = player_list(pd.read_csv(args.input))
+
+    def report(done, total, name):
+        print(f"[{done}/{total}] {name}")
+
+    df, failures, counts = scrape_all(players, args.output, workers=args.workers, rate=args.rate,
+                                      retries=args.retries, base_url=args.base_url, progress=report,
+                                      full=args.full)
+    if df.empty:
+        raise SystemExit(f"❌ Keine Spieler-Stats geladen ({len(failures)} Fehler) – {args.output} unverändert")
+    print(f"✅ {len(df)} Spieler-Stats gespeichert in {args.output}")
+    print("   " + ", ".join(f"{k}: {v}" for k, v in counts.items()))
+    if failures:
+        print(f"⚠️ {len(failures)} Spieler fehlgeschlagen: {', '.join(name for _, name, _ in failures)}")
     print(df.head())
@@ -0,0 +1,220 @@
+# head_to_head.py
+"""
+Vorberechnete Head-to-Head-Matrix: P(Spieler i schlägt Spieler j) für alle Paare einer
+Spielerauswahl in einem festen Format, gemittelt über beide Anwurf-Reihenfolgen.
+
+Gespeichert als .npz neben den Formdaten: probs (float32, n x n), names und die
+Modellparameter je Spieler (simulate_batch.player_key). Ein erneuter Lauf rechnet nur die
+Zeilen (und Spalten) der Spieler neu, deren Parameter sich geändert haben oder die neu
+dazugekommen sind. Die Aufnahme-Verteilungen der Spieler (eine Markov-Kette je Spieler,
+unabhängig vom Format) liegen dafür in einem eigenen Cache (CHAINS_PATH).
+"""
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from player_store import load_players, unique_players
+from simulate_batch import player_key
+from simulate_parallel import visits_distributions
+from simulate_player import player_from_row
+from solve_match import win_probability_matrix
+
+DATA_DIR = "."
+CHAINS_PATH = os.path.join(DATA_DIR, "h2h_chains.npz")
+DEFAULT_TOP = 300
+# Zeilen pro Block der Match-DP (begrenzt den Speicher: Block x n x (legs_to_win + 1)^2)
+ROW_BLOCK = 64
+
+
+def matrix_path(legs_to_win, sets_to_win=None, data_dir=DATA_DIR):
+    """Dateiname je Format, z. B. h2h_legs6.npz oder h2h_sets4_legs3.npz."""
+    name = f"h2h_legs{legs_to_win}.npz" if sets_to_win is None else f"h2h_sets{sets_to_win}_legs{legs_to_win}.npz"
+    return os.path.join(data_dir, name)
+
+
+class HeadToHead:
+    """
+    Gelesene Head-to-Head-Matrix. probability(a, b) beantwortet jede Paarung ohne Rechnen;
+    is_current(player) prüft, ob die gespeicherten Parameter noch zum Spieler passen.
+    """
+
+    def __init__(self, probs, names, params, legs_to_win, sets_to_win=None, built_at=""):
+        self.probs = probs
+        self.names = list(names)
+        self.params = params
+        self.legs_to_win = legs_to_win
+        self.sets_to_win = sets_to_win
+        self.built_at = built_at
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def probability(self, name_a, name_b):
+        """P(name_a schlägt name_b)."""
+        return float(self.probs[self.positions[name_a], self.positions[name_b]])
+
+    def is_current(self, player):
+        """True, wenn die Zeile des Spielers mit dessen aktuellen Parametern berechnet wurde."""
+        i = self.positions.get(player.name)
+        return i is not None and tuple(self.params[i]) == player_key(player)
+
+
+def load_matrix(path):
+    """Liest eine gespeicherte Matrix oder None, wenn die Datei fehlt."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        sets_to_win = int(data["sets_to_win"])
+        return HeadToHead(
+            data["probs"], data["names"].tolist(), data["params"],
+            int(data["legs_to_win"]), sets_to_win or None, str(data["built_at"]),
+        )
+
+
+def save_matrix(h2h, path):
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        probs=h2h.probs.astype(np.float32),
+        names=np.array(h2h.names, dtype=str),
+        params=np.asarray(h2h.params, dtype=np.float64),
+        legs_to_win=np.int32(h2h.legs_to_win),
+        sets_to_win=np.int32(h2h.sets_to_win or 0),
+        built_at=np.array(h2h.built_at),
+    )
+    os.replace(tmp, path)
+
+
+def select_players(df=None, top=DEFAULT_TOP, names=None, rank_by="Averages"):
+    """
+    Spielerauswahl als SimulatedPlayer: die angegebenen names (Name oder "Name (Id)") oder die
+    top besten nach rank_by. Namensvettern heißen "Name (Id)" (player_store.unique_players).
+    """
+    df = load_players() if df is None else df
+    df = unique_players(df)
+    if names is not None:
+        names = set(names)
+        df = df[df["Name"].isin(names) | df["Label"].isin(names)]
+    else:
+        ranked = df.assign(_rank_value=pd.to_numeric(df[rank_by], errors="coerce"))
+        df = ranked.sort_values("_rank_value", ascending=False, kind="stable").head(top)
+    return [player_from_row(row["Label"], row) for _, row in df.iterrows()]
+
+
+def _load_chains(path):
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as data:
+        keys, offsets = data["keys"], data["offsets"]
+        finish, alive, exp180 = data["finish"], data["alive"], data["exp180"]
+    return {
+        tuple(key): (finish[a:b], alive[a:b], exp180[a:b])
+        for key, a, b in zip(keys, offsets[:-1], offsets[1:])
+    }
+
+
+def _save_chains(chains, path):
+    keys = list(chains)
+    offsets = np.cumsum([0] + [len(chains[k][0]) for k in keys])
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        keys=np.array(keys, dtype=np.float64).reshape(len(keys), -1),
+        offsets=offsets,
+        finish=np.concatenate([chains[k][0] for k in keys]) if keys else np.zeros(0),
+        alive=np.concatenate([chains[k][1] for k in keys]) if keys else np.zeros(0),
+        exp180=np.concatenate([chains[k][2] for k in keys]) if keys else np.zeros(0),
+    )
+    os.replace(tmp, path)
+
+
+def player_chains(players, workers=None, chains_path=CHAINS_PATH):
+    """
+    visits_distribution je Spieler: aus dem Ketten-Cache, fehlende parallel berechnet.
+    Der Cache behält nur die Ketten der übergebenen Spieler.
+    """
+    cached = _load_chains(chains_path)
+    missing = [p for p in players if player_key(p) not in cached]
+    if missing:
+        for player, chain in zip(missing, visits_distributions(missing, workers)):
+            cached[player_key(player)] = chain
+    chains = {player_key(p): cached[player_key(p)] for p in players}
+    if missing or len(chains) != len(cached):
+        _save_chains(chains, chains_path)
+    return [chains[player_key(p)] for p in players]
+
+
+def build_matrix(players, legs_to_win, sets_to_win=None, path=None, workers=None, full=False,
+                 chains_path=CHAINS_PATH, progress=None):
+    """
+    Baut bzw. aktualisiert die Matrix für players im Format First to legs_to_win
+    (bzw. sets_to_win Sets à legs_to_win Legs) und speichert sie unter path.
+    Ohne full werden nur Zeilen neu berechnet, deren Spieler neu sind oder andere
+    Parameter haben als beim letzten Lauf; alle übrigen Paare werden übernommen.
+    progress: optionaler Callback mit dem erledigten Anteil (0..1).
+    Gibt (HeadToHead, Anzahl neu berechneter Spieler) zurück.
+    """
+    path = path or matrix_path(legs_to_win, sets_to_win)
+    n = len(players)
+    names = [p.name for p in players]
+    params = np.array([player_key(p) for p in players], dtype=np.float64)
+
+    old = None if full else load_matrix(path)
+    if old is not None and (old.legs_to_win, old.sets_to_win) != (legs_to_win, sets_to_win):
+        old = None
+    keep = [i for i, p in enumerate(players) if old is not None and old.is_current(p)]
+    keep_set = set(keep)
+    changed = [i for i in range(n) if i not in keep_set]
+
+    probs = np.full((n, n), 0.5, dtype=np.float32)
+    if keep:
+        old_pos = [old.positions[names[i]] for i in keep]
+        probs[np.ix_(keep, keep)] = old.probs[np.ix_(old_pos, old_pos)]
+
+    if changed:
+        distributions = player_chains(players, workers, chains_path)
+        for start in range(0, len(changed), ROW_BLOCK):
+            rows = changed[start:start + ROW_BLOCK]
+            # Ausbullen: Mittel aus "i beginnt" und "j beginnt"
+            block = 0.5 * (
+                win_probability_matrix(players, legs_to_win, sets_to_win, distributions, rows, True)
+                + win_probability_matrix(players, legs_to_win, sets_to_win, distributions, rows, False)
+            )
+            probs[rows, :] = block
+            probs[:, rows] = 1.0 - block.T
+            if progress:
+                progress(min(1.0, (start + len(rows)) / len(changed)))
+        np.fill_diagonal(probs, 0.5)
+
+    h2h = HeadToHead(probs, names, params, legs_to_win, sets_to_win,
+                     datetime.now().isoformat(timespec="seconds"))
+    save_matrix(h2h, path)
+    return h2h, len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Head-to-Head-Matrix für die besten Spieler berechnen")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Anzahl Spieler (nach --rank-by)")
+    parser.add_argument("--rank-by", default="Averages")
+    parser.add_argument("--legs", type=int, default=6, help="Legs zum Sieg (bei Sets: je Set)")
+    parser.add_argument("--sets", type=int, default=None, help="Sets zum Sieg (Standard: Best of Legs)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--full", action="store_true", help="alles neu berechnen")
+    args = parser.parse_args()
+
+    players = select_players(top=args.top, rank_by=args.rank_by)
+    path = matrix_path(args.legs, args.sets)
+    h2h, recomputed = build_matrix(players, args.legs, args.sets, path=path, workers=args.workers,
+                                   full=args.full)
+    print(f"✅ {path}: {len(h2h)} Spieler, {recomputed} Zeilen neu berechnet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# normalize_stats.py
+# Vektorisierte Umwandlung der Stat-Spalten ("1,054", "41.96%", "1.054,5") in Zahlen.
+# Die skalaren Funktionen parse_number (darthub) und clean_number (calculate_form)
+# bleiben die Referenz; tests/test_normalize_stats.py prüft auf den mitgelieferten CSVs,
+# dass die vektorisierten Varianten exakt dieselben Werte liefern.
+import re
+
+import numpy as np
+import pandas as pd
+
+# Textspalten; alle übrigen Stat-Spalten werden numerisch
+TEXT_COLUMNS = {"Name"}
+# Zahl nach dem Entfernen von Fremdzeichen, wie sie float() akzeptiert
+NUMBER_PATTERN = r"-?(?:\d+\.?\d*|\.\d+)"
+
+
+def parse_number(x, default=None):
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return default
+    try:
+        s = str(x).strip()
+        if s == "":
+            return default
+        s = re.sub(r"[^\d\.,\-]", "", s)
+        if "." in s and "," in s:
+            if s.find(".") < s.find(","):
+                s = s.replace(".", "").replace(",", ".")
+            else:
+                s = s.replace(",", "")
+        elif "," in s and "." not in s:
+            s = s.replace(",", ".")
+        return float(s)
+    except (ValueError, TypeError):
+        return default
+
+
+def to_number(x, default=None):
+    """Wie parse_number, aber Zahlen aus dem typisierten Store ohne Umweg über Strings."""
+    if isinstance(x, (int, float, np.integer, np.floating)) and not isinstance(x, bool):
+        return default if pd.isna(x) else float(x)
+    return parse_number(x, default)
+
+
+def _as_text(series):
+    # Werte wie str(x) behandeln, fehlende Werte (NaN/None) bleiben fehlend
+    return series.where(series.isna(), series.astype(str))
+
+
+def parse_numbers(series, default=None):
+    """
+    Vektorisierte Variante von parse_number für eine ganze Spalte:
+    Fremdzeichen entfernen, bei "." und "," entscheidet die Reihenfolge
+    (1.054,5 -> 1054.5; 1,054.5 -> 1054.5), ein einzelnes "," ist Dezimalkomma.
+    Nicht lesbare Werte werden zu default (None -> NaN).
+    """
+    s = _as_text(series).str.strip()
+    s = s.str.replace(r"[^\d\.,\-]", "", regex=True)
+    dot = s.str.find(".")
+    comma = s.str.find(",")
+    both = (dot >= 0) & (comma >= 0)
+    european = both & (dot < comma)
+    s = s.mask(european, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    s = s.mask(both & ~european, s.str.replace(",", "", regex=False))
+    s = s.mask((comma >= 0) & (dot < 0), s.str.replace(",", ".", regex=False))
+    # nur gültige Zahlen über float() umwandeln (exakt gerundet wie parse_number;
+    # pd.to_numeric weicht bei langen Nachkommastellen um 1 ulp ab)
+    valid = s.str.fullmatch(NUMBER_PATTERN).fillna(False).to_numpy(dtype=bool)
+    values = np.full(len(s), np.nan)
+    values[valid] = s.to_numpy(dtype=object)[valid].astype(float)
+    values = pd.Series(values, index=series.index)
+    if default is not None:
+        values = values.fillna(float(default))
+    return values
+
+
+def clean_numbers(series):
+    """
+    Vektorisierte Variante von pd.to_numeric(series.apply(clean_number), errors="coerce"):
+    Tausender-Kommas und Prozentzeichen entfernen, Prozentwerte bleiben in Prozent.
+    Bereits numerische Spalten werden unverändert zurückgegeben.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    s = _as_text(series)
+    s = s.str.replace(",", "", regex=False).str.replace("%", "", regex=False).str.strip()
+    return pd.to_numeric(s, errors="coerce")
+
+
+def normalize_frame(df, text_columns=TEXT_COLUMNS):
+    """
+    Wandelt alle Text-Stat-Spalten eines Frames in einem Durchgang um: die Spalten werden
+    zu einer Serie zusammengelegt, einmal mit clean_numbers bereinigt und wieder aufgeteilt.
+    Spalten, in denen dabei Werte verloren gingen (nicht-numerischer Inhalt), bleiben Text.
+    """
+    df = df.copy()
+    cols = [c for c in df.columns if c not in text_columns and not pd.api.types.is_numeric_dtype(df[c])]
+    if not cols:
+        return df
+    block = df[cols]
+    flat = pd.Series(block.to_numpy(dtype=object).ravel())
+    cleaned = clean_numbers(flat).to_numpy(dtype=float).reshape(block.shape)
+    lost = np.isnan(cleaned).sum(axis=0) > block.isna().to_numpy().sum(axis=0)
+    for i, col in enumerate(cols):
+        if not lost[i]:
+            df[col] = cleaned[:, i]
+    return df
@@ -0,0 +1,195 @@
+# pipeline.py
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import diagnostics
+from get_dartoracle import fetch_players
+from get_player_stats import STATS_CSV, Cancelled, player_list, scrape_all
+from calculate_form import add_form
+from player_store import STORE_PATH, write_store
+from snapshot_store import HISTORY_DIR, commit_snapshot, discard_snapshot, prepare_snapshot, with_form
+
+PLAYERS_CSV = "players.csv"
+FORM_CSV = "all_players_with_form.csv"
+# Sperrdatei: höchstens ein Pipeline-Lauf gleichzeitig (App-Sitzungen und Kommandozeile)
+LOCK_PATH = os.path.join(".cache", "pipeline.lock")
+
+STAGES = [
+    "Spielerübersicht scrapen",
+    "Spieler-Stats scrapen",
+    "Form berechnen",
+]
+
+
+class PipelineBusy(RuntimeError):
+    pass
+
+
+# path -> offener Dateideskriptor der gehaltenen Sperre
+_LOCKS = {}
+
+
+def acquire_lock(path=LOCK_PATH):
+    """
+    Exklusive Sperre für einen Pipeline-Lauf: fcntl.flock auf die Sperrdatei, die PID darin
+    dient nur der Meldung. Hält ein anderer Lauf (auch im selben Prozess) die Sperre, wird
+    PipelineBusy ausgelöst. Das Betriebssystem gibt die Sperre mit dem Ende des Prozesses frei,
+    eine liegengebliebene Datei oder eine wiederverwendete PID blockiert also nie.
+    Freigeben mit release_lock.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        holder = os.read(fd, 32).decode("ascii", "replace").strip()
+        os.close(fd)
+        raise PipelineBusy(f"Pipeline läuft bereits (Prozess {holder or '?'})") from None
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode("ascii"))
+    _LOCKS[path] = fd
+
+
+def release_lock(path=LOCK_PATH):
+    """Gibt die Sperre frei; die Datei bleibt liegen (Löschen wäre ein Wettlauf mit dem nächsten Lauf)."""
+    fd = _LOCKS.pop(path, None)
+    if fd is not None:
+        os.ftruncate(fd, 0)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+@contextmanager
+def pipeline_lock(path=LOCK_PATH):
+    acquire_lock(path)
+    try:
+        yield
+    finally:
+        release_lock(path)
+
+
+def _write_csv(df, path):
+    """Atomar (tmp-Datei + rename): Leser sehen die alte oder die neue Datei, nie eine halbe."""
+    tmp = path + ".tmp"
+    df.to_csv(tmp, sep=";", index=False, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def run_pipeline(progress=None, log=None, keep_intermediate=False, output_csv=FORM_CSV,
+                 store_path=STORE_PATH, should_stop=None, history_dir=HISTORY_DIR, **scrape_options):
+    """
+    Führt alle Schritte in einem Prozess aus und reicht die DataFrames im Speicher weiter.
+    Gespeichert wird nur das Endergebnis (output_csv und der typisierte Store); players.csv und
+    all_players_stats.csv nur mit keep_intermediate=True.
+    progress(stage, total, fraction, message): Fortschritt je Stufe (stage ab 1, fraction 0..1).
+    log(text): Meldungen für die Oberfläche.
+    scrape_options: werden an get_player_stats.scrape_all durchgereicht (workers, rate, ...).
+    should_stop: optionale Funktion für den Abbruch; geprüft zwischen den Stufen und je
+    Spielerseite, bei True wird get_player_stats.Cancelled ausgelöst und nichts veröffentlicht.
+    Die Ergebnisse werden erst am Ende und atomar ersetzt (Form-CSV, dann Store).
+    history_dir: Snapshot-Store (snapshot_store), der Scrape wird dort als neue Version
+    angehängt, erst nachdem Form-CSV und Store geschrieben sind; Form Decayed und Form Rolling
+    kommen von dort. None = keine Historie.
+    Gibt (DataFrame mit Form, timings) zurück; timings = Liste (Stufe, Sekunden).
+    Stufenzeiten, Anfragen und Teilschritte landen zusätzlich in diagnostics.METRICS.
+    """
+    with diagnostics.profiled("Pipeline"):
+        return _run_pipeline(progress, log, keep_intermediate, output_csv, store_path, should_stop,
+                             history_dir, scrape_options)
+
+
+def _run_pipeline(progress, log, keep_intermediate, output_csv, store_path, should_stop, history_dir,
+                  scrape_options):
+    total = len(STAGES)
+    timings = []
+    scraped_at = datetime.now()
+
+    def report(stage, fraction, message=""):
+        if progress:
+            progress(stage, total, fraction, message)
+
+    def say(text):
+        if log:
+            log(text)
+        else:
+            print(text)
+
+    def check_cancel():
+        if should_stop and should_stop():
+            raise Cancelled()
+
+    # 1) Spielerübersicht
+    report(1, 0.0, STAGES[0])
+    start = time.perf_counter()
+    players_df = fetch_players()
+    if keep_intermediate:
+        players_df.to_csv(PLAYERS_CSV, index=False, encoding="utf-8")
+    timings.append((STAGES[0], time.perf_counter() - start))
+    say(f"{len(players_df)} Spieler in der Übersicht")
+    report(1, 1.0, STAGES[0])
+
+    # 2) Spieler-Stats
+    check_cancel()
+    report(2, 0.0, STAGES[1])
+    start = time.perf_counter()
+    stats_df, failures, counts = scrape_all(
+        player_list(players_df),
+        output_csv=STATS_CSV if keep_intermediate else None,
+        progress=lambda done, n, name: report(2, done / max(1, n), name),
+        should_stop=should_stop,
+        **scrape_options,
+    )
+    timings.append((STAGES[1], time.perf_counter() - start))
+    say(f"{len(stats_df)} Spieler-Stats ({', '.join(f'{k}: {v}' for k, v in counts.items())})")
+    if failures:
+        say(f"⚠️ {len(failures)} Spieler fehlgeschlagen: {', '.join(name for _, name, _ in failures)}")
+    if stats_df.empty:
+        raise RuntimeError("Keine Spieler-Stats geladen – bestehende Daten bleiben unverändert")
+    report(2, 1.0, STAGES[1])
+
+    # 3) Form
+    check_cancel()
+    report(3, 0.0, STAGES[2])
+    start = time.perf_counter()
+    form_df = add_form(stats_df)
+    check_cancel()
+    # die neue Version der Historie gilt erst, wenn Form-CSV und Store geschrieben sind
+    snapshot = None
+    if history_dir:
+        snapshot = prepare_snapshot(stats_df, scraped_at, source="pipeline", directory=history_dir)
+        form_df = with_form(form_df, form=snapshot["form"])
+    try:
+        check_cancel()
+        with diagnostics.timed("Form: CSV schreiben"):
+            _write_csv(form_df, output_csv)
+        with diagnostics.timed("Store schreiben"):
+            write_store(form_df, store_path, scraped_at=scraped_at, source="pipeline")
+    except BaseException:
+        if snapshot:
+            discard_snapshot(snapshot)
+        raise
+    if snapshot:
+        with diagnostics.timed("Snapshot übernehmen"):
+            entry = commit_snapshot(snapshot)
+        say(f"Historie v{entry['version']}: {entry['changed_players']} Spieler, {entry['cells']} Zellen geändert")
+    timings.append((STAGES[2], time.perf_counter() - start))
+    report(3, 1.0, STAGES[2])
+
+    for stage, seconds in timings:
+        diagnostics.METRICS.add_time(stage, seconds)
+        say(f"⏱️ {stage}: {seconds:.2f} s")
+    return form_df, timings
+
+
+if __name__ == "__main__":
+    with pipeline_lock():
+        run_pipeline(
+            progress=lambda stage, total, fraction, message: print(f"[{stage}/{total}] {fraction:5.1%} {message}"),
+            keep_intermediate=True,
+        )
+    print(f"Diagnose-Report: {diagnostics.save_report()}")
@@ -0,0 +1,117 @@
+# pipeline_job.py
+"""
+Pipeline als Hintergrund-Job für die App: run_pipeline läuft in einem eigenen Thread, die
+Oberfläche liest Fortschritt und Log laufend über snapshot() und kann abbrechen.
+Pro Prozess gibt es höchstens einen Job (start_job gibt einen laufenden zurück, statt einen
+zweiten zu starten); über die Sperrdatei (pipeline.acquire_lock) auch nicht parallel zur
+Kommandozeile.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+from get_player_stats import Cancelled
+from pipeline import STAGES, acquire_lock, release_lock, run_pipeline
+
+# Zeilen, die der Job vom Log behält
+LOG_LINES = 200
+
+_ids = itertools.count(1)
+_guard = threading.Lock()
+_current = None
+
+
+class PipelineJob:
+    """
+    Ein Pipeline-Lauf im Hintergrund. status: "running", "done", "failed" oder "cancelled".
+    Alle Felder werden vom Job-Thread geschrieben und nur über snapshot() gelesen.
+    """
+
+    def __init__(self, **options):
+        self.id = next(_ids)
+        self.options = options
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.status = "running"
+        self.stage, self.fraction, self.message = 1, 0.0, STAGES[0]
+        self.log = deque(maxlen=LOG_LINES)
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-job-{self.id}", daemon=True)
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    def cancel(self):
+        """Abbruch anfordern; der Job endet nach den laufenden Seitenabrufen mit "cancelled"."""
+        self.cancel_event.set()
+
+    def _progress(self, stage, total, fraction, message):
+        with self.lock:
+            self.stage, self.fraction, self.message = stage, fraction, message
+
+    def _log(self, text):
+        with self.lock:
+            self.log.append(text)
+
+    def _finish(self, status, error=None):
+        with self.lock:
+            self.status, self.error, self.finished = status, error, time.time()
+
+    def _run(self):
+        try:
+            run_pipeline(progress=self._progress, log=self._log,
+                         should_stop=self.cancel_event.is_set, **self.options)
+        except Cancelled:
+            self._log("⏹️ Abgebrochen – bisherige Daten bleiben aktiv, der nächste Lauf setzt fort")
+            self._finish("cancelled")
+        except Exception as e:
+            self._finish("failed", str(e))
+        else:
+            self._finish("done")
+        finally:
+            release_lock()
+
+    def snapshot(self):
+        """Konsistenter Zustand für die Oberfläche (dict, Log als Liste)."""
+        with self.lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "stages": len(STAGES),
+                "fraction": self.fraction,
+                "value": ((self.stage - 1) + self.fraction) / len(STAGES),
+                "message": self.message,
+                "log": list(self.log),
+                "error": self.error,
+                "seconds": (self.finished or time.time()) - self.started,
+                "cancelling": self.cancel_event.is_set() and self.status == "running",
+            }
+
+
+def current_job():
+    """Der laufende oder zuletzt beendete Job dieses Prozesses (oder None)."""
+    return _current
+
+
+def start_job(**options):
+    """
+    Startet run_pipeline(**options) im Hintergrund. Läuft in diesem Prozess schon ein Job
+    (z. B. aus einer anderen Sitzung), wird dieser zurückgegeben statt einen zweiten zu starten.
+    Hält ein anderer Prozess die Sperre, wird pipeline.PipelineBusy ausgelöst.
+    Gibt (job, neu_gestartet) zurück.
+    """
+    global _current
+    with _guard:
+        if _current is not None and _current.running:
+            return _current, False
+        acquire_lock()   # PipelineBusy hier, nicht erst im Thread; freigegeben vom Job
+        job = PipelineJob(**options)
+        _current = job
+        job.thread.start()
+        return job, True
+
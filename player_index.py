@@ -0,0 +1,73 @@
+# player_index.py
+from bisect import bisect_left
+
+# Länge der Teilstrings im Suchindex (kürzere Anfragen über Unigramme/Bigramme)
+GRAM = 3
+
+
+class PlayerIndex:
+    """
+    Nachschlage-Index über den Spieler-Frame: Name -> Zeile, sortierte Namensliste
+    und Präfix-/Teilstring-Suche (Groß-/Kleinschreibung egal) für die Sidebar-Suche.
+    Präfixe über binäre Suche auf den sortierten Kleinbuchstaben-Namen, Teilstrings über
+    eine Tabelle n-Gramm -> Positionen (n = 1..GRAM), längere Anfragen als Schnitt ihrer
+    Trigramme mit anschließender Prüfung der wenigen Kandidaten.
+    Wird einmal pro Datenstand gebaut und danach nur gelesen (sicher über Sitzungen geteilt).
+    """
+
+    def __init__(self, df, name_col="Name"):
+        self.df = df
+        self.positions = {}
+        for pos, name in enumerate(df[name_col]):
+            if isinstance(name, str) and name not in self.positions:
+                self.positions[name] = pos
+        # Reihenfolge wie in der Datei (nach Average sortiert) und alphabetisch
+        self.ordered_names = list(self.positions)
+        self.names = sorted(self.ordered_names)
+        self._lower = [n.lower() for n in self.names]
+        # für die Präfixsuche: (kleingeschrieben, Position in names), sortiert
+        by_lower = sorted((low, i) for i, low in enumerate(self._lower))
+        self._keys = [low for low, _ in by_lower]
+        self._key_positions = [i for _, i in by_lower]
+        grams = {}
+        for i, low in enumerate(self._lower):
+            for n in range(1, GRAM + 1):
+                for start in range(len(low) - n + 1):
+                    grams.setdefault(low[start:start + n], set()).add(i)
+        self._grams = {gram: frozenset(found) for gram, found in grams.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def row(self, name):
+        """Erste Zeile des Spielers (wie df[df["Name"] == name].iloc[0])."""
+        return self.df.iloc[self.positions[name]]
+
+    def prefix(self, query):
+        """Alle Namen, die mit query beginnen, alphabetisch (binäre Suche)."""
+        q = query.lower()
+        start = bisect_left(self._keys, q)
+        end = bisect_left(self._keys, q + "\U0010ffff", lo=start)
+        return [self.names[i] for i in sorted(self._key_positions[start:end])]
+
+    def search(self, query):
+        """
+        Alle Namen, die query enthalten: zuerst die, die damit beginnen (prefix), dann die
+        übrigen, jeweils alphabetisch.
+        """
+        q = query.lower()
+        if not q:
+            return self.names
+        if len(q) <= GRAM:
+            found = self._grams.get(q, frozenset())
+        else:
+            postings = sorted((self._grams.get(q[i:i + GRAM], frozenset())
+                               for i in range(len(q) - GRAM + 1)), key=len)
+            found = frozenset.intersection(*postings)
+            found = {i for i in found if q in self._lower[i]}
+        first = self.prefix(q)
+        starts = set(first)
+        return first + [self.names[i] for i in sorted(found) if self.names[i] not in starts]
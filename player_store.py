@@ -0,0 +1,102 @@
+# player_store.py
+import os
+import json
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from normalize_stats import normalize_frame
+
+STORE_PATH = "all_players.parquet"
+CSV_FILE = "all_players_with_form.csv"
+SCHEMA_VERSION = 1
+
+
+def clean_stats(df):
+    """
+    Wandelt alle Stat-Spalten ("1,054", "41.96%", "170") in Zahlen um (normalize_frame).
+    Prozentwerte bleiben in Prozent (41.96), ganzzahlige Spalten werden Int64.
+    Spalten, die sich nicht vollständig umwandeln lassen, bleiben Text.
+    """
+    df = normalize_frame(df)
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]):
+            non_null = df[col].dropna()
+            if len(non_null) and (non_null == non_null.round()).all() and non_null.abs().max() < 2**53:
+                df[col] = df[col].astype("Int64")
+    return df
+
+
+def write_store(df, path=STORE_PATH, scraped_at=None, source=None):
+    """
+    Schreibt den gesäuberten Spieler-Frame als Parquet. In den Schema-Metadaten stehen
+    schema_version, scraped_at (ISO-Zeitpunkt) und die Quelle.
+    """
+    table = pa.Table.from_pandas(clean_stats(df), preserve_index=False)
+    meta = {
+        "schema_version": str(SCHEMA_VERSION),
+        "scraped_at": (scraped_at or datetime.now()).isoformat(timespec="seconds"),
+        "source": source or "",
+    }
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"darthub": json.dumps(meta).encode("utf-8"),
+    })
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return meta
+
+
+def store_metadata(path=STORE_PATH):
+    """Metadaten des Stores (schema_version, scraped_at, source) oder None."""
+    if not os.path.exists(path):
+        return None
+    raw = (pq.read_schema(path).metadata or {}).get(b"darthub")
+    return json.loads(raw) if raw else None
+
+
+def load_store(path=STORE_PATH, columns=None):
+    """Liest den Store; columns lädt nur die angegebenen Spalten (fehlende werden ignoriert)."""
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in columns if c in available]
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def load_players(columns=None, path=STORE_PATH, csv_file=CSV_FILE):
+    """
+    Spielerdaten für die App. Fällt nur auf die CSV zurück, wenn noch kein Store
+    existiert (erster Start) oder die CSV neuer ist; der Store wird dann daraus gebaut.
+    """
+    meta = store_metadata(path)
+    stale = (
+        meta is None
+        or int(meta.get("schema_version", 0)) != SCHEMA_VERSION
+        or (os.path.exists(csv_file) and os.path.getmtime(csv_file) > os.path.getmtime(path))
+    )
+    if stale:
+        df = pd.read_csv(csv_file, sep=";")
+        df.columns = [c.strip() for c in df.columns]
+        write_store(df, path, scraped_at=datetime.fromtimestamp(os.path.getmtime(csv_file)), source=csv_file)
+    return load_store(path, columns)
+
+
+def unique_players(df):
+    """
+    Eine Zeile je Spieler: über die Id entdoppelt (Namensvettern bleiben getrennt), Zeilen ohne
+    Id über den Namen. Zusätzliche Spalte Label als eindeutiger Anzeigename: der Name, bei
+    Namensvettern "Name (Id)".
+    """
+    df = df.dropna(subset=["Name"])
+    if "Id" not in df.columns:
+        return df.drop_duplicates("Name").assign(Label=df["Name"].astype(str))
+    ids = pd.to_numeric(df["Id"], errors="coerce").astype("Int64").astype("string")
+    key = ids.fillna("Name:" + df["Name"].astype(str))
+    df = df.assign(_key=key, _id=ids).drop_duplicates("_key")
+    label = df["Name"].astype(str)
+    namesake = label.duplicated(keep=False) & df["_id"].notna()
+    label = label.where(~namesake, label + " (" + df["_id"].astype(str) + ")")
+    return df.assign(Label=label).drop(columns=["_key", "_id"])
@@ -0,0 +1,152 @@
+# result_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+from simulate_batch import player_key
+from simulate_parallel import run_parallel
+
+RESULTS_DIR = os.path.join(".cache", "sim_results")
+FORM_CSV = "all_players_with_form.csv"
+
+
+def data_version(path=FORM_CSV):
+    """Stand der Spielerdaten (Änderungszeit der Form-CSV); ändert sich mit jedem Pipeline-Lauf."""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def result_key(player1, player2, legs_to_win, sets_to_win, simulations, seed, engine):
+    """Schlüssel eines Monte-Carlo-Laufs: Modellparameter beider Spieler, Format, Anzahl, Seed, Engine."""
+    return (player_key(player1), player_key(player2), legs_to_win, sets_to_win, simulations, seed, engine)
+
+
+def _to_json(summary):
+    return {**summary, "players": list(summary["players"])}
+
+
+def _from_json(data):
+    data["players"] = tuple(data["players"])
+    data["scorelines"] = Counter(data["scorelines"])
+    data["set_scorelines"] = Counter(data["set_scorelines"])
+    return data
+
+
+def _renamed(summary, names):
+    """Zusammenfassung mit den Namen des aktuellen Aufrufs (der Schlüssel enthält keine Namen)."""
+    old = summary["players"]
+    if tuple(old) == tuple(names):
+        return summary
+    mapping = dict(zip(old, names))
+    out = dict(summary, players=tuple(names))
+    for field in ("wins", "total_180s"):
+        out[field] = {mapping[name]: value for name, value in summary[field].items()}
+    return out
+
+
+class ResultCache:
+    """
+    Cache für Monte-Carlo-Zusammenfassungen (simulate_batch.empty_summary) vor run_parallel.
+    Im Speicher LRU mit max_entries Einträgen, optional zusätzlich als JSON-Dateien in
+    disk_dir. Ändert sich data_version() (neuer Pipeline-Lauf), werden beide Ebenen geleert.
+    Threadsicher: die App teilt eine Instanz über alle Sitzungen (st.cache_resource).
+    """
+
+    def __init__(self, max_entries=128, disk_dir=None, version_path=FORM_CSV):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.version_path = version_path
+        self.version = data_version(version_path)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    def _check_version(self):
+        version = data_version(self.version_path)
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def _file(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def get(self, key):
+        """Gespeicherte Zusammenfassung oder None."""
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        self._check_version()
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if self.disk_dir and os.path.exists(self._file(key)):
+            try:
+                with open(self._file(key), encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if data and data.get("version") == self.version and data.get("key") == repr(key):
+                summary = _from_json(data["summary"])
+                self._remember(key, summary)
+                self.hits += 1
+                return summary
+        self.misses += 1
+        return None
+
+    def _remember(self, key, summary):
+        self.entries[key] = summary
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def put(self, key, summary):
+        with self.lock:
+            self._put(key, summary)
+
+    def _put(self, key, summary):
+        self._check_version()
+        self._remember(key, summary)
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._file(key)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "key": repr(key), "summary": _to_json(summary)},
+                          f, ensure_ascii=False)
+            os.replace(tmp, path)
+
+    def clear(self):
+        """Leert Speicher und Festplatte (z. B. nach einem Pipeline-Lauf)."""
+        with self.lock:
+            self.entries.clear()
+            if self.disk_dir and os.path.isdir(self.disk_dir):
+                for name in os.listdir(self.disk_dir):
+                    if name.endswith(".json"):
+                        try:
+                            os.remove(os.path.join(self.disk_dir, name))
+                        except FileNotFoundError:
+                            pass
+
+
+def run_cached(cache, player1, player2, legs_to_win, simulations, workers=None, seed=None,
+               engine="legs", progress=None, sets_to_win=None):
+    """
+    run_parallel mit Ergebnis-Cache: gleiche Spielerparameter, Format, Anzahl, Seed und
+    Engine liefern die gespeicherte Zusammenfassung ohne neue Simulation.
+    Gibt (summary, aus_dem_cache) zurück.
+    """
+    key = result_key(player1, player2, legs_to_win, sets_to_win, simulations, seed, engine)
+    summary = cache.get(key)
+    if summary is not None:
+        if progress:
+            progress(1.0)
+        return _renamed(summary, (player1.name, player2.name)), True
+    summary = run_parallel(player1, player2, legs_to_win, simulations, workers=workers, seed=seed,
+                           engine=engine, progress=progress, sets_to_win=sets_to_win)
+    cache.put(key, summary)
+    return summary, False
@@ -0,0 +1,64 @@
+# scrape_cache.py
+import os
+import json
+import hashlib
+
+CACHE_PATH = os.path.join(".cache", "player_stats_cache.json")
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ScrapeCache:
+    """
+    Persistenter Cache je Spieler-URL: HTTP-Validatoren (ETag/Last-Modified),
+    Inhalts-Hash, der Übersichts-avg aus players.csv und die zuletzt geparsten Stats.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # defekter Cache -> wie ein leerer behandeln
+                self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(str(key))
+
+    def is_fresh(self, key, avg):
+        """True, wenn sich der Übersichts-avg seit dem letzten Scrape nicht geändert hat."""
+        entry = self.get(key)
+        return bool(entry) and avg is not None and entry.get("avg") == str(avg) and "stats" in entry
+
+    def conditional_headers(self, key):
+        entry = self.get(key) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, key, avg, stats, etag=None, last_modified=None, digest=None):
+        self.entries[str(key)] = {
+            "avg": None if avg is None else str(avg),
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": digest,
+            "stats": stats,
+        }
+
+    def save(self):
+        """Atomar schreiben (tmp-Datei + rename), damit ein Abbruch den Cache nicht zerstört."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -0,0 +1,101 @@
+# simulate_adaptive.py
+"""
+Adaptiver Monte Carlo: simuliert in wachsenden Blöcken, bis das Konfidenzintervall der
+Siegwahrscheinlichkeit schmal genug ist und sich die Endstands-Verteilung nicht mehr
+merklich ändert — oder das Zeitbudget bzw. die Maximalanzahl erreicht ist.
+Einseitige Paarungen sind so nach wenigen hundert Matches entschieden, knappe laufen länger.
+"""
+import math
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+import diagnostics
+from simulate_batch import empty_summary, merge_summaries, play_matches_batch, play_matches_legs
+
+FIRST_BATCH = 500
+MAX_BATCH = 50000
+
+
+def wilson_interval(wins, n, confidence=0.95):
+    """Wilson-Intervall für eine Siegquote (auch bei Quoten nahe 0 oder 1 brauchbar)."""
+    if n <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    p = wins / n
+    denom = 1.0 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1.0 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def scoreline_change(before, after):
+    """Totalvariationsabstand zweier Endstands-Histogramme (Counter), 0 = identisch."""
+    n_before, n_after = sum(before.values()), sum(after.values())
+    if not n_before or not n_after:
+        return 1.0
+    return 0.5 * sum(abs(before[k] / n_before - after[k] / n_after) for k in set(before) | set(after))
+
+
+def run_adaptive(player1, player2, legs_to_win, precision=0.01, confidence=0.95, time_budget=10.0,
+                 max_simulations=1_000_000, scoreline_tolerance=0.01, seed=None, engine="legs",
+                 sets_to_win=None, progress=None):
+    """
+    Simuliert Blöcke (500, 1000, 2000, ... Matches) bis
+    - die halbe Breite des Konfidenzintervalls der Siegwahrscheinlichkeit von P1 <= precision
+      ist und sich die Endstands-Verteilung im letzten Block um höchstens scoreline_tolerance
+      (Totalvariation) geändert hat, oder
+    - time_budget Sekunden bzw. max_simulations Matches erreicht sind.
+    Jeder Block hat einen eigenen Seed-Strom aus SeedSequence(seed), gleiche Argumente
+    liefern also dieselbe Blockfolge.
+    progress: optionaler Callback mit einem geschätzten Anteil (0..1).
+    Gibt eine Zusammenfassung (simulate_batch.empty_summary) mit zusätzlichem Eintrag
+    "adaptive" zurück: interval, confidence, halfwidth, scoreline_change, stopped
+    ("precision", "time" oder "max") und seconds.
+    """
+    play = play_matches_legs if engine == "legs" else play_matches_batch
+    seeds = np.random.SeedSequence(seed)
+    summary = empty_summary(player1.name, player2.name)
+    start = time.perf_counter()
+    batch = FIRST_BATCH
+
+    while True:
+        size = min(batch, max_simulations - summary["simulations"])
+        part = play(player1, player2, legs_to_win, size,
+                    rng=np.random.default_rng(seeds.spawn(1)[0]), sets_to_win=sets_to_win)
+        previous = summary["scorelines"]
+        summary = merge_summaries(summary, part)
+
+        n = summary["simulations"]
+        low, high = wilson_interval(summary["wins"][player1.name], n, confidence)
+        halfwidth = (high - low) / 2.0
+        change = scoreline_change(previous, summary["scorelines"])
+        elapsed = time.perf_counter() - start
+
+        if halfwidth <= precision and change <= scoreline_tolerance:
+            stopped = "precision"
+        elif elapsed >= time_budget:
+            stopped = "time"
+        elif n >= max_simulations:
+            stopped = "max"
+        else:
+            stopped = None
+        if progress:
+            # Intervallbreite fällt mit 1/sqrt(n): Anteil der benötigten Matches schätzen
+            estimate = min(1.0, (precision / halfwidth) ** 2) if halfwidth > 0 else 1.0
+            progress(1.0 if stopped else min(0.99, max(estimate, elapsed / time_budget, n / max_simulations)))
+        if stopped:
+            break
+        batch = min(batch * 2, MAX_BATCH)
+
+    summary["adaptive"] = {
+        "interval": (low, high),
+        "confidence": confidence,
+        "halfwidth": halfwidth,
+        "scoreline_change": change,
+        "stopped": stopped,
+        "seconds": elapsed,
+    }
+    diagnostics.record_simulation(summary, elapsed)
+    return summary
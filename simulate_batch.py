@@ -0,0 +1,439 @@
+# simulate_batch.py
+import math
+from collections import Counter
+
+import numpy as np
+
+# Heuristik-Konstanten des Aufnahme-Modells, gemeinsam mit SimulatedPlayer.throw_visit
+TRY_CHECKOUT_PROB = 0.55   # Anteil der Aufnahmen im Finish-Bereich, die gezielt aufs Finish gehen
+VISIT_SIGMA = 12.0
+VISIT_SUCCESS_BOUNDS = (0.02, 0.95)     # gezieltes Finish in einer Aufnahme
+CHECKOUT_SUCCESS_BOUNDS = (0.01, 0.95)  # attempt_checkout
+MISS_FACTOR = 0.6    # verfehltes Finish: Aufnahme um MISS_FACTOR * Average ...
+MISS_FLOOR = 20.0    # ... mindestens MISS_FLOOR
+START_SCORE = 501
+OUTCOMES = 182   # Aufnahme 0..180 plus "Checkout gelungen"
+CHECKOUT = 181
+
+
+def empty_summary(name1, name2):
+    """
+    Leere Monte-Carlo-Zusammenfassung. Enthält nur Aggregate (keine Historie):
+    wins/total_180s je Spielername, Endstands-Histogramm (bei Sets der Satzstand),
+    Summe gespielter Legs und Sets sowie das Histogramm der Legstände je Set.
+    total_visits zählt die einzeln simulierten Aufnahmen (0 bei der Leg-Engine).
+    """
+    return {
+        "players": (name1, name2),
+        "simulations": 0,
+        "wins": {name1: 0, name2: 0},
+        "scorelines": Counter(),
+        "total_180s": {name1: 0, name2: 0},
+        "total_legs": 0,
+        "total_sets": 0,
+        "set_scorelines": Counter(),
+        "total_visits": 0,
+    }
+
+
+def merge_summaries(a, b):
+    """Addiert zwei Zusammenfassungen (z. B. aus mehreren Batches) zu einer neuen."""
+    name1, name2 = a["players"]
+    out = empty_summary(name1, name2)
+    for s in (a, b):
+        out["simulations"] += s["simulations"]
+        out["scorelines"].update(s["scorelines"])
+        out["total_legs"] += s["total_legs"]
+        out["total_sets"] += s["total_sets"]
+        out["set_scorelines"].update(s["set_scorelines"])
+        out["total_visits"] += s.get("total_visits", 0)   # ältere Cache-Einträge ohne Zähler
+        for name in (name1, name2):
+            out["wins"][name] += s["wins"][name]
+            out["total_180s"][name] += s["total_180s"][name]
+    return out
+
+
+def _norm_cdf(x):
+    return 0.5 * (1.0 + np.vectorize(math.erf)(np.asarray(x) / math.sqrt(2.0)))
+
+
+def discrete_visit_pmf(mu, sigma=VISIT_SIGMA):
+    """
+    Verteilung von max(0, min(180, round(gauss(mu, sigma)))) über die Punktzahlen 0..180.
+    """
+    edges = np.arange(0.5, 180.0, 1.0)
+    cdf = _norm_cdf((edges - mu) / sigma)
+    return np.diff(np.concatenate(([0.0], cdf, [1.0])))
+
+
+class VisitTables:
+    """
+    Vorberechnete Aufnahme-Verteilungen eines Spielers je Restscore r = 0..501
+    (Zeile START_SCORE gilt auch für "kein Rest angegeben"):
+    throw_pmf[r]   Ergebnis von SimulatedPlayer.throw_visit: Spalte 0..180 = geworfene Punkte,
+                   Spalte EXACT_FINISH = gezieltes Finish auf einen Rest > 180 getroffen
+    throw_cdf[r]   dazu kumuliert (letzte belegte Spalte exakt 1.0) für Inverse-CDF-Ziehen;
+                   throw_rows enthält dieselben Zeilen als Python-Listen (bisect im Skalar-Pfad),
+                   gleiche Zeilen teilen sich ein Listenobjekt
+    checkout_success[r] / checkout_list  Erfolgswahrscheinlichkeit von attempt_checkout
+    outcomes[r]    ganze Aufnahme inkl. Checkout (siehe visit_outcome_table)
+    """
+
+    __slots__ = ("throw_pmf", "throw_cdf", "throw_rows", "checkout_success", "checkout_list", "outcomes")
+
+    def __init__(self, throw_pmf, checkout_success, outcomes):
+        self.throw_pmf = throw_pmf
+        self.checkout_success = checkout_success
+        self.checkout_list = checkout_success.tolist()
+        self.outcomes = outcomes
+
+        cdf = np.minimum(np.cumsum(throw_pmf, axis=1) / throw_pmf.sum(axis=1, keepdims=True), 1.0)
+        last = OUTCOMES - 1 - np.argmax(throw_pmf[:, ::-1] > 0, axis=1)
+        cdf[np.arange(OUTCOMES) >= last[:, None]] = 1.0
+        self.throw_cdf = cdf
+        shared = {}
+        self.throw_rows = [shared.setdefault(row.tobytes(), row.tolist()) for row in cdf]
+        # gecacht und von mehreren Spielern/Simulatoren geteilt: nur lesen
+        for table in (throw_pmf, checkout_success, outcomes, cdf):
+            table.flags.writeable = False
+
+
+EXACT_FINISH = 181   # Spalte in VisitTables.throw_pmf (gleiche Breite wie die Ergebnistabelle)
+
+_VISIT_TABLES = {}
+
+
+def visit_tables(player):
+    """
+    VisitTables eines Spielers (Modell von SimulatedPlayer.throw_visit und attempt_checkout),
+    je Spielerparameter (player_key) gecacht.
+    """
+    key = player_key(player)
+    if key not in _VISIT_TABLES:
+        if len(_VISIT_TABLES) >= 256:
+            _VISIT_TABLES.clear()
+        if player.darts is not None:
+            # Dart-für-Dart-Modell; erst hier importiert, checkout_routes baut auf diesem Modul auf
+            from checkout_routes import build_visit_tables
+            _VISIT_TABLES[key] = build_visit_tables(player.darts, player.form)
+        else:
+            _VISIT_TABLES[key] = _build_visit_tables(player)
+    return _VISIT_TABLES[key]
+
+
+def _build_visit_tables(player):
+    modifier = 1.0 + (player.form - 5.0) / 25.0
+    base = player.checkout_pct / 100.0
+    visit_success = min(max(base * modifier, VISIT_SUCCESS_BOUNDS[0]), VISIT_SUCCESS_BOUNDS[1])
+    checkout_success = min(max(base * modifier, CHECKOUT_SUCCESS_BOUNDS[0]), CHECKOUT_SUCCESS_BOUNDS[1])
+
+    scoring = np.zeros(OUTCOMES)
+    scoring[:181] = (1.0 - player.p180) * discrete_visit_pmf(player.avg)
+    scoring[180] += player.p180
+    miss = np.zeros(OUTCOMES)
+    miss[:181] = discrete_visit_pmf(max(MISS_FLOOR, player.avg * MISS_FACTOR))
+    aiming = (1.0 - TRY_CHECKOUT_PROB) * scoring + TRY_CHECKOUT_PROB * (1.0 - visit_success) * miss
+
+    top = min(player.max_checkout, START_SCORE)
+    throw = np.tile(scoring, (START_SCORE + 1, 1))
+    success = np.zeros(START_SCORE + 1)
+    success[2:top + 1] = checkout_success
+    outcomes = throw.copy()
+    for r in range(2, top + 1):
+        row = aiming.copy()
+        row[min(r, EXACT_FINISH)] += TRY_CHECKOUT_PROB * visit_success
+        throw[r] = row
+
+        row = row.copy()
+        if r <= 180:
+            exact = row[r]
+            row[r] = exact * (1.0 - checkout_success)
+        else:
+            # exakte Aufnahme > 180 nur über gezieltes Finish; Fehlversuch wirkt wie 0 Punkte
+            exact = row[EXACT_FINISH]
+            row[0] += exact * (1.0 - checkout_success)
+        row[CHECKOUT] = exact * checkout_success
+        outcomes[r] = row
+    return VisitTables(throw, success, outcomes)
+
+
+def visit_outcome_table(player):
+    """
+    Exakte Verteilung des Ergebnisses einer Aufnahme je Restscore (Modell von
+    SimulatedPlayer.throw_visit inkl. attempt_checkout).
+    Zeile r (0..501), Spalte 0..180 = geworfene Punkte, Spalte CHECKOUT = Leg gewonnen.
+    """
+    return visit_tables(player).outcomes
+
+
+def _alias_table(pmf):
+    """Walker/Vose-Aliastabelle für O(1)-Ziehen aus einer diskreten Verteilung."""
+    k = len(pmf)
+    q = (np.asarray(pmf) * (k / pmf.sum())).tolist()
+    prob = [1.0] * k
+    alias = list(range(k))
+    small = [i for i, v in enumerate(q) if v < 1.0]
+    large = [i for i, v in enumerate(q) if v >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = q[s]
+        alias[s] = l
+        q[l] = q[l] + q[s] - 1.0
+        (small if q[l] < 1.0 else large).append(l)
+    return prob, alias
+
+
+def player_key(player):
+    """Alle Parameter, die das Aufnahme-Modell eines Spielers bestimmen (mit Dart-Modell länger)."""
+    key = (player.avg, player.checkout_pct, player.form, player.p180, player.max_checkout)
+    return key if player.darts is None else key + tuple(player.darts)
+
+
+_TABLE_CACHE = {}
+
+
+def _sampling_tables(players):
+    """
+    Aliastabellen beider Spieler. Zeilen mit identischer Verteilung (im Aufnahme-Modell alle
+    Reste außerhalb des Checkout-Bereichs) werden nur einmal aufgebaut.
+    Gibt (row_of, prob, alias) zurück; row_of[spieler * 502 + rest] = Zeile.
+    Die Tabellen werden je Spielerparameter gecacht (Blöcke derselben Paarung).
+    """
+    key = tuple(player_key(p) for p in players)
+    if key not in _TABLE_CACHE:
+        if len(_TABLE_CACHE) >= 32:
+            _TABLE_CACHE.clear()
+        _TABLE_CACHE[key] = _build_sampling_tables(players)
+    return _TABLE_CACHE[key]
+
+
+def _build_sampling_tables(players):
+    row_of = np.zeros(2 * (START_SCORE + 1), dtype=np.int64)
+    prob, alias = [], []
+    for i, player in enumerate(players):
+        table = visit_outcome_table(player)
+        seen = {}
+        for r in [START_SCORE] + list(range(2, START_SCORE)):
+            row = table[r].tobytes()
+            if row not in seen:
+                seen[row] = len(prob)
+                p, a = _alias_table(table[r])
+                prob.append(p)
+                alias.append(a)
+            row_of[i * (START_SCORE + 1) + r] = seen[row]
+        row_of[i * (START_SCORE + 1):i * (START_SCORE + 1) + 2] = seen[table[START_SCORE].tobytes()]
+    return row_of, np.array(prob).ravel(), np.array(alias, dtype=np.int32).ravel()
+
+
+def _decode_scorelines(codes, target):
+    counter = Counter()
+    if codes:
+        values, counts = np.unique(np.concatenate(codes), return_counts=True)
+        for code, count in zip(values, counts):
+            a, b = divmod(int(code), target + 1)
+            counter[f"{a}:{b}"] = int(count)
+    return counter
+
+
+class _Scoreboard:
+    """
+    Spielstand von n gleichzeitig laufenden Matches (Legs, Sets, Starter, 180er) und die
+    Aggregate der bereits beendeten. Gemeinsame Buchführung der Batch-Engines:
+    Starter wechselt jedes Leg, bei Sets beginnt der Set-Starter (wechselt je Set) das erste Leg.
+    """
+
+    ARRAYS = ("starter", "set_starter", "legs1", "legs2", "sets1", "sets2", "n180_1", "n180_2", "alive")
+
+    def __init__(self, n, legs_to_win, sets_to_win=None):
+        self.legs_to_win = legs_to_win
+        self.sets_to_win = sets_to_win
+        for name in self.ARRAYS[:-1]:
+            setattr(self, name, np.zeros(n, dtype=np.int32))
+        self.alive = np.ones(n, dtype=bool)   # beendete Matches werden erst gesammelt entfernt
+        self.n_alive = n
+        self.wins1 = 0
+        self.total_180s = [0, 0]
+        self.total_legs = 0
+        self.total_sets = 0
+        self.total_visits = 0
+        self.scoreline_codes = []
+        self.set_codes = []
+
+    def end_legs(self, won, p1_won):
+        """
+        Bucht die in den Matches won beendeten Legs (p1_won: Sieger ist P1) und wechselt
+        den Starter. Gibt die Maske der damit beendeten Matches zurück.
+        """
+        legs_to_win = self.legs_to_win
+        self.legs1 += won & p1_won
+        self.legs2 += won & ~p1_won
+        self.total_legs += int(won.sum())
+        self.starter[won] = 1 - self.starter[won]
+
+        if self.sets_to_win is None:
+            score1, score2, target = self.legs1, self.legs2, legs_to_win
+        else:
+            set_won = won & ((self.legs1 >= legs_to_win) | (self.legs2 >= legs_to_win))
+            if set_won.any():
+                l1, l2 = self.legs1[set_won], self.legs2[set_won]
+                self.set_codes.append(l1 * (legs_to_win + 1) + l2)
+                self.total_sets += len(l1)
+                self.sets1[set_won] += l1 >= legs_to_win
+                self.sets2[set_won] += l2 >= legs_to_win
+                self.legs1[set_won] = 0
+                self.legs2[set_won] = 0
+                self.set_starter[set_won] = 1 - self.set_starter[set_won]
+                self.starter[set_won] = self.set_starter[set_won]
+            score1, score2, target = self.sets1, self.sets2, self.sets_to_win
+
+        done = won & ((score1 >= target) | (score2 >= target))
+        if done.any():
+            s1, s2 = score1[done], score2[done]
+            self.wins1 += int((s1 >= target).sum())
+            self.total_180s[0] += int(self.n180_1[done].sum())
+            self.total_180s[1] += int(self.n180_2[done].sum())
+            self.scoreline_codes.append(s1 * (target + 1) + s2)
+            self.alive &= ~done
+            self.n_alive -= len(s1)
+        return done
+
+    def compact(self):
+        """Entfernt beendete Matches aus den Arrays; gibt die Maske der behaltenen zurück."""
+        keep = self.alive
+        for name in self.ARRAYS:
+            setattr(self, name, getattr(self, name)[keep])
+        return keep
+
+    def summary(self, player1, player2, n):
+        summary = empty_summary(player1.name, player2.name)
+        summary["simulations"] = n
+        summary["wins"][player1.name] = self.wins1
+        summary["wins"][player2.name] = n - self.wins1
+        summary["total_180s"][player1.name] = self.total_180s[0]
+        summary["total_180s"][player2.name] = self.total_180s[1]
+        summary["total_legs"] = self.total_legs
+        summary["total_sets"] = self.total_sets
+        summary["total_visits"] = self.total_visits
+        summary["scorelines"] = _decode_scorelines(self.scoreline_codes, self.sets_to_win or self.legs_to_win)
+        summary["set_scorelines"] = _decode_scorelines(self.set_codes, self.legs_to_win)
+        return summary
+
+
+def play_matches_batch(player1, player2, legs_to_win, n, rng=None, sets_to_win=None):
+    """
+    Spielt n Matches gleichzeitig als NumPy-Arrays, Aufnahme für Aufnahme.
+    Pro Schleifendurchlauf wirft in jedem noch laufenden Match der Spieler am Zug
+    eine Aufnahme — nach demselben Modell wie SimulatedPlayer.throw_visit /
+    attempt_checkout und denselben Regeln wie MatchSimulator.play_leg.
+    Beendete Matches werden aggregiert und aus den Arrays entfernt.
+    sets_to_win: None = Best of Legs, sonst First to sets_to_win Sets à legs_to_win Legs.
+    rng: np.random.Generator oder Seed (None = zufällig).
+    Gibt eine Zusammenfassung im Format von empty_summary zurück.
+    """
+    rng = np.random.default_rng(rng)
+    if n <= 0:
+        return empty_summary(player1.name, player2.name)
+    row_of, prob, alias = _sampling_tables((player1, player2))
+
+    # Zustand je laufendem Match (kompakt, gleiche Länge wie board)
+    board = _Scoreboard(n, legs_to_win, sets_to_win)
+    cur = np.zeros(n, dtype=np.int32)       # Spieler am Zug (0/1)
+    r_cur = np.full(n, START_SCORE, dtype=np.int32)   # Rest des Spielers am Zug
+    r_oth = np.full(n, START_SCORE, dtype=np.int32)   # Rest des Gegners
+
+    while cur.size:
+        m = cur.size
+        r = r_cur
+        board.total_visits += board.n_alive
+        p2_turn = cur.astype(bool)
+
+        # --- Aufnahme ziehen: Aliastabelle der Zeile (Spieler, Rest) ---
+        x = rng.random(m) * OUTCOMES
+        k = np.minimum(x.astype(np.int32), OUTCOMES - 1)
+        idx = row_of[cur * (START_SCORE + 1) + r] * OUTCOMES + k
+        out = np.where(x - k < prob[idx], k, alias[idx])
+
+        won = (out == CHECKOUT) & board.alive
+        is_180 = (out == 180) | (won & (r == 180))
+        board.n180_1 += is_180 & ~p2_turn
+        board.n180_2 += is_180 & p2_turn
+
+        # --- Regeln anwenden (play_leg): Bust bzw. Rest 1 lässt den Score stehen ---
+        after = r - out
+        new_r = np.where((after > 1) & ~won, after, r)
+
+        # Wechsel am Zug
+        r_cur, r_oth = r_oth, new_r
+        cur = 1 - cur
+
+        if not won.any():
+            continue
+        r_cur[won] = START_SCORE
+        r_oth[won] = START_SCORE
+        done = board.end_legs(won, ~p2_turn)
+        cur[won] = board.starter[won]
+
+        # Arrays erst verkleinern, wenn sich das lohnt
+        if done.any() and board.alive.sum() * 4 < m * 3:
+            keep = board.compact()
+            cur, r_cur, r_oth = cur[keep], r_cur[keep], r_oth[keep]
+
+    return board.summary(player1, player2, n)
+
+
+def _leg_sampling_tables(player1, player2):
+    """
+    Aliastabellen der exakten Leg-Verteilung (solve_match.leg_outcome_tables):
+    Ergebnis o = sieger * K1 * K2 + k1 * K2 + k2, Tabelle 0 = P1 beginnt, 1 = P2 beginnt.
+    Gibt (prob, alias, p1_won, k1, k2, size) zurück, flach über beide Tabellen.
+    """
+    from solve_match import leg_outcome_tables
+
+    key = ("legs", player_key(player1), player_key(player2))
+    if key not in _TABLE_CACHE:
+        if len(_TABLE_CACHE) >= 32:
+            _TABLE_CACHE.clear()
+        tables = leg_outcome_tables(player1, player2)
+        size = tables[0].size
+        prob, alias = [], []
+        for table in tables:
+            p, a = _alias_table(table.ravel())
+            prob.extend(p)
+            alias.extend(a)
+        winner, k1, k2 = np.unravel_index(np.arange(size), tables[0].shape)
+        _TABLE_CACHE[key] = (
+            np.array(prob), np.array(alias, dtype=np.int32),
+            np.tile(winner == 0, 2), np.tile(k1, 2).astype(np.int32), np.tile(k2, 2).astype(np.int32),
+            size,
+        )
+    return _TABLE_CACHE[key]
+
+
+def play_matches_legs(player1, player2, legs_to_win, n, rng=None, sets_to_win=None):
+    """
+    Wie play_matches_batch, zieht aber je Leg nur ein Ergebnis (Sieger, 180er beider
+    Spieler) aus der exakten Leg-Verteilung des Aufnahme-Modells statt jede Aufnahme.
+    Ein Durchlauf spielt in allen laufenden Matches ein Leg; lange Set-Formate kosten
+    damit nur so viele Durchläufe wie Legs.
+    Gibt eine Zusammenfassung im Format von empty_summary zurück.
+    """
+    rng = np.random.default_rng(rng)
+    if n <= 0:
+        return empty_summary(player1.name, player2.name)
+    prob, alias, p1_won, k1, k2, size = _leg_sampling_tables(player1, player2)
+
+    board = _Scoreboard(n, legs_to_win, sets_to_win)
+    while board.alive.size:
+        m = board.alive.size
+        x = rng.random(m) * size
+        k = np.minimum(x.astype(np.int32), size - 1)
+        idx = board.starter * size + k
+        out = board.starter * size + np.where(x - k < prob[idx], k, alias[idx])
+
+        board.n180_1 += k1[out]
+        board.n180_2 += k2[out]
+        done = board.end_legs(board.alive, p1_won[out])
+        if done.any() and board.alive.sum() * 4 < m * 3:
+            board.compact()
+
+    return board.summary(player1, player2, n)
@@ -0,0 +1,259 @@
+# simulate_fixtures.py
+"""
+Spielplan ohne Oberfläche durchrechnen: liest eine Fixture-Datei (CSV mit den Spalten
+player1, player2 und optional format), lädt die Spielerdaten einmal und schreibt je
+Fixture eine JSON-Zeile (Siegwahrscheinlichkeiten, Endstands-Verteilung, erwartete 180s
+und Legs) nach stdout oder in eine Datei.
+
+Die Fixtures werden gestreamt: höchstens window Aufträge sind gleichzeitig im Prozess-Pool,
+die Ausgabe kommt in Eingabereihenfolge. Der Anwurf wird ausgebullt (je die Hälfte der
+Matches mit jedem Spieler als Starter bzw. exakt gemittelt). Seeds je Fixture hängen nur von
+--seed und der Zeilennummer ab, das Ergebnis also nicht von der Anzahl der Prozesse.
+
+    python simulate_fixtures.py fixtures.csv --simulations 20000 --output prices.jsonl
+    python simulate_fixtures.py fixtures.csv --engine exact
+    python simulate_fixtures.py fixtures.csv --darts   # Dart-für-Dart-Modell
+
+Formate: "ft6" bzw. "bo11" (Legs), "ft4/ft3" bzw. "bo7/bo5" (Sets / Legs je Set).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from checkout_routes import DART_COLUMNS
+from player_store import load_players
+from simulate_batch import merge_summaries, play_matches_batch, play_matches_legs
+from simulate_parallel import player_from_spec, player_spec
+from simulate_player import player_from_row
+from solve_match import match_probabilities
+
+DEFAULT_FORMAT = "ft6"
+DEFAULT_SIMULATIONS = 20000
+# Aufträge je Prozess, die gleichzeitig unterwegs sein dürfen (begrenzt den Speicher)
+WINDOW_PER_WORKER = 4
+PLAYER_COLUMNS = [
+    "Name", "Averages", "Avg", "180's", "Checkout Pcnt", "Form",
+    "Matches_Played", "Matches", "MatchesPlayed", "Matches Played", "match_count",
+] + DART_COLUMNS
+
+
+def parse_format(text):
+    """'ft6' / 'bo11' -> (6, None); 'ft4/ft3' / 'bo7/bo5' -> (legs_to_win, sets_to_win)."""
+    def first_to(part):
+        if part.startswith("ft"):
+            value = int(part[2:])
+        elif part.startswith("bo"):
+            best_of = int(part[2:])
+            if best_of % 2 == 0:
+                raise ValueError(f"Best of braucht eine ungerade Zahl: {text!r}")
+            value = best_of // 2 + 1
+        else:
+            value = int(part)
+        if value < 1:
+            raise ValueError(f"Ungültiges Format: {text!r}")
+        return value
+
+    parts = text.strip().lower().replace(" ", "").split("/")
+    try:
+        if len(parts) == 1:
+            return first_to(parts[0]), None
+        if len(parts) == 2:
+            return first_to(parts[1]), first_to(parts[0])
+    except ValueError as e:
+        raise ValueError(f"Unbekanntes Format: {text!r}") from e
+    raise ValueError(f"Unbekanntes Format: {text!r}")
+
+
+def read_fixtures(f):
+    """Zeilen der Fixture-CSV (Trennzeichen , oder ;) als dicts, gestreamt."""
+    first = f.readline()
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    header = [c.strip().lower() for c in next(csv.reader([first], delimiter=delimiter))]
+    for row in csv.reader(f, delimiter=delimiter):
+        if row and any(cell.strip() for cell in row):
+            yield {key: value.strip() for key, value in zip(header, row)}
+
+
+class PlayerLookup:
+    """
+    Spielerdaten einmal geladen; Namen exakt oder ohne Groß-/Kleinschreibung.
+    darts: Spieler mit Dart-für-Dart-Modell (checkout_routes).
+    """
+
+    def __init__(self, df=None, darts=False):
+        df = load_players(PLAYER_COLUMNS) if df is None else df
+        df = df.dropna(subset=["Name"]).drop_duplicates("Name")
+        self.rows = {name: row for name, row in zip(df["Name"], df.to_dict("records"))}
+        self.folded = {name.casefold(): name for name in self.rows}
+        self.darts = darts
+        self.specs = {}
+
+    def spec(self, name):
+        name = self.folded.get(name.casefold(), name)
+        if name not in self.specs:
+            if name not in self.rows:
+                raise KeyError(f"Spieler nicht gefunden: {name!r}")
+            self.specs[name] = player_spec(player_from_row(name, self.rows[name], darts=self.darts))
+        return self.specs[name]
+
+
+def _swap(scoreline):
+    a, b = scoreline.split(":")
+    return f"{b}:{a}"
+
+
+def price_fixture(spec1, spec2, legs_to_win, sets_to_win, simulations, seed_seq, engine):
+    """
+    Eine Fixture (läuft im Worker-Prozess). Beide Anwurf-Reihenfolgen zu gleichen Teilen.
+    Gibt die Kennzahlen aus Sicht von player1 zurück.
+    """
+    p1, p2 = player_from_spec(spec1), player_from_spec(spec2)
+    name1, name2 = p1.name, p2.name
+    if engine == "exact":
+        on = match_probabilities(p1, p2, legs_to_win, sets_to_win)
+        against = match_probabilities(p2, p1, legs_to_win, sets_to_win)
+        scorelines = Counter()
+        for s, p in on["scorelines"].items():
+            scorelines[s] += 0.5 * p
+        for s, p in against["scorelines"].items():
+            scorelines[_swap(s)] += 0.5 * p
+        p1_win = 0.5 * (on["wins"][name1] + against["wins"][name1])
+        exp180 = [0.5 * (on["expected_180s"][n] + against["expected_180s"][n]) for n in (name1, name2)]
+        legs = 0.5 * (on["expected_legs"] + against["expected_legs"])
+    else:
+        play = play_matches_legs if engine == "legs" else play_matches_batch
+        rng = np.random.default_rng(seed_seq)
+        half = simulations // 2
+        on = play(p1, p2, legs_to_win, half, rng=rng, sets_to_win=sets_to_win)
+        against = play(p2, p1, legs_to_win, simulations - half, rng=rng, sets_to_win=sets_to_win)
+        # Gegen-Lauf auf die Sicht von player1 drehen und zusammenführen
+        against = dict(against, players=(name1, name2),
+                       scorelines=Counter({_swap(s): c for s, c in against["scorelines"].items()}),
+                       set_scorelines=Counter({_swap(s): c for s, c in against["set_scorelines"].items()}))
+        summary = merge_summaries(on, against)
+        scorelines = Counter({s: c / simulations for s, c in summary["scorelines"].items()})
+        p1_win = summary["wins"][name1] / simulations
+        exp180 = [summary["total_180s"][n] / simulations for n in (name1, name2)]
+        legs = summary["total_legs"] / simulations
+
+    def order(scoreline):
+        a, b = map(int, scoreline.split(":"))
+        return (False, -a, b) if a > b else (True, b, a)
+
+    return {
+        "p1_win": p1_win,
+        "p2_win": 1.0 - p1_win,
+        "scorelines": {s: scorelines[s] for s in sorted(scorelines, key=order)},
+        "expected_180s_p1": exp180[0],
+        "expected_180s_p2": exp180[1],
+        "expected_legs": legs,
+    }
+
+
+def _price_or_error(*args):
+    """price_fixture, Fehler als {"error": ...} — gleich im Prozess-Pool und ohne Pool."""
+    try:
+        return price_fixture(*args)
+    except Exception as e:
+        return {"error": str(e) or type(e).__name__}
+
+
+def run_fixtures(fixtures, out, lookup, simulations=DEFAULT_SIMULATIONS, workers=None, seed=None,
+                 engine="legs", default_format=DEFAULT_FORMAT, window=None, progress=None):
+    """
+    Rechnet alle fixtures (Iterable von dicts wie read_fixtures) und schreibt je Fixture eine
+    JSON-Zeile nach out, in Eingabereihenfolge. Fehlerhafte Zeilen (unbekannter Spieler,
+    ungültiges Format, Fehler beim Rechnen) ergeben eine Zeile mit "error" statt eines Abbruchs,
+    mit und ohne Prozess-Pool gleich.
+    progress: optionaler Callback (erledigt).
+    Gibt (Anzahl Fixtures, Anzahl Fehler) zurück.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    window = window or workers * WINDOW_PER_WORKER
+    root = np.random.SeedSequence(seed)
+    pending = deque()
+    counts = {"done": 0, "errors": 0}
+
+    def write(head):
+        number, row, fmt, job = head
+        line = {"fixture": number, "player1": row.get("player1"), "player2": row.get("player2")}
+        if fmt is not None:
+            line.update(legs_to_win=fmt[0], sets_to_win=fmt[1], engine=engine,
+                        simulations=None if engine == "exact" else simulations)
+        try:
+            line.update(job.result() if hasattr(job, "result") else job)
+        except Exception as e:
+            line["error"] = str(e)
+        counts["errors"] += "error" in line
+        out.write(json.dumps(line, ensure_ascii=False) + "\n")
+        out.flush()
+        counts["done"] += 1
+        if progress:
+            progress(counts["done"])
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for number, row in enumerate(fixtures, start=1):
+            fmt = None
+            try:
+                fmt = parse_format(row.get("format") or default_format)
+                spec1, spec2 = lookup.spec(row.get("player1", "")), lookup.spec(row.get("player2", ""))
+                if spec1[0] == spec2[0]:
+                    raise ValueError("player1 und player2 sind derselbe Spieler")
+                args = (spec1, spec2, fmt[0], fmt[1], simulations,
+                        np.random.SeedSequence(root.entropy, spawn_key=(number,)), engine)
+                job = pool.submit(_price_or_error, *args) if pool else _price_or_error(*args)
+            except (KeyError, ValueError) as e:
+                job = {"error": e.args[0] if e.args else str(e)}
+            pending.append((number, row, fmt, job))
+            while len(pending) >= window or (pending and not hasattr(pending[0][3], "done")):
+                write(pending.popleft())
+        while pending:
+            write(pending.popleft())
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return counts["done"], counts["errors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixtures ohne Oberfläche simulieren (JSON Lines)")
+    parser.add_argument("fixtures", help="CSV mit player1, player2[, format]; '-' = stdin")
+    parser.add_argument("--output", default="-", help="JSON-Lines-Datei ('-' = stdout)")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, help="Format, wenn die Zeile keins angibt")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument("--engine", choices=["legs", "batch", "exact"], default="legs")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--darts", action="store_true", help="Dart-für-Dart-Modell (checkout_routes)")
+    args = parser.parse_args()
+
+    lookup = PlayerLookup(darts=args.darts)
+    start = time.perf_counter()
+    source = sys.stdin if args.fixtures == "-" else open(args.fixtures, encoding="utf-8", newline="")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    def report(done):
+        if done % 100 == 0:
+            print(f"… {done} Fixtures ({done / (time.perf_counter() - start):.1f}/s)", file=sys.stderr)
+
+    try:
+        done, errors = run_fixtures(read_fixtures(source), out, lookup, args.simulations, args.workers,
+                                    args.seed, args.engine, args.format, progress=report)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ {done} Fixtures in {time.perf_counter() - start:.1f} s ({errors} Fehler)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,75 @@
 # simulate_match.py
 import time
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from checkout_routes import darts_points
+from simulate_batch import play_matches_batch, play_matches_legs
+
+# Ereignis im Live-Modus: kind ("match", "set", "leg", "180", "visit", "bust", "miss",
+# "checkout", "set_won", "match_won"), Spieler, geworfene Punkte, Rest danach bzw. davor
+# (bust/miss), Stand (Legs nach checkout, Sets nach set_won/match_won, Satznummer bei set),
+# im Dart-Modell die getroffenen Felder der Aufnahme
+LiveEvent = namedtuple("LiveEvent", "kind player visit remaining score darts",
+                       defaults=(None, None, None, None, None))
+# Nach diesen Ereignissen pausiert die Live-Anzeige (Aufnahme, die das Leg nicht beendet)
+PAUSE_AFTER = frozenset({"visit", "bust", "miss"})
+
+
+class LegEvents:
+    """
+    Kompakte Aufzeichnung aller Aufnahmen für play_leg_lean/play_match_lean: je Aufnahme
+    Spieler (0 = P1, 1 = P2), geworfene Punkte und Rest danach (Bust: Rest unverändert,
+    Checkout: 0). leg_starts enthält den Index der ersten Aufnahme jedes Legs.
+    """
+
+    def __init__(self):
+        self.player = array("B")
+        self.visit = array("H")
+        self.remaining = array("H")
+        self.leg_starts = array("I")
+
+    def __len__(self):
+        return len(self.visit)
+
+    def start_leg(self):
+        self.leg_starts.append(len(self.visit))
+
+    def record(self, player, visit, remaining):
+        self.player.append(player)
+        self.visit.append(visit)
+        self.remaining.append(remaining)
+
+    def clear(self):
+        for column in (self.player, self.visit, self.remaining, self.leg_starts):
+            del column[:]
+
+    def as_arrays(self):
+        """NumPy-Sichten (ohne Kopie): player, visit, remaining, leg_starts."""
+        return tuple(np.frombuffer(column, dtype=column.typecode)
+                     for column in (self.player, self.visit, self.remaining, self.leg_starts))
+
 
 class MatchSimulator:
-    def __init__(self, player1, player2, legs_to_win=3):
+    def __init__(self, player1, player2, legs_to_win=3, sets_to_win=None):
+        """
+        legs_to_win: Legs zum Sieg (bei Sets: Legs zum Gewinn eines Sets).
+        sets_to_win: None = Best of Legs, sonst Sets zum Matchgewinn.
+        """
         self.p1 = player1
         self.p2 = player2
         self.legs_to_win = legs_to_win
+        self.sets_to_win = sets_to_win
         self.legs = {player1.name: 0, player2.name: 0}
+        self.sets = {player1.name: 0, player2.name: 0}
+        self.set_scores = []
+        self._rest = [501, 501]
+        self.visits = 0   # Aufnahmen aller play_leg_lean-Aufrufe
+
+    def _other(self, name):
+        return self.p2.name if name == self.p1.name else self.p1.name
 
     def play_leg(self, starter_name):
         """
@@ -48,64 +111,225 @@ class MatchSimulator:
             # Wechsel
             current = self.p2.name if current == self.p1.name else self.p1.name
 
-    def play_match(self):
+    def play_leg_lean(self, starter, events=None):
         """
-        Simuliere ein komplettes Match (non-live) — gibt winner_name, scoreline, match_history.
-        match_history ist Liste von (starter, winner, leg_history, leg_180s)
+        Wie play_leg (gleiche Regeln und Zufallszüge), aber ohne Texte, Dicts und Listen:
+        starter ist ein Index (0 = P1, 1 = P2), self.legs bleibt unverändert.
+        Gibt (winner, 180s P1, 180s P2) zurück; events (LegEvents) zeichnet optional jede Aufnahme auf.
+        """
+        players = (self.p1, self.p2)
+        rest = self._rest
+        rest[0] = rest[1] = 501
+        n180_1 = n180_2 = 0
+        current = starter
+        if events is not None:
+            events.start_leg()
+
+        visits = self.visits
+        while True:
+            visits += 1
+            player = players[current]
+            before = rest[current]
+            visit = player.throw_visit(before)
+
+            if visit == 180:
+                if current:
+                    n180_2 += 1
+                else:
+                    n180_1 += 1
+
+            if visit == before and player.attempt_checkout(before):
+                if events is not None:
+                    events.record(current, visit, 0)
+                self.visits = visits
+                return current, n180_1, n180_2
+            if visit < before and before - visit != 1:
+                rest[current] = before - visit
+            if events is not None:
+                events.record(current, visit, rest[current])
+            current ^= 1
+
+    def play_match_lean(self, events=None, set_tally=None):
+        """
+        play_match ohne Historie, nur mit ganzzahligen Zählern (keine Strings, keine Listen je
+        Aufnahme). Gibt (p1_gewinnt, Stand P1, Stand P2, 180s P1, 180s P2, Legs) zurück; der
+        Stand ist in Legs bzw. bei Sets in Sets. set_tally: optionales Dict
+        {(legs_p1, legs_p2): anzahl}, in das die Legstände der Sets gezählt werden.
+        events: optional LegEvents für eine strukturierte Aufzeichnung.
+        """
+        target = self.legs_to_win
+        sets_target = self.sets_to_win or 1
+        sets1 = sets2 = n180_1 = n180_2 = legs = 0
+        set_starter = 0
+        while sets1 < sets_target and sets2 < sets_target:
+            legs1 = legs2 = 0
+            starter = set_starter
+            while legs1 < target and legs2 < target:
+                winner, a, b = self.play_leg_lean(starter, events)
+                n180_1 += a
+                n180_2 += b
+                legs += 1
+                if winner:
+                    legs2 += 1
+                else:
+                    legs1 += 1
+                starter ^= 1
+            if legs1 > legs2:
+                sets1 += 1
+            else:
+                sets2 += 1
+            if set_tally is not None:
+                set_tally[legs1, legs2] = set_tally.get((legs1, legs2), 0) + 1
+            set_starter ^= 1
+        if self.sets_to_win is None:
+            return legs1 > legs2, legs1, legs2, n180_1, n180_2, legs
+        return sets1 > sets2, sets1, sets2, n180_1, n180_2, legs
+
+    def _play_legs(self, starter, match_history):
+        """
+        Legs bis ein Spieler legs_to_win erreicht (ein Set bzw. das ganze Best-of-Legs-Match),
+        Starter wechselt jedes Leg. Gibt den Sieger zurück.
         """
-        starter = self.p1.name
-        match_history = []
-        # reset legs:
         self.legs = {self.p1.name: 0, self.p2.name: 0}
         while max(self.legs.values()) < self.legs_to_win:
             winner, leg_hist, leg_180s = self.play_leg(starter)
             match_history.append((starter, winner, leg_hist, leg_180s))
-            starter = self.p2.name if starter == self.p1.name else self.p1.name
-        final_winner = max(self.legs, key=lambda k: self.legs[k])
-        scoreline = f"{self.legs[self.p1.name]}:{self.legs[self.p2.name]}"
+            starter = self._other(starter)
+        return max(self.legs, key=lambda k: self.legs[k])
+
+    def play_match(self):
+        """
+        Simuliere ein komplettes Match (non-live) — gibt winner_name, scoreline, match_history.
+        match_history ist Liste von (starter, winner, leg_history, leg_180s) über alle Legs.
+        Bei Sets ist scoreline der Satzstand; die Legstände der Sets stehen in self.set_scores.
+        Der Set-Starter wechselt jedes Set (P1 beginnt), im Set wechselt der Starter jedes Leg.
+        """
+        match_history = []
+        if self.sets_to_win is None:
+            final_winner = self._play_legs(self.p1.name, match_history)
+            scoreline = f"{self.legs[self.p1.name]}:{self.legs[self.p2.name]}"
+            return final_winner, scoreline, match_history
+
+        self.sets = {self.p1.name: 0, self.p2.name: 0}
+        self.set_scores = []
+        set_starter = self.p1.name
+        while max(self.sets.values()) < self.sets_to_win:
+            set_winner = self._play_legs(set_starter, match_history)
+            self.sets[set_winner] += 1
+            self.set_scores.append(f"{self.legs[self.p1.name]}:{self.legs[self.p2.name]}")
+            set_starter = self._other(set_starter)
+        final_winner = max(self.sets, key=lambda k: self.sets[k])
+        scoreline = f"{self.sets[self.p1.name]}:{self.sets[self.p2.name]}"
         return final_winner, scoreline, match_history
 
-    def play_match_live(self, delay=0.7):
+    def play_matches(self, n, rng=None, engine="legs"):
         """
-        Generator: yieldet Zeilen (strings) live. delay in Sekunden zwischen Visits.
-        Best of Legs only (Sets können ergänzt werden).
+        Simuliere n Matches auf einmal (vektorisiert, ohne Historie).
+        engine: "legs" zieht je Leg aus der exakten Leg-Verteilung (schnell, auch für lange
+        Set-Formate), "batch" simuliert jede Aufnahme.
+        Gibt nur Aggregate zurück: Siege, Endstände, 180s, Legs und Sets (siehe simulate_batch.empty_summary).
         """
-        starter = self.p1.name
-        self.legs = {self.p1.name: 0, self.p2.name: 0}
-        yield f"Match startet: {self.p1.name} vs {self.p2.name} — First to {self.legs_to_win} Legs"
+        play = play_matches_legs if engine == "legs" else play_matches_batch
+        return play(self.p1, self.p2, self.legs_to_win, n, rng=rng, sets_to_win=self.sets_to_win)
 
+    def _live_legs(self, starter):
+        """Generator: LiveEvents der Legs, bis ein Spieler legs_to_win erreicht (siehe play_match_events)."""
+        self.legs = {self.p1.name: 0, self.p2.name: 0}
         while max(self.legs.values()) < self.legs_to_win:
-            yield f"--- Neues Leg (Starter: {starter}) ---"
+            yield LiveEvent("leg", starter)
             scores = {self.p1.name: 501, self.p2.name: 501}
             current = starter
             while True:
                 player = self.p1 if current == self.p1.name else self.p2
                 before = scores[player.name]
                 visit = player.throw_visit(before)
+                darts = player.last_darts
 
-                # count 180
                 if visit == 180:
-                    yield f"{player.name} wirft 180! (große Aufnahme)"
+                    yield LiveEvent("180", player.name, visit, before)
                 # apply rules
                 if visit > before or (before - visit) == 1:
-                    yield f"{player.name} wirft {visit} -> BUST (Rest {before})"
+                    yield LiveEvent("bust", player.name, visit, before, darts=darts)
+                elif visit == before:
+                    if player.attempt_checkout(before):
+                        scores[player.name] = 0
+                        self.legs[player.name] += 1
+                        yield LiveEvent("checkout", player.name, visit, 0,
+                                        (self.legs[self.p1.name], self.legs[self.p2.name]), darts)
+                        break
+                    yield LiveEvent("miss", player.name, visit, before, darts=darts)
+                elif visit == 0 and darts and darts_points(darts):
+                    # Dart-Modell: überworfen, Rest bleibt stehen
+                    yield LiveEvent("bust", player.name, visit, before, darts=darts)
                 else:
-                    if visit == before:
-                        success = player.attempt_checkout(before)
-                        if success:
-                            scores[player.name] = 0
-                            self.legs[player.name] += 1
-                            yield f"✅ {player.name} wirft {visit} -> Checkout! {player.name} gewinnt das Leg ({self.legs[self.p1.name]}-{self.legs[self.p2.name]})"
-                            break
-                        else:
-                            yield f"{player.name} wirft {visit} -> Versuch gescheitert (BUST). Rest bleibt {before}"
-                    else:
-                        scores[player.name] -= visit
-                        yield f"{player.name} wirft {visit}, Rest = {scores[player.name]}"
-                current = self.p2.name if current == self.p1.name else self.p1.name
-                time.sleep(delay)
-            starter = self.p2.name if starter == self.p1.name else self.p1.name
+                    scores[player.name] -= visit
+                    yield LiveEvent("visit", player.name, visit, scores[player.name], darts=darts)
+                current = self._other(current)
+            starter = self._other(starter)
+
+    def play_match_events(self):
+        """
+        Generator: das Match Aufnahme für Aufnahme als LiveEvent (ohne Pausen, ohne Texte),
+        Best of Legs und Best of Sets. Text einer Meldung über describe(event); self.legs,
+        self.sets und self.set_scores geben jederzeit den Stand an.
+        """
+        yield LiveEvent("match")
+        if self.sets_to_win is None:
+            yield from self._live_legs(self.p1.name)
+            final_winner = max(self.legs, key=lambda k: self.legs[k])
+            score = (self.legs[self.p1.name], self.legs[self.p2.name])
+        else:
+            self.sets = {self.p1.name: 0, self.p2.name: 0}
+            self.set_scores = []
+            set_starter = self.p1.name
+            while max(self.sets.values()) < self.sets_to_win:
+                yield LiveEvent("set", set_starter, score=(len(self.set_scores) + 1, 0))
+                yield from self._live_legs(set_starter)
+                set_winner = max(self.legs, key=lambda k: self.legs[k])
+                self.sets[set_winner] += 1
+                self.set_scores.append(f"{self.legs[self.p1.name]}:{self.legs[self.p2.name]}")
+                yield LiveEvent("set_won", set_winner, score=(self.sets[self.p1.name], self.sets[self.p2.name]))
+                set_starter = self._other(set_starter)
+            final_winner = max(self.sets, key=lambda k: self.sets[k])
+            score = (self.sets[self.p1.name], self.sets[self.p2.name])
+        yield LiveEvent("match_won", final_winner, score=score)
 
-        final_winner = max(self.legs, key=lambda k: self.legs[k])
-        scoreline = f"{self.legs[self.p1.name]}:{self.legs[self.p2.name]}"
-        yield f"🏆 Match vorbei! {final_winner} gewinnt {scoreline}"
+    def describe(self, event):
+        """Anzeigetext eines LiveEvent (wie bisher in play_match_live)."""
+        kind, name, visit, remaining, score, darts = event
+        if darts:
+            # Dart-Modell: Felder statt nur der Summe
+            visit = f"{visit} ({' '.join(darts)})"
+        if kind == "visit":
+            return f"{name} wirft {visit}, Rest = {remaining}"
+        if kind == "bust":
+            return f"{name} wirft {visit} -> BUST (Rest {remaining})"
+        if kind == "miss":
+            return f"{name} wirft {visit} -> Versuch gescheitert (BUST). Rest bleibt {remaining}"
+        if kind == "180":
+            return f"{name} wirft 180! (große Aufnahme)"
+        if kind == "checkout":
+            return f"✅ {name} wirft {visit} -> Checkout! {name} gewinnt das Leg ({score[0]}-{score[1]})"
+        if kind == "leg":
+            return f"--- Neues Leg (Starter: {name}) ---"
+        if kind == "set":
+            return f"=== Set {score[0]} (Starter: {name}) ==="
+        if kind == "set_won":
+            return (f"🎯 {name} gewinnt das Set {self.set_scores[score[0] + score[1] - 1]} — "
+                    f"Sets {score[0]}-{score[1]}")
+        if kind == "match_won":
+            return f"🏆 Match vorbei! {name} gewinnt {score[0]}:{score[1]}"
+        if self.sets_to_win is None:
+            return f"Match startet: {self.p1.name} vs {self.p2.name} — First to {self.legs_to_win} Legs"
+        return (f"Match startet: {self.p1.name} vs {self.p2.name} — First to {self.sets_to_win} Sets "
+                f"(je First to {self.legs_to_win} Legs)")
+
+    def play_match_live(self, delay=0.7):
+        """
+        Generator: yieldet Zeilen (strings) live. delay in Sekunden zwischen Visits (0 = ohne Pause).
+        Best of Legs und Best of Sets (sets_to_win).
+        """
+        for event in self.play_match_events():
+            yield self.describe(event)
+            if delay and event.kind in PAUSE_AFTER:
+                time.sleep(delay)
@@ -0,0 +1,152 @@
+# simulate_parallel.py
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import diagnostics
+from checkout_routes import DartModel
+from simulate_player import SimulatedPlayer
+from simulate_match import MatchSimulator
+from simulate_batch import empty_summary, merge_summaries, play_matches_batch, play_matches_legs
+from solve_match import visits_distribution
+
+# Shards pro Worker: feiner aufgeteilt für Fortschrittsanzeige und Lastausgleich
+# feste Zahl von Shards (eigener Seed-Strom je Shard), verteilt auf beliebig viele Prozesse:
+# das Ergebnis hängt nur vom Seed ab, nicht von der Zahl der Prozesse
+SHARDS = 64
+
+
+def player_spec(player):
+    """Picklebare Beschreibung eines SimulatedPlayer (ohne Zufallsgenerator)."""
+    darts = None if player.darts is None else tuple(player.darts)
+    return (player.name, player.avg, player.checkout_pct, player.form, player.max_checkout, player.p180, darts)
+
+
+def player_from_spec(spec, rng=None):
+    name, avg, checkout_pct, form, max_checkout, p180, darts = spec
+    return SimulatedPlayer(name, avg, checkout_pct, form, max_checkout,
+                           stats={"p180_per_leg": p180}, rng=rng,
+                           darts=None if darts is None else DartModel(*darts))
+
+
+def _visits_from_spec(spec):
+    return visits_distribution(player_from_spec(spec))
+
+
+def visits_distributions(players, workers=None, min_parallel=8):
+    """
+    solve_match.visits_distribution je Spieler (eine Markov-Kette je Spieler), bei workers > 1
+    und mindestens min_parallel Spielern parallel im Prozess-Pool. Reihenfolge wie players.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1 or len(players) < min_parallel:
+        return [visits_distribution(p) for p in players]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_visits_from_spec, [player_spec(p) for p in players],
+                             chunksize=max(1, len(players) // (4 * workers))))
+
+
+def play_matches_scalar(player1, player2, legs_to_win, n, sets_to_win=None):
+    """
+    n Matches mit MatchSimulator.play_match_lean (Wurf für Wurf, Spieler aus
+    SimulatedPlayer.compile-Tabellen), zusammengefasst im Format von simulate_batch.empty_summary.
+    """
+    summary = empty_summary(player1.name, player2.name)
+    player1.compile()
+    player2.compile()
+    sim = MatchSimulator(player1, player2, legs_to_win=legs_to_win, sets_to_win=sets_to_win)
+    # play_match_lean: nur ganzzahlige Zähler je Match, Strings erst am Ende
+    scores, set_tally = {}, {}
+    wins1 = n180_1 = n180_2 = legs = 0
+    for _ in range(n):
+        p1_won, score1, score2, a, b, match_legs = sim.play_match_lean(set_tally=set_tally)
+        wins1 += p1_won
+        scores[score1, score2] = scores.get((score1, score2), 0) + 1
+        n180_1 += a
+        n180_2 += b
+        legs += match_legs
+    summary["wins"] = {player1.name: wins1, player2.name: n - wins1}
+    summary["scorelines"].update({f"{a}:{b}": count for (a, b), count in scores.items()})
+    summary["total_180s"] = {player1.name: n180_1, player2.name: n180_2}
+    summary["total_legs"] = legs
+    summary["total_visits"] = sim.visits
+    if sets_to_win is not None:
+        summary["total_sets"] = sum(set_tally.values())
+        summary["set_scorelines"].update({f"{a}:{b}": count for (a, b), count in set_tally.items()})
+    summary["simulations"] = n
+    return summary
+
+
+def _run_shard(spec1, spec2, legs_to_win, n, seed_seq, engine, sets_to_win=None):
+    """Ein Shard mit eigenem, unabhängigem Zufallsstrom (läuft im Worker-Prozess)."""
+    if engine == "scalar":
+        rng = random.Random(int(seed_seq.generate_state(1, dtype=np.uint64)[0]))
+        p1 = player_from_spec(spec1, rng)
+        p2 = player_from_spec(spec2, rng)
+        return play_matches_scalar(p1, p2, legs_to_win, n, sets_to_win)
+    play = play_matches_legs if engine == "legs" else play_matches_batch
+    return play(player_from_spec(spec1), player_from_spec(spec2), legs_to_win, n,
+                rng=np.random.default_rng(seed_seq), sets_to_win=sets_to_win)
+
+
+def shard_sizes(simulations, shards):
+    base, extra = divmod(simulations, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def run_parallel(player1, player2, legs_to_win, simulations, workers=None, seed=None,
+                 engine="legs", progress=None, sets_to_win=None):
+    """
+    Verteilt simulations Matches auf einen Prozess-Pool.
+    Jeder Shard erhält einen eigenen Seed-Strom aus np.random.SeedSequence(seed).spawn(),
+    die Shard-Aggregate werden in fester Reihenfolge zusammengeführt. Die Zahl der Shards ist
+    fest (SHARDS), für gleichen seed ist das Ergebnis damit bitgenau reproduzierbar, egal mit
+    wie vielen Prozessen (workers) gerechnet wird.
+    engine: "legs" (vektorisiert, ein Zug je Leg aus der exakten Leg-Verteilung),
+    "batch" (vektorisiert, jede Aufnahme) oder "scalar" (SimulatedPlayer/MatchSimulator).
+    sets_to_win: None = Best of Legs, sonst First to sets_to_win Sets à legs_to_win Legs.
+    progress: optionaler Callback mit dem erledigten Anteil (0..1).
+    Dauer und Durchsatz landen in diagnostics.METRICS (mit cProfile, falls eingeschaltet).
+    """
+    start = time.perf_counter()
+    with diagnostics.profiled("Monte Carlo"):
+        summary = _run_shards(player1, player2, legs_to_win, simulations, workers, seed, engine,
+                              progress, sets_to_win)
+    diagnostics.record_simulation(summary, time.perf_counter() - start)
+    return summary
+
+
+def _run_shards(player1, player2, legs_to_win, simulations, workers, seed, engine, progress, sets_to_win):
+    workers = max(1, workers or os.cpu_count() or 1)
+    shards = SHARDS
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    sizes = shard_sizes(simulations, shards)
+    spec1, spec2 = player_spec(player1), player_spec(player2)
+    args = [(spec1, spec2, legs_to_win, size, seed_seq, engine, sets_to_win)
+            for size, seed_seq in zip(sizes, seeds)]
+
+    results = [None] * shards
+    done = 0
+    if workers == 1:
+        for i, a in enumerate(args):
+            results[i] = _run_shard(*a)
+            done += sizes[i]
+            if progress:
+                progress(done / max(1, simulations))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_run_shard, *a): i for i, a in enumerate(args)}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += sizes[i]
+                if progress:
+                    progress(done / max(1, simulations))
+
+    summary = empty_summary(player1.name, player2.name)
+    for shard in results:
+        summary = merge_summaries(summary, shard)
+    return summary
@@ -1,13 +1,25 @@
 # simulate_player.py
 import random
+from bisect import bisect_right
+
+from checkout_routes import dart_model_from_row, dart_tables, throw_darts
+from normalize_stats import to_number
+from simulate_batch import (CHECKOUT_SUCCESS_BOUNDS, EXACT_FINISH, MISS_FACTOR, MISS_FLOOR, START_SCORE,
+                            TRY_CHECKOUT_PROB, VISIT_SIGMA, VISIT_SUCCESS_BOUNDS, visit_tables)
 
 class SimulatedPlayer:
-    def __init__(self, name, avg, checkout_pct, form=5, max_checkout=170, stats=None):
+    __slots__ = ("name", "avg", "checkout_pct", "form", "max_checkout", "stats", "rng", "p180", "tables",
+                 "darts", "last_darts")
+
+    def __init__(self, name, avg, checkout_pct, form=5, max_checkout=170, stats=None, rng=None, darts=None):
         """
         avg: drei-dart average (z.B. 97.5)
         checkout_pct: Prozent (z.B. 42.0)
         form: 0-10 Skala
         stats: optional dict mit historischen Werten, z.B. {"p180_per_leg": 0.12, "total_180s": 50, "matches": 10}
+        rng: optional eigener Zufallsgenerator (random.Random), sonst das globale random-Modul
+        darts: optional checkout_routes.DartModel — dann wird Dart für Dart nach der
+               Checkout-Tabelle geworfen statt einer Aufnahme als Ganzes
         """
         self.name = name
         self.avg = float(avg)
@@ -15,6 +27,10 @@ class SimulatedPlayer:
         self.form = float(form)
         self.max_checkout = int(max_checkout)
         self.stats = stats or {}
+        self.rng = rng
+        self.tables = None   # siehe compile()
+        self.darts = darts
+        self.last_darts = None   # getroffene Felder der letzten Aufnahme im Dart-Modell (ohne compile)
 
         # p180: Wahrscheinlichkeit eine komplette Aufnahme =180 zu werfen (per visit)
         if "p180_per_leg" in self.stats:
@@ -31,6 +47,17 @@ class SimulatedPlayer:
             est = 0.03 + max(0.0, (self.avg - 80.0)) * 0.008
             self.p180 = min(max(est, 0.005), 0.30)
 
+    def compile(self):
+        """
+        Rechnet das Aufnahme-Modell einmalig in Tabellen um (simulate_batch.VisitTables, je
+        Parameter gecacht). Danach ziehen throw_visit und attempt_checkout per Tabellen-Lookup
+        und Inverse-CDF statt jedes Mal Formfaktor, Grenzen und gauss neu zu berechnen — gleiche
+        Verteilung, andere Zufallszüge. Nach Änderung der Parameter erneut aufrufen.
+        Gibt die Tabellen zurück.
+        """
+        self.tables = visit_tables(self)
+        return self.tables
+
     def throw_visit(self, remaining=None):
         """
         Simuliere eine 'Aufnahme' (3 Darts).
@@ -38,31 +65,38 @@ class SimulatedPlayer:
         aufs Auschecken; sonst normale Scoring-Aufnahme.
         Gibt integer Punkte (0..180) zurück.
         """
+        rng = self.rng or random
+        if self.tables is not None:
+            row = START_SCORE if remaining is None or remaining > START_SCORE else remaining
+            score = bisect_right(self.tables.throw_rows[row], rng.random())
+            return int(remaining) if score == EXACT_FINISH else score
+        if self.darts is not None:
+            self.last_darts, score, _ = throw_darts(dart_tables(self.darts, self.form), remaining, rng)
+            return score
         # wenn gezielt aufs Checkout (remaining <= max_checkout), erhöhe Chance, das exakte Restscore zu versuchen
         if remaining is not None and remaining <= self.max_checkout and remaining > 1:
             # Spieler versucht häufiger das Finish: Heuristisch
-            try_checkout_prob = 0.55  # Anteil der Besuche, in denen gezielt aufs Finish gegangen wird (heuristisch)
-            if random.random() < try_checkout_prob:
+            if rng.random() < TRY_CHECKOUT_PROB:
                 # Versuchen, das Finish zu treffen: mit gewisser Wahrscheinlichkeit Erfolg,
                 # sonst ein normaler (kleinerer) Score (Miss)
                 success_prob = (self.checkout_pct / 100.0) * (1.0 + (self.form - 5.0) / 25.0)
-                success_prob = min(max(success_prob, 0.02), 0.95)
-                if random.random() < success_prob:
+                success_prob = min(max(success_prob, VISIT_SUCCESS_BOUNDS[0]), VISIT_SUCCESS_BOUNDS[1])
+                if rng.random() < success_prob:
                     # Wir modellieren Erfolg als exakte Auszahlung (visit == remaining)
                     return int(remaining)
                 else:
                     # Miss beim Checkout: plausible kleine bis mittlere Aufnahme (z. B. 40-140)
-                    mu = max(20.0, self.avg * 0.6)
-                    score = int(round(random.gauss(mu, 12)))
+                    mu = max(MISS_FLOOR, self.avg * MISS_FACTOR)
+                    score = int(round(rng.gauss(mu, VISIT_SIGMA)))
                     return max(0, min(180, score))
 
         # Normale Aufnahme (Scoring)
-        if random.random() < self.p180:
+        if rng.random() < self.p180:
             return 180
 
         # ansonsten normal verteilt um das Average (three-dart average)
         mu = self.avg
-        score = int(round(random.gauss(mu, 12)))
+        score = int(round(rng.gauss(mu, VISIT_SIGMA)))
         # clamp
         if score < 0:
             score = 0
@@ -75,12 +109,58 @@ class SimulatedPlayer:
         Wenn ein Spieler eine Aufnahme exakt auf 0 bringt (visit == remaining), entscheidet
         attempt_checkout, ob das Auschecken realistisch gelingt (berücksichtigt checkout_pct, form).
         """
+        rng = self.rng or random
         if remaining <= 0 or remaining > self.max_checkout:
             return False
+        if self.tables is not None:
+            return remaining > 1 and rng.random() < self.tables.checkout_list[remaining]
+        if self.darts is not None:
+            # throw_darts liefert den vollen Rest nur bei einem Finish über ein Doppel
+            return remaining > 1
         if remaining == 1:
             return False  # niemals möglich
         base = (self.checkout_pct / 100.0)
         modifier = 1.0 + (self.form - 5.0) / 25.0
         prob = base * modifier
-        prob = min(max(prob, 0.01), 0.95)
-        return random.random() < prob
+        prob = min(max(prob, CHECKOUT_SUCCESS_BOUNDS[0]), CHECKOUT_SUCCESS_BOUNDS[1])
+        return rng.random() < prob
+
+
+def estimate_p180_from_history(p, avg_legs_per_match=8):
+    # tries to compute a reasonable per-visit 180 probability
+    total_180s = None
+    for cand in ["180's", "180s", "Total180s", "Total 180s"]:
+        if cand in p:
+            total_180s = to_number(p[cand], None)
+            if total_180s is not None:
+                break
+    matches = None
+    for cand in ["Matches_Played", "Matches", "MatchesPlayed", "Matches Played", "match_count"]:
+        if cand in p:
+            matches = to_number(p[cand], None)
+            if matches is not None:
+                break
+    if total_180s and matches and matches > 0:
+        per_leg = total_180s / (matches * avg_legs_per_match)
+        # clamp
+        return float(max(0.002, min(per_leg, 0.5)))
+    # fallback estimate from average
+    avg = to_number(p.get("Averages", p.get("Avg", None)), 90.0)
+    est = 0.03 + max(0.0, (avg - 80.0)) * 0.008
+    return float(min(max(est, 0.005), 0.30))
+
+
+def player_from_row(name, row, rng=None, darts=False):
+    """
+    SimulatedPlayer aus einer Zeile der Spielerdaten (Store/CSV), wie ihn die App baut;
+    darts=True: mit Dart-für-Dart-Modell (checkout_routes.dart_model_from_row).
+    """
+    return SimulatedPlayer(
+        name,
+        avg=to_number(row.get("Averages", row.get("Avg", 90)), 90.0),
+        checkout_pct=to_number(row.get("Checkout Pcnt", 35), 35.0),
+        form=to_number(row.get("Form", 5), 5.0),
+        stats={"p180_per_leg": estimate_p180_from_history(row)},
+        rng=rng,
+        darts=dart_model_from_row(row) if darts else None,
+    )
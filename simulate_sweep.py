@@ -0,0 +1,114 @@
+# simulate_sweep.py
+"""
+Was-wäre-wenn-Sweeps: Siegwahrscheinlichkeit einer Paarung über einem Raster von
+SimulatedPlayer-Parametern (avg, checkout_pct, form, p180) eines Spielers.
+
+Jeder Rasterpunkt wird exakt mit solve_match.match_probabilities gerechnet (Markov-Kette
+über die Aufnahme-Tabellen, dann die Leg-/Set-Folge): kein Monte-Carlo-Rauschen, Unterschiede
+zwischen Rasterpunkten sind glatt, und ein Punkt kostet etwa eine Millisekunde.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from simulate_player import SimulatedPlayer
+from solve_match import match_probabilities
+
+# Parameter -> Beschriftung in der App
+SWEEP_PARAMETERS = {
+    "avg": "Average",
+    "checkout_pct": "Checkout %",
+    "form": "Form",
+    "p180": "180er je Aufnahme",
+}
+# sinnvoller Wertebereich je Parameter (Raster werden darauf beschnitten)
+PARAMETER_LIMITS = {
+    "avg": (40.0, 120.0),
+    "checkout_pct": (5.0, 70.0),
+    "form": (0.0, 10.0),
+    "p180": (0.005, 0.5),
+}
+
+
+def vary(player, **changes):
+    """Kopie von player mit geänderten Parametern (Schlüssel aus SWEEP_PARAMETERS)."""
+    unknown = set(changes) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unbekannte Parameter: {', '.join(sorted(unknown))}")
+    values = {name: getattr(player, name) for name in SWEEP_PARAMETERS}
+    values.update(changes)
+    return SimulatedPlayer(player.name, values["avg"], values["checkout_pct"], values["form"],
+                           player.max_checkout, stats={"p180_per_leg": values["p180"]})
+
+
+def grid_around(player, name, spread=0.2, steps=9):
+    """steps Werte von name um den aktuellen Wert des Spielers (± spread relativ), beschnitten."""
+    low, high = PARAMETER_LIMITS[name]
+    value = getattr(player, name)
+    values = np.linspace(value * (1.0 - spread), value * (1.0 + spread), steps)
+    return np.unique(np.clip(values, low, high))
+
+
+def sweep(player1, player2, legs_to_win, grid, sets_to_win=None, player=0, progress=None):
+    """
+    Siegwahrscheinlichkeit von player1 für alle Kombinationen aus grid, angewandt auf
+    player1 (player=0) bzw. player2 (player=1); P1 beginnt das Match wie in den Engines.
+    grid: {Parameter: Werte}, ein oder zwei Einträge mit Schlüsseln aus SWEEP_PARAMETERS.
+    progress: optionaler Callback mit dem Anteil erledigter Rasterpunkte (0..1).
+
+    Gibt dict zurück:
+      parameters, axes        Parameternamen und ihre Werte (Reihenfolge wie grid)
+      win                     Array der Form (len(axes[0]), len(axes[1])...): P(P1 gewinnt)
+      expected_legs           erwartete Legs je Match
+      base                    P(P1 gewinnt) mit den unveränderten Parametern
+      seconds
+    """
+    if not 1 <= len(grid) <= 2:
+        raise ValueError("grid braucht einen oder zwei Parameter")
+    parameters = list(grid)
+    axes = [np.asarray(grid[name], dtype=float) for name in parameters]
+    start = time.perf_counter()
+    name1 = player1.name
+    base = match_probabilities(player1, player2, legs_to_win, sets_to_win)["wins"][name1]
+
+    shape = tuple(len(axis) for axis in axes)
+    win, legs = np.empty(shape), np.empty(shape)
+    points = list(np.ndindex(shape))
+    for done, point in enumerate(points, start=1):
+        changes = {name: float(axis[i]) for name, axis, i in zip(parameters, axes, point)}
+        if player == 0:
+            exact = match_probabilities(vary(player1, **changes), player2, legs_to_win, sets_to_win)
+        else:
+            exact = match_probabilities(player1, vary(player2, **changes), legs_to_win, sets_to_win)
+        win[point] = exact["wins"][name1]
+        legs[point] = exact["expected_legs"]
+        if progress:
+            progress(done / len(points))
+
+    return {
+        "parameters": parameters,
+        "axes": axes,
+        "player": (player1, player2)[player].name,
+        "win": win,
+        "expected_legs": legs,
+        "base": base,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def surface_frame(result):
+    """
+    Ergebnis von sweep als Tabelle zum Plotten: Index = Werte des ersten Parameters,
+    eine Spalte je Wert des zweiten Parameters (bzw. eine Spalte "Sieg %").
+    """
+    first = SWEEP_PARAMETERS[result["parameters"][0]]
+    percent = result["win"] * 100
+    if len(result["parameters"]) == 1:
+        frame = pd.DataFrame({"Sieg %": percent}, index=result["axes"][0])
+    else:
+        second = SWEEP_PARAMETERS[result["parameters"][1]]
+        frame = pd.DataFrame(percent, index=result["axes"][0],
+                             columns=[f"{second} {value:g}" for value in result["axes"][1]])
+    frame.index.name = first
+    return frame
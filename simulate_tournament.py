@@ -0,0 +1,279 @@
+# simulate_tournament.py
+"""
+K.-o.-Turnier über die Spielertabelle: gesetzte Auslosung von 32/64/128 Spielern,
+legs_to_win je Runde, zehntausende Turnierdurchläufe auf einmal.
+
+Die Siegwahrscheinlichkeiten der Paarungen werden einmal je Feld und Format berechnet
+und zwischengespeichert: exakt für alle Paare auf einmal (solve_match.win_probability_matrix,
+die Aufnahme-Verteilungen der Spieler parallel im Prozess-Pool) oder per Monte Carlo mit
+MatchSimulator.play_matches für die im Tableau möglichen Paarungen. Ein Turnierdurchlauf
+ist danach nur noch ein Zufallszug je Match, alle Durchläufe einer Runde laufen als ein
+NumPy-Schritt.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from player_store import load_players, unique_players
+from simulate_batch import player_key
+from simulate_match import MatchSimulator
+from simulate_parallel import player_from_spec, player_spec, visits_distributions
+from simulate_player import player_from_row
+from solve_match import match_probabilities, win_probability_matrix
+
+FIELD_SIZES = (32, 64, 128)
+DEFAULT_LEGS_TO_WIN = 6
+# Turniere pro NumPy-Block (begrenzt den Speicher: Block x Feldgröße Einträge)
+TOURNAMENT_CHUNK = 20000
+# Paarungen pro Auftrag an den Prozess-Pool
+PAIR_CHUNK = 256
+
+# (Spieler a, Spieler b, legs_to_win, pair_simulations) -> P(a schlägt b)
+_PAIR_CACHE = {}
+# (Spieler des Felds, legs_to_win) -> exakte Matrix P(i schlägt j)
+_MATRIX_CACHE = {}
+
+
+def load_field(size, df=None, seed_by="Averages"):
+    """
+    Die size besten Spieler nach seed_by (absteigend) als SimulatedPlayer;
+    Listenposition = Setzplatz - 1. Namensvettern heißen "Name (Id)" (player_store.unique_players).
+    """
+    if size not in FIELD_SIZES:
+        raise ValueError(f"Feldgröße muss eine von {FIELD_SIZES} sein, nicht {size}")
+    df = load_players() if df is None else df
+    ranked = df.assign(_seed_value=pd.to_numeric(df[seed_by], errors="coerce"))
+    ranked = unique_players(ranked.dropna(subset=["_seed_value"]))
+    ranked = ranked.sort_values("_seed_value", ascending=False, kind="stable").head(size)
+    if len(ranked) < size:
+        raise ValueError(f"Nur {len(ranked)} Spieler mit '{seed_by}' vorhanden, {size} benötigt")
+    return [player_from_row(row["Label"], row) for _, row in ranked.iterrows()]
+
+
+def bracket_order(size):
+    """
+    Setzplätze (ab 0) in Tableau-Reihenfolge: 1 gegen size, 2 und 1 treffen sich
+    erst im Finale, 1-4 frühestens im Halbfinale usw.
+    """
+    order = [0]
+    while len(order) < size:
+        n = 2 * len(order)
+        order = [x for seed in order for x in (seed, n - 1 - seed)]
+    return order
+
+
+def round_names(size):
+    """Spaltennamen je Runde: 'Letzte 128', ..., 'Viertelfinale', 'Halbfinale', 'Finale'."""
+    named = {8: "Viertelfinale", 4: "Halbfinale", 2: "Finale"}
+    names = []
+    while size >= 2:
+        names.append(named.get(size, f"Letzte {size}"))
+        size //= 2
+    return names
+
+
+def possible_pairs(order, round_index):
+    """Alle Paarungen (Spielerindex, Spielerindex), die in Runde round_index (ab 0) möglich sind."""
+    block = 2 ** (round_index + 1)
+    half = block // 2
+    pairs = []
+    for start in range(0, len(order), block):
+        left, right = order[start:start + half], order[start + half:start + block]
+        pairs.extend((a, b) for a in left for b in right)
+    return pairs
+
+
+def pair_win_probability(player_a, player_b, legs_to_win, pair_simulations=None, rng=None):
+    """
+    P(player_a schlägt player_b) in First to legs_to_win, gemittelt über beide Anwurf-
+    Reihenfolgen (wer das Match beginnt, wird ausgebullt).
+    pair_simulations=None rechnet exakt (solve_match), sonst Monte Carlo mit so vielen Matches.
+    """
+    if pair_simulations is None:
+        p_on = match_probabilities(player_a, player_b, legs_to_win)["wins"][player_a.name]
+        p_against = match_probabilities(player_b, player_a, legs_to_win)["wins"][player_a.name]
+        return 0.5 * (p_on + p_against)
+    rng = np.random.default_rng(rng)
+    half = max(1, pair_simulations // 2)
+    on = MatchSimulator(player_a, player_b, legs_to_win).play_matches(half, rng=rng)
+    against = MatchSimulator(player_b, player_a, legs_to_win).play_matches(half, rng=rng)
+    return (on["wins"][player_a.name] + against["wins"][player_a.name]) / (2 * half)
+
+
+def _pair_chunk(jobs, pair_simulations, seed_seq):
+    """Ein Auftrag im Worker-Prozess: jobs = [(spec_a, spec_b, legs_to_win), ...]."""
+    rng = np.random.default_rng(seed_seq)
+    return [
+        pair_win_probability(player_from_spec(a), player_from_spec(b), legs, pair_simulations, rng)
+        for a, b, legs in jobs
+    ]
+
+
+def _pair_key(player_a, player_b, legs_to_win, pair_simulations):
+    return (player_key(player_a), player_key(player_b), legs_to_win, pair_simulations)
+
+
+def pair_probabilities(players, needed, pair_simulations=None, workers=None, seed=None, progress=None):
+    """
+    Füllt den Paarungs-Cache für needed = [(i, j, legs_to_win), ...] (Indizes in players).
+    Nur noch nicht bekannte Paarungen werden berechnet, bei workers > 1 verteilt auf einen
+    Prozess-Pool. seed: int oder SeedSequence (nur für pair_simulations relevant).
+    Gibt {(i, j, legs_to_win): P(i schlägt j)} zurück.
+    progress: optionaler Callback mit dem erledigten Anteil (0..1).
+    """
+    todo, seen = [], set()
+    for i, j, legs in needed:
+        key = _pair_key(players[i], players[j], legs, pair_simulations)
+        if key not in _PAIR_CACHE and key not in seen:
+            seen.add(key)
+            todo.append((i, j, legs))
+
+    # nach Spieler sortiert: ein Auftrag braucht so nur wenige Ketten je Spieler (solve_match-Cache)
+    todo.sort()
+    chunks = [todo[k:k + PAIR_CHUNK] for k in range(0, len(todo), PAIR_CHUNK)]
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    seeds = seed_seq.spawn(len(chunks))
+    specs = [player_spec(p) for p in players]
+    args = [([(specs[i], specs[j], legs) for i, j, legs in chunk], pair_simulations, seed_seq)
+            for chunk, seed_seq in zip(chunks, seeds)]
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    done = 0
+
+    def store(chunk, probs):
+        nonlocal done
+        for (i, j, legs), p in zip(chunk, probs):
+            _PAIR_CACHE[_pair_key(players[i], players[j], legs, pair_simulations)] = p
+            _PAIR_CACHE[_pair_key(players[j], players[i], legs, pair_simulations)] = 1.0 - p
+        done += len(chunk)
+        if progress:
+            progress(done / max(1, len(todo)))
+
+    if workers == 1 or len(chunks) <= 1:
+        for chunk, a in zip(chunks, args):
+            store(chunk, _pair_chunk(*a))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk, probs in zip(chunks, pool.map(_pair_chunk, *zip(*args))):
+                store(chunk, probs)
+
+    return {(i, j, legs): _PAIR_CACHE[_pair_key(players[i], players[j], legs, pair_simulations)]
+            for i, j, legs in needed}
+
+
+def exact_matrix(players, legs_to_win, workers=None):
+    """
+    Exakte Matrix P(i schlägt j) für alle Paare des Felds, gemittelt über beide Anwurf-
+    Reihenfolgen. Die Aufnahme-Verteilungen (eine Markov-Kette je Spieler) werden bei
+    workers > 1 parallel berechnet; das Ergebnis wird je Feld und legs_to_win gecacht.
+    """
+    key = (tuple(player_key(p) for p in players), legs_to_win)
+    if key not in _MATRIX_CACHE:
+        distributions = visits_distributions(players, workers)
+        on_throw = win_probability_matrix(players, legs_to_win, distributions=distributions)
+        if len(_MATRIX_CACHE) >= 16:
+            _MATRIX_CACHE.clear()
+        _MATRIX_CACHE[key] = 0.5 * (on_throw + 1.0 - on_throw.T)
+    return _MATRIX_CACHE[key]
+
+
+def simulate_tournament(players, legs_per_round=DEFAULT_LEGS_TO_WIN, simulations=20000, seed=None,
+                        workers=None, pair_simulations=None, progress=None):
+    """
+    Simuliert das K.-o.-Turnier simulations-mal. players: Liste SimulatedPlayer nach Setzplatz
+    (siehe load_field), Länge 32/64/128. legs_per_round: legs_to_win für alle Runden oder
+    eine Liste je Runde (erste Runde zuerst).
+    progress(phase, fraction): phase "Paarungen" bzw. "Turniere".
+    Gibt einen DataFrame mit Setzplatz, Name, der Wahrscheinlichkeit, jede Runde zu erreichen,
+    und der Titelwahrscheinlichkeit zurück (nach Titel absteigend).
+    """
+    size = len(players)
+    if size not in FIELD_SIZES:
+        raise ValueError(f"Feldgröße muss eine von {FIELD_SIZES} sein, nicht {size}")
+    names = round_names(size)
+    rounds = len(names)
+    if isinstance(legs_per_round, int):
+        legs_per_round = [legs_per_round] * rounds
+    if len(legs_per_round) != rounds:
+        raise ValueError(f"{rounds} Runden, aber {len(legs_per_round)} Werte für legs_to_win")
+
+    order = bracket_order(size)
+    seeds = np.random.SeedSequence(seed).spawn(2)
+
+    # Siegwahrscheinlichkeiten der möglichen Paarungen je Runde als Matrix [a, b]
+    if pair_simulations is None:
+        matrices = []
+        formats = sorted(set(legs_per_round))
+        for k, legs in enumerate(formats):
+            matrices.append(exact_matrix(players, legs, workers))
+            if progress:
+                progress("Paarungen", (k + 1) / len(formats))
+        matrices = [matrices[formats.index(legs)] for legs in legs_per_round]
+    else:
+        needed = [(i, j, legs_per_round[r]) for r in range(rounds) for i, j in possible_pairs(order, r)]
+        probs = pair_probabilities(
+            players, needed, pair_simulations, workers, seeds[0],
+            progress=(lambda f: progress("Paarungen", f)) if progress else None,
+        )
+        matrices = []
+        for r in range(rounds):
+            matrix = np.full((size, size), np.nan)
+            for i, j in possible_pairs(order, r):
+                p = probs[(i, j, legs_per_round[r])]
+                matrix[i, j], matrix[j, i] = p, 1.0 - p
+            matrices.append(matrix)
+
+    rng = np.random.default_rng(seeds[1])
+    reach = np.zeros((rounds + 1, size), dtype=np.int64)   # letzte Zeile = Titel
+    start_slots = np.array(order)
+    for start in range(0, simulations, TOURNAMENT_CHUNK):
+        m = min(TOURNAMENT_CHUNK, simulations - start)
+        slots = np.broadcast_to(start_slots, (m, size))
+        for r in range(rounds):
+            reach[r] += np.bincount(slots.ravel(), minlength=size)
+            a, b = slots[:, 0::2], slots[:, 1::2]
+            slots = np.where(rng.random(a.shape) < matrices[r][a, b], a, b)
+        reach[rounds] += np.bincount(slots.ravel(), minlength=size)
+        if progress:
+            progress("Turniere", (start + m) / simulations)
+
+    result = pd.DataFrame({"Setzplatz": np.arange(1, size + 1), "Name": [p.name for p in players]})
+    for r, name in enumerate(names + ["Titel"]):
+        result[name] = reach[r] / max(1, simulations)
+    return result.sort_values(["Titel", "Setzplatz"], ascending=[False, True], ignore_index=True)
+
+
+def parse_legs_per_round(text, rounds):
+    """'6' oder '6,6,7,7,8,10,11' -> Liste legs_to_win je Runde."""
+    values = [int(v) for v in str(text).replace(";", ",").split(",") if v.strip()]
+    if len(values) == 1:
+        return values * rounds
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="K.-o.-Turnier über die besten Spieler simulieren")
+    parser.add_argument("--size", type=int, default=32, choices=FIELD_SIZES)
+    parser.add_argument("--legs", default=str(DEFAULT_LEGS_TO_WIN),
+                        help="legs_to_win für alle Runden oder kommagetrennt je Runde")
+    parser.add_argument("--simulations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--pair-simulations", type=int, default=None,
+                        help="Monte Carlo je Paarung statt exakter Berechnung")
+    parser.add_argument("--seed-by", default="Averages", help="Spalte für die Setzliste")
+    args = parser.parse_args()
+
+    players = load_field(args.size, seed_by=args.seed_by)
+    legs = parse_legs_per_round(args.legs, len(round_names(args.size)))
+    result = simulate_tournament(players, legs, args.simulations, seed=args.seed, workers=args.workers,
+                                 pair_simulations=args.pair_simulations)
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(result.head(20).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+# snapshot_store.py
+"""
+Historie der Scrapes als anhängbarer Snapshot-Store im Verzeichnis history/.
+
+Jeder Scrape wird eine neue Version: eine Parquet-Partition mit nur den geänderten Zellen
+(Spieler-Id, Spalte, Wert) gegenüber dem bisherigen Stand — neue Spieler mit allen Werten,
+unveränderte Spieler und Spalten gar nicht. Spieler, die in einem Scrape fehlen, behalten
+ihre Werte. Schlüssel ist die Id von dartsorakel; Name ist eine gewöhnliche versionierte Spalte,
+eine Umbenennung setzt die Historie also fort und Namensvettern bleiben getrennt.
+Abgeleitete Spalten (Normalisierungen, Form) werden nicht versioniert.
+
+Neben den Partitionen liegen der aktuelle Stand (head-v*.parquet, eine Zeile je Spieler) und
+der Form-Zustand (form-v*.parquet). Damit braucht ein neuer Scrape nur den letzten Stand, nie
+die ganze Historie: Form Fixed (calculate_form.fixed_form, feste Skalen) wird nur für geänderte
+Spieler neu berechnet, Form Decayed (exponentiell, Halbwertszeit HALF_LIFE_DAYS) und
+Form Rolling (Mittel der letzten FORM_WINDOW Versionen) werden aus dem Zustand fortgeschrieben.
+manifest.json ist der Commit-Punkt: erst wenn es ersetzt ist, gilt die Version.
+
+    python snapshot_store.py                               # Versionen anzeigen
+    python snapshot_store.py --import all_players_stats.csv
+    python snapshot_store.py --player "Luke Littler"       # Verlauf eines Spielers (Name oder Id)
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import diagnostics
+from calculate_form import fixed_form
+from player_store import clean_stats
+
+HISTORY_DIR = "history"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+KEY = "Id"
+NAME = "Name"
+# aus add_form bzw. diesem Store abgeleitet, nicht versioniert
+DERIVED_COLUMNS = {"AvgNorm", "CheckoutNorm", "LegsNorm", "180Norm", "Form",
+                   "Form Fixed", "Form Decayed", "Form Rolling"}
+# Halbwertszeit der geglätteten Form in Tagen
+HALF_LIFE_DAYS = 30.0
+# Versionen im gleitenden Mittel
+FORM_WINDOW = 5
+FORM_COLUMNS = ["Form Fixed", "Form Decayed", "Form Rolling"]
+
+
+def _path(directory, name):
+    return os.path.join(directory, name)
+
+
+def _write_parquet(table, path):
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def read_manifest(directory=HISTORY_DIR):
+    """Manifest des Stores: versions (Liste), head und form (Dateinamen) — leer ohne Store."""
+    try:
+        with open(_path(directory, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"format": FORMAT_VERSION, "versions": [], "head": None, "form": None}
+
+
+def _write_manifest(manifest, directory):
+    path = _path(directory, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_head(directory=HISTORY_DIR, columns=None):
+    """Aktueller Stand (letzte Version) als DataFrame, leer ohne Store."""
+    manifest = read_manifest(directory)
+    if not manifest["head"]:
+        return pd.DataFrame(columns=[KEY])
+    path = _path(directory, manifest["head"])
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [KEY] + [c for c in columns if c in available and c != KEY]
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def form_table(directory=HISTORY_DIR):
+    """Form je Spieler (Id, Name, Form Fixed, Form Decayed, Form Rolling), leer ohne Store."""
+    manifest = read_manifest(directory)
+    columns = [KEY, NAME] + FORM_COLUMNS
+    if not manifest["form"]:
+        return pd.DataFrame(columns=columns)
+    return pq.read_table(_path(directory, manifest["form"]), columns=columns).to_pandas()
+
+
+def with_form(df, directory=HISTORY_DIR, form=None):
+    """
+    df mit den Spalten Form Decayed und Form Rolling (über die Id): aus form (z. B. der "form"
+    einer vorbereiteten Version, prepare_snapshot) oder dem aktuellen Stand des Stores.
+    """
+    form = (form_table(directory) if form is None else form)[[KEY, "Form Decayed", "Form Rolling"]]
+    keys = _keys(df[KEY])
+    return df.assign(**{col: keys.map(form.set_index(KEY)[col]).to_numpy() for col in form.columns[1:]})
+
+
+def _keys(ids):
+    """Ids als Text (123, 123.0 und "123" sind derselbe Spieler)."""
+    return ids.map(lambda v: str(int(v)) if isinstance(v, (int, float, np.integer, np.floating))
+                   and float(v).is_integer() else str(v))
+
+
+def _prepare(df):
+    df = df.drop(columns=[c for c in df.columns if c in DERIVED_COLUMNS])
+    df = clean_stats(df.dropna(subset=[KEY]))
+    df[KEY] = _keys(df[KEY])
+    return df.drop_duplicates(KEY, keep="last").set_index(KEY)
+
+
+def _unchanged(new, old):
+    """Je Zeile: Wert gleich (beide fehlend zählt als gleich)."""
+    both_missing = new.isna().to_numpy() & old.isna().to_numpy()
+    if pd.api.types.is_numeric_dtype(new) and pd.api.types.is_numeric_dtype(old):
+        a = new.to_numpy(dtype=float, na_value=np.nan)
+        b = old.to_numpy(dtype=float, na_value=np.nan)
+        return both_missing | (a == b)
+    return both_missing | (new.astype("string") == old.astype("string")).fillna(False).to_numpy()
+
+
+def diff_cells(old, new):
+    """
+    Geänderte Zellen von new (Index = Id) gegenüber old als langer Frame
+    (Id, column, number, text); neue Spieler und Spalten mit allen vorhandenen Werten,
+    gelöschte Werte als Zeile ohne number und text.
+    """
+    old = old.reindex(new.index)
+    parts = []
+    for col in new.columns:
+        values = new[col]
+        if col in old.columns:
+            changed = ~_unchanged(values, old[col])
+        else:
+            changed = values.notna().to_numpy()
+        if not changed.any():
+            continue
+        values = values[changed]
+        numeric = pd.api.types.is_numeric_dtype(values)
+        parts.append(pd.DataFrame({
+            KEY: values.index.astype(str),
+            "column": col,
+            "number": values.to_numpy(dtype=float, na_value=np.nan) if numeric else np.nan,
+            "text": pd.array([None] * len(values), dtype="string") if numeric else values.astype("string").array,
+        }))
+    if not parts:
+        return pd.DataFrame({KEY: pd.Series(dtype="string"), "column": pd.Series(dtype="string"),
+                             "number": pd.Series(dtype=float), "text": pd.Series(dtype="string")})
+    return pd.concat(parts, ignore_index=True)
+
+
+def apply_cells(state, cells):
+    """Spielt die Zellen einer Partition auf state (Index = Id) ein und gibt den neuen Stand zurück."""
+    if cells.empty:
+        return state
+    names = pd.Index(cells[KEY].unique())
+    state = state.reindex(state.index.union(names, sort=False))
+    for col, group in cells.groupby("column", sort=False):
+        values = group["number"].astype(object).where(group["number"].notna(), group["text"].astype(object))
+        if col not in state.columns:
+            state[col] = pd.Series(np.nan, index=state.index, dtype=object)
+        elif state[col].dtype != object:
+            state[col] = state[col].astype(object)
+        state.loc[group[KEY].to_numpy(), col] = values.to_numpy()
+    return state
+
+
+def _typed(state):
+    """Stand mit den Typen von clean_stats (Zahlen, Int64, Text)."""
+    state = state.copy()
+    for col in state.columns:
+        if state[col].dtype == object:
+            state[col] = state[col].where(state[col].notna(), None)
+    state = clean_stats(state.rename_axis(KEY).reset_index())
+    state[KEY] = _keys(state[KEY])
+    return state
+
+
+def _update_form(previous, head, changed, scraped_at, last_at):
+    """
+    Form-Zustand fortschreiben: Form Fixed nur für changed neu, Decayed/Rolling für alle aus
+    dem bisherigen Zustand (kein Zugriff auf frühere Partitionen).
+    """
+    state = previous.set_index(KEY) if len(previous) else pd.DataFrame(
+        columns=[NAME] + FORM_COLUMNS + ["Form Recent"], index=pd.Index([], name=KEY))
+    state = state.reindex(state.index.union(head.index, sort=False))
+    if NAME in head.columns:
+        state[NAME] = head[NAME].reindex(state.index).fillna(state[NAME])
+    fixed = state["Form Fixed"].astype(float)
+    if len(changed):
+        fixed.loc[changed] = fixed_form(head.loc[changed]).to_numpy()
+    state["Form Fixed"] = fixed
+
+    days = (scraped_at - last_at).total_seconds() / 86400.0 if last_at else 0.0
+    keep = 0.5 ** (max(days, 0.0) / HALF_LIFE_DAYS) if last_at else 0.0
+    decayed = state["Form Decayed"].astype(float)
+    state["Form Decayed"] = (keep * decayed + (1.0 - keep) * fixed).where(decayed.notna(), fixed)
+
+    recent = [(list(r) if isinstance(r, (list, np.ndarray)) else [])[-(FORM_WINDOW - 1):] + [f]
+              for r, f in zip(state["Form Recent"], fixed)]
+    state["Form Recent"] = recent
+    state["Form Rolling"] = [float(np.mean(r)) for r in recent]
+    return state.rename_axis(KEY).reset_index()
+
+
+def append_snapshot(df, scraped_at=None, source="", directory=HISTORY_DIR):
+    """
+    Hängt einen Scrape (roh oder gesäubert, eine Zeile je Spieler) als neue Version an
+    (prepare_snapshot + commit_snapshot). Liest nur den letzten Stand und den Form-Zustand.
+    Gibt den Manifest-Eintrag zurück.
+    """
+    return commit_snapshot(prepare_snapshot(df, scraped_at, source, directory))
+
+
+def prepare_snapshot(df, scraped_at=None, source="", directory=HISTORY_DIR):
+    """
+    Erster Schritt von append_snapshot: berechnet die neue Version und schreibt Partition, Stand
+    und Form-Zustand als neue Dateien. Das Manifest bleibt unverändert, die Version gilt also
+    erst mit commit_snapshot; discard_snapshot verwirft sie (z. B. wenn das Veröffentlichen
+    von CSV und Store scheitert). Gibt die vorbereitete Version zurück (dict mit entry, form).
+    """
+    with diagnostics.timed("Snapshot vorbereiten"):
+        return _prepare_snapshot(df, scraped_at or datetime.now(), source, directory)
+
+
+def _prepare_snapshot(df, scraped_at, source, directory):
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    versions = manifest["versions"]
+    version = versions[-1]["version"] + 1 if versions else 1
+
+    new = _prepare(df)
+    old = load_head(directory).set_index(KEY)
+    cells = diff_cells(old, new)
+    changed = pd.Index(cells[KEY].unique())
+    head = _typed(apply_cells(old, cells)).set_index(KEY)
+
+    previous_form = pd.DataFrame()
+    if manifest["form"]:
+        previous_form = pq.read_table(_path(directory, manifest["form"])).to_pandas()
+    last_at = datetime.fromisoformat(versions[-1]["scraped_at"]) if versions else None
+    form = _update_form(previous_form, head, changed, scraped_at, last_at)
+
+    entry = {
+        "version": version,
+        "file": f"v{version:06d}.parquet",
+        "scraped_at": scraped_at.isoformat(timespec="seconds"),
+        "source": source,
+        "players": len(head),
+        "changed_players": len(changed),
+        "cells": len(cells),
+        "columns": sorted(cells["column"].unique().tolist()),
+    }
+    head_file, form_file = f"head-v{version:06d}.parquet", f"form-v{version:06d}.parquet"
+    # Dateien einer verworfenen Version gleicher Nummer werden hier einfach überschrieben
+    _write_parquet(pa.Table.from_pandas(cells, preserve_index=False), _path(directory, entry["file"]))
+    _write_parquet(pa.Table.from_pandas(head.reset_index(), preserve_index=False), _path(directory, head_file))
+    _write_parquet(pa.Table.from_pandas(form, preserve_index=False), _path(directory, form_file))
+    return {"directory": directory, "manifest": manifest, "entry": entry, "head": head_file,
+            "form_file": form_file, "form": form[[KEY, NAME] + FORM_COLUMNS]}
+
+
+def commit_snapshot(pending):
+    """Macht eine mit prepare_snapshot vorbereitete Version gültig (Manifest ersetzen)."""
+    directory, manifest = pending["directory"], pending["manifest"]
+    if read_manifest(directory)["versions"] != manifest["versions"]:
+        raise RuntimeError("Historie wurde seit prepare_snapshot geändert")
+    stale = [manifest["head"], manifest["form"]]
+    manifest = dict(manifest, format=FORMAT_VERSION, versions=manifest["versions"] + [pending["entry"]],
+                    head=pending["head"], form=pending["form_file"])
+    _write_manifest(manifest, directory)
+    for name in stale:
+        if name:
+            try:
+                os.remove(_path(directory, name))
+            except FileNotFoundError:
+                pass
+    return pending["entry"]
+
+
+def discard_snapshot(pending):
+    """Löscht die Dateien einer nicht übernommenen Version; die Historie bleibt wie sie war."""
+    for name in (pending["entry"]["file"], pending["head"], pending["form_file"]):
+        try:
+            os.remove(_path(pending["directory"], name))
+        except FileNotFoundError:
+            pass
+
+
+def load_version(version, directory=HISTORY_DIR, columns=None):
+    """
+    Stand nach Version version, Partition für Partition eingespielt (immer nur eine im Speicher).
+    columns: nur diese Spalten lesen.
+    """
+    state = pd.DataFrame(index=pd.Index([], name=KEY))
+    for entry in read_manifest(directory)["versions"]:
+        if entry["version"] > version:
+            break
+        filters = [("column", "in", list(columns))] if columns else None
+        state = apply_cells(state, pq.read_table(_path(directory, entry["file"]), filters=filters).to_pandas())
+    return _typed(state)
+
+
+def resolve_player(player, directory=HISTORY_DIR):
+    """
+    Id zu player (Id oder aktueller Name, Groß-/Kleinschreibung egal); None, wenn unbekannt.
+    Bei Namensvettern ValueError mit den Ids.
+    """
+    head = load_head(directory, [NAME])
+    key = str(player)
+    if key in set(head[KEY]):
+        return key
+    if NAME not in head.columns:
+        return None
+    ids = head.loc[head[NAME].astype("string").str.casefold() == key.casefold(), KEY].tolist()
+    if len(ids) > 1:
+        raise ValueError(f"Name {player!r} nicht eindeutig, Ids: {', '.join(ids)}")
+    return ids[0] if ids else None
+
+
+def player_history(player, columns=None, directory=HISTORY_DIR):
+    """
+    Verlauf eines Spielers (Id oder aktueller Name): eine Zeile je Version (Index scraped_at) mit
+    den damals gültigen Werten, auch über Umbenennungen hinweg. Aus jeder Partition werden nur
+    die Zeilen des Spielers gelesen.
+    """
+    key = resolve_player(player, directory)
+    if key is None:
+        return pd.DataFrame()
+    rows, current = [], {}
+    for entry in read_manifest(directory)["versions"]:
+        filters = [(KEY, "=", key)]
+        if columns:
+            filters.append(("column", "in", list(columns)))
+        cells = pq.read_table(_path(directory, entry["file"]), filters=filters).to_pandas()
+        for col, number, text in zip(cells["column"], cells["number"], cells["text"]):
+            current[col] = number if pd.notna(number) else (None if pd.isna(text) else text)
+        if current:
+            rows.append({"scraped_at": pd.Timestamp(entry["scraped_at"]), "version": entry["version"], **current})
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).set_index("scraped_at")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot-Store der Spielerdaten")
+    parser.add_argument("--dir", default=HISTORY_DIR)
+    parser.add_argument("--import", dest="import_csv", help="CSV (Trennzeichen ;) als neue Version anhängen")
+    parser.add_argument("--scraped-at", help="Zeitpunkt der importierten Daten (ISO), sonst Änderungszeit der Datei")
+    parser.add_argument("--player", help="Verlauf eines Spielers anzeigen (Name oder Id)")
+    args = parser.parse_args()
+
+    if args.import_csv:
+        df = pd.read_csv(args.import_csv, sep=";")
+        df.columns = [c.strip() for c in df.columns]
+        scraped_at = (datetime.fromisoformat(args.scraped_at) if args.scraped_at
+                      else datetime.fromtimestamp(os.path.getmtime(args.import_csv)))
+        entry = append_snapshot(df, scraped_at, source=args.import_csv, directory=args.dir)
+        print(f"✅ Version {entry['version']}: {entry['changed_players']} Spieler, {entry['cells']} Zellen geändert")
+    if args.player:
+        print(player_history(args.player, directory=args.dir).to_string())
+        return
+    for entry in read_manifest(args.dir)["versions"]:
+        print(f"v{entry['version']:<4} {entry['scraped_at']}  {entry['changed_players']:5} Spieler "
+              f"{entry['cells']:7} Zellen  {entry['source']}")
+
+
+if __name__ == "__main__":
+    main()
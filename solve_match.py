@@ -0,0 +1,315 @@
+# solve_match.py
+"""
+Exakte Leg-/Match-Wahrscheinlichkeiten ohne Sampling.
+
+Das Aufnahme-Modell von SimulatedPlayer hängt nur vom eigenen Restscore ab.
+Der Leg-Zustand (Rest P1, Rest P2, wer wirft) ist damit eine endliche Markov-Kette,
+die in zwei unabhängige Ketten zerfällt: für jeden Spieler die Verteilung der
+Anzahl Aufnahmen T bis zum Checkout. Der Starter gewinnt das Leg, wenn
+T_starter <= T_gegner ist. Sets sind ein "First to" über Legs, das Match ein
+"First to" über Sets (bzw. Legs) — beides mit wechselndem Starter.
+"""
+from collections import Counter
+
+import numpy as np
+
+from simulate_batch import CHECKOUT, START_SCORE, player_key, visit_outcome_table
+
+# Abbruch, sobald die Restwahrscheinlichkeit "Leg läuft noch" vernachlässigbar ist
+TAIL_EPS = 1e-15
+MAX_VISITS = 5000
+# Zeilen "k 180er" mit kleinerer Masse werden nicht weiter verfolgt
+COUNT_EPS = 1e-18
+# Reste mit kleinerer Masse werden verworfen
+DROP_EPS = 1e-30
+
+_VISITS_CACHE = {}
+_LEG_CACHE = {}
+_OUTCOME_CACHE = {}
+
+
+def transition_matrix(table):
+    """
+    Übergangsmatrix Q[r, r'] der Restscores für eine Aufnahme (ohne Checkout) aus
+    visit_outcome_table sowie Vektor checkout[r] = P(Leg in dieser Aufnahme beendet).
+    Bust, Rest 1 und gescheiterte Checkouts lassen den Score stehen.
+    """
+    size = START_SCORE + 1
+    rem = np.arange(size)[:, None]
+    visit = np.arange(181)[None, :]
+    after = rem - visit
+    target = np.where(after > 1, after, rem)
+
+    q = np.zeros((size, size))
+    np.add.at(q, (np.broadcast_to(rem, target.shape), target), table[:, :181])
+    q[:2] = 0.0   # Rest 0/1 wird nie erreicht
+    checkout = table[:, CHECKOUT].copy()
+    checkout[:2] = 0.0
+    return q, checkout
+
+
+def visits_distribution(player):
+    """
+    Verteilung der Aufnahmen bis zum Checkout ab 501.
+    Gibt (finish, alive, exp180) zurück, jeweils indiziert mit k = 1..K (Index 0 = k=0):
+    finish[k] = P(T = k), alive[k] = P(T > k),
+    exp180[k] = E[180 in Aufnahme k; T >= k].
+    Gecacht je Spielerparameter (nicht verändern).
+    """
+    key = player_key(player)
+    if key in _VISITS_CACHE:
+        return _VISITS_CACHE[key]
+    table = visit_outcome_table(player)
+    q, checkout = transition_matrix(table)
+    p180 = table[:, 180].copy()
+    p180[180] += table[180, CHECKOUT]
+
+    # Reste können nur fallen: nur bis zum höchsten noch besetzten Rest (hi) rechnen
+    pi = np.zeros(START_SCORE + 1)
+    pi[START_SCORE] = 1.0
+    hi = START_SCORE + 1
+    finish, alive, exp180 = [0.0], [1.0], [0.0]
+    for _ in range(MAX_VISITS):
+        exp180.append(float(pi @ p180[:hi]))
+        finish.append(float(pi @ checkout[:hi]))
+        pi = pi @ q[:hi, :hi]
+        alive.append(float(pi.sum()))
+        if alive[-1] < TAIL_EPS:
+            break
+        occupied = np.flatnonzero(pi > DROP_EPS)
+        hi = int(occupied[-1]) + 1 if len(occupied) else 1
+        pi = pi[:hi]
+
+    result = (np.array(finish), np.array(alive), np.array(exp180))
+    if len(_VISITS_CACHE) >= 1024:
+        _VISITS_CACHE.clear()
+    _VISITS_CACHE[key] = result
+    return result
+
+
+def visits_180_distribution(player):
+    """
+    Gemeinsame Verteilung der Aufnahmen bis zum Checkout und der dabei geworfenen 180er.
+    Gibt (finish, alive) zurück, Zeile t = Anzahl Aufnahmen, Spalte k = Anzahl 180er:
+    finish[t, k] = P(T = t, k 180er in den Aufnahmen 1..t),
+    alive[t, k] = P(T > t, k 180er in den Aufnahmen 1..t).
+    """
+    table = visit_outcome_table(player)
+    q, checkout = transition_matrix(table)
+    size = START_SCORE + 1
+
+    # Aufnahmen mit 180 getrennt führen: Rest r -> r - 180 (Bust/Rest 1: bleibt stehen)
+    p180 = table[:, 180].copy()
+    p180[:2] = 0.0
+    rem = np.arange(size)
+    target = np.where(rem - 180 > 1, rem - 180, rem)
+    q_other = q.copy()
+    q_other[rem, target] -= p180
+    checkout_180 = np.zeros(size)
+    checkout_180[180] = checkout[180] if player.max_checkout >= 180 else 0.0
+    checkout_other = checkout - checkout_180
+
+    # pi[k, r] = P(T > t, Rest r, k 180er); Reste können nur fallen, daher werden nur
+    # die Reste bis zum höchsten noch besetzten (hi) mitgerechnet
+    pi = np.zeros((1, size))
+    pi[0, START_SCORE] = 1.0
+    hi = size
+    finish, alive = [np.zeros(1)], [np.ones(1)]
+    for _ in range(MAX_VISITS):
+        if pi[-1].sum() > COUNT_EPS:
+            pi = np.vstack((pi, np.zeros(hi)))
+        done = pi @ checkout_other[:hi]
+        done[1:] += pi[:-1] @ checkout_180[:hi]
+        moved = pi[:-1] * p180[:hi]
+        pi = pi @ q_other[:hi, :hi]
+        pi[1:, :182] += moved[:, :182]
+        if hi > 182:
+            pi[1:, 2:hi - 180] += moved[:, 182:]
+        finish.append(done)
+        alive.append(pi.sum(axis=1))
+        if alive[-1].sum() < TAIL_EPS:
+            break
+        occupied = np.flatnonzero(pi.sum(axis=0) > DROP_EPS)
+        hi = int(occupied[-1]) + 1 if len(occupied) else 1
+        pi = pi[:, :hi]
+
+    width = max(len(row) for row in alive)
+    return (np.array([_pad(row, width, 0.0) for row in finish]),
+            np.array([_pad(row, width, 0.0) for row in alive]))
+
+
+def _pad(a, length, fill):
+    return np.concatenate((a, np.full(length - len(a), fill))) if len(a) < length else a
+
+
+def leg_probabilities(player1, player2):
+    """
+    Exakte Leg-Kennzahlen, gecacht je Spielerparameter:
+    p1_on_throw = P(P1 gewinnt das Leg | P1 beginnt),
+    p1_against_throw = P(P1 gewinnt das Leg | P2 beginnt),
+    exp180_on_throw / exp180_against_throw = erwartete 180s (P1, P2) im Leg.
+    """
+    key = (player_key(player1), player_key(player2))
+    if key in _LEG_CACHE:
+        return _LEG_CACHE[key]
+
+    f1, a1, h1 = visits_distribution(player1)
+    f2, a2, h2 = visits_distribution(player2)
+    length = max(len(f1), len(f2)) + 1
+    f1, h1, f2, h2 = (_pad(x, length, 0.0) for x in (f1, h1, f2, h2))
+    a1, a2 = _pad(a1, length, a1[-1]), _pad(a2, length, a2[-1])
+
+    # a[k] = P(T > k); P(T >= k) = a[k - 1]
+    ge1 = np.concatenate(([1.0], a1[:-1]))
+    ge2 = np.concatenate(([1.0], a2[:-1]))
+
+    # P1 beginnt: Aufnahme k von P1 folgt auf k-1 Aufnahmen von P2
+    p1_on_throw = float((f1 * ge2).sum())
+    exp180_on_throw = (float((h1 * ge2).sum()), float((h2 * a1).sum()))
+    # P2 beginnt: Aufnahme k von P1 folgt auf k Aufnahmen von P2
+    p1_against_throw = float((f1 * a2).sum())
+    exp180_against_throw = (float((h1 * a2).sum()), float((h2 * ge1).sum()))
+
+    result = {
+        "p1_on_throw": p1_on_throw,
+        "p1_against_throw": p1_against_throw,
+        "exp180_on_throw": exp180_on_throw,
+        "exp180_against_throw": exp180_against_throw,
+    }
+    if len(_LEG_CACHE) >= 256:
+        _LEG_CACHE.clear()
+    _LEG_CACHE[key] = result
+    return result
+
+
+def leg_outcome_tables(player1, player2):
+    """
+    Exakte gemeinsame Verteilung eines Legs: (Sieger, 180er P1, 180er P2), gecacht je
+    Spielerparameter. Gibt (on_throw, against_throw) zurück — P1 bzw. P2 beginnt —,
+    jeweils ein Array [sieger, k1, k2] mit sieger 0 = P1, 1 = P2.
+    """
+    key = (player_key(player1), player_key(player2))
+    if key in _OUTCOME_CACHE:
+        return _OUTCOME_CACHE[key]
+
+    f1, a1 = visits_180_distribution(player1)
+    f2, a2 = visits_180_distribution(player2)
+    length = max(len(f1), len(f2))
+    # nach dem Ende der Kette ist die Restmasse vernachlässigbar (< TAIL_EPS)
+    f1, a1 = (np.vstack((x, np.zeros((length - len(x), x.shape[1])))) for x in (f1, a1))
+    f2, a2 = (np.vstack((x, np.zeros((length - len(x), x.shape[1])))) for x in (f2, a2))
+
+    # P1 beginnt: P1 checkt in Aufnahme t nach t-1 Aufnahmen von P2,
+    # P2 checkt in Aufnahme t nach t Aufnahmen von P1
+    on_throw = np.stack((f1[1:].T @ a2[:-1], a1[1:].T @ f2[1:]))
+    # P2 beginnt: umgekehrt
+    against_throw = np.stack((f1[1:].T @ a2[1:], a1[:-1].T @ f2[1:]))
+
+    if len(_OUTCOME_CACHE) >= 64:
+        _OUTCOME_CACHE.clear()
+    _OUTCOME_CACHE[key] = (on_throw, against_throw)
+    return on_throw, against_throw
+
+
+def _first_to(target, p_on, p_against, p1_starts=True):
+    """
+    "First to target" über Einheiten (Legs eines Sets oder Sets eines Matches),
+    deren Starter jedes Mal wechselt; die erste Einheit beginnt P1 (p1_starts) bzw. P2.
+    p_on = P(P1 gewinnt die Einheit | P1 beginnt sie), p_against = ... | P2 beginnt sie;
+    Zahlen oder gleich geformte Arrays (dann für alle Paarungen auf einmal).
+    Gibt (P(P1 gewinnt), Endstände {(a, b): Wahrscheinlichkeit},
+    (erwartete Einheiten mit Starter P1, erwartete Einheiten mit Starter P2)) zurück.
+    """
+    p_on, p_against = np.asarray(p_on, dtype=float), np.asarray(p_against, dtype=float)
+    reach = np.zeros((target + 1, target + 1) + p_on.shape)
+    reach[0, 0] = 1.0
+    starts = [0.0, 0.0]
+
+    for total in range(2 * target - 1):
+        p1_first = (total % 2 == 0) == p1_starts
+        p_unit = p_on if p1_first else p_against
+        for i in range(max(0, total - target + 1), min(total, target - 1) + 1):
+            j = total - i
+            p = reach[i, j]
+            starts[0 if p1_first else 1] = starts[0 if p1_first else 1] + p
+            reach[i + 1, j] += p * p_unit
+            reach[i, j + 1] += p * (1.0 - p_unit)
+
+    scores = {}
+    for k in range(target):
+        scores[(target, k)] = reach[target, k]
+        scores[(k, target)] = reach[k, target]
+    return reach[target, :target].sum(axis=0), scores, (starts[0], starts[1])
+
+
+def win_probability_matrix(players, legs_to_win, sets_to_win=None, distributions=None, rows=None,
+                           p1_starts=True):
+    """
+    P(Spieler i gewinnt gegen Spieler j | i beginnt das Match) für alle Paarungen auf einmal:
+    die Leg-Wahrscheinlichkeiten aller Paare sind ein Matrixprodukt der Aufnahme-Verteilungen
+    (visits_distribution), die Match-DP läuft auf den ganzen Matrizen.
+    distributions: bereits berechnete visits_distribution je Spieler (z. B. aus einem Prozess-Pool).
+    rows: nur diese Zeilen i berechnen; p1_starts=False: j beginnt das Match.
+    Gibt ein (len(rows), n)-Array zurück; Einträge i == j sind bedeutungslos.
+    """
+    if distributions is None:
+        distributions = [visits_distribution(p) for p in players]
+    length = max(len(finish) for finish, _, _ in distributions) + 1
+    finish = np.array([_pad(f, length, 0.0) for f, _, _ in distributions])
+    alive = np.array([_pad(a, length, a[-1]) for _, a, _ in distributions])
+    ge = np.hstack((np.ones((len(distributions), 1)), alive[:, :-1]))
+    if rows is not None:
+        finish = finish[np.asarray(rows, dtype=int)]
+
+    # wie leg_probabilities, nur für alle Paare: on[i, j] = P(i gewinnt das Leg | i beginnt)
+    on = finish @ ge.T
+    against = finish @ alive.T
+    if sets_to_win is None:
+        return _first_to(legs_to_win, on, against, p1_starts)[0]
+    set_on = _first_to(legs_to_win, on, against, True)[0]
+    set_against = _first_to(legs_to_win, on, against, False)[0]
+    return _first_to(sets_to_win, set_on, set_against, p1_starts)[0]
+
+
+def match_probabilities(player1, player2, legs_to_win, sets_to_win=None):
+    """
+    Exakte Match-Verteilung im Format von MatchSimulator: First to legs_to_win Legs
+    (Starter wechselt jedes Leg, P1 beginnt) bzw. mit sets_to_win First to sets_to_win Sets
+    zu je First to legs_to_win Legs (Set-Starter wechselt, im Set wechseln die Legs).
+    Gibt dict mit wins (Wahrscheinlichkeit je Name), scorelines ("a:b" -> Wahrscheinlichkeit,
+    bei Sets der Satzstand), expected_180s (je Name), expected_legs, expected_sets und
+    set_scorelines (Legstand eines Sets -> erwartete Anzahl solcher Sets) zurück.
+    """
+    leg = leg_probabilities(player1, player2)
+    # je Leg: erwartete 180er P1, 180er P2 und ein gespieltes Leg
+    leg_on = np.array([*leg["exp180_on_throw"], 1.0])
+    leg_against = np.array([*leg["exp180_against_throw"], 1.0])
+    set_scorelines = Counter()
+
+    if sets_to_win is None:
+        p1_win, scores, starts = _first_to(legs_to_win, leg["p1_on_throw"], leg["p1_against_throw"])
+        expected = starts[0] * leg_on + starts[1] * leg_against
+        expected_sets = 0.0
+    else:
+        sets = []
+        for p1_starts in (True, False):
+            p_set, set_scores, leg_starts = _first_to(
+                legs_to_win, leg["p1_on_throw"], leg["p1_against_throw"], p1_starts)
+            sets.append((p_set, set_scores, leg_starts[0] * leg_on + leg_starts[1] * leg_against))
+        p1_win, scores, starts = _first_to(sets_to_win, sets[0][0], sets[1][0])
+        expected = starts[0] * sets[0][2] + starts[1] * sets[1][2]
+        expected_sets = float(starts[0] + starts[1])
+        for weight, (_, set_scores, _) in zip(starts, sets):
+            for (a, b), p in set_scores.items():
+                set_scorelines[f"{a}:{b}"] += float(weight * p)
+
+    p1_win = float(p1_win)
+    return {
+        "players": (player1.name, player2.name),
+        "wins": {player1.name: p1_win, player2.name: 1.0 - p1_win},
+        "scorelines": Counter({f"{a}:{b}": float(p) for (a, b), p in scores.items()}),
+        "expected_180s": {player1.name: float(expected[0]), player2.name: float(expected[1])},
+        "expected_legs": float(expected[2]),
+        "expected_sets": float(expected_sets),
+        "set_scorelines": set_scorelines,
+    }
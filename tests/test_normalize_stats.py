@@ -0,0 +1,75 @@
+# tests/test_normalize_stats.py
+# Die vektorisierten Umwandlungen (parse_numbers, clean_numbers) müssen auf den mitgelieferten
+# CSVs Spalte für Spalte exakt dasselbe liefern wie die skalaren Referenzen.
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculate_form import clean_number
+from normalize_stats import TEXT_COLUMNS, clean_numbers, parse_number, parse_numbers
+
+ROOT = Path(__file__).resolve().parent.parent
+STATS_CSV = ROOT / "all_players_stats.csv"
+FORM_CSV = ROOT / "all_players_with_form.csv"
+
+
+def assert_same(actual, expected):
+    a = np.asarray(actual, dtype=float)
+    b = np.asarray(expected, dtype=float)
+    mismatch = ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    assert not mismatch.any(), f"{mismatch.sum()} Abweichungen, z. B. {a[mismatch][:3]} statt {b[mismatch][:3]}"
+
+
+def columns(path, dtype, skip=()):
+    """Jede Spalte der CSV als eigener Testfall (roh als Text bzw. mit pandas-Typerkennung)."""
+    if not path.exists():
+        return []
+    df = pd.read_csv(path, sep=";", dtype=dtype)
+    return [pytest.param(df[col], id=f"{path.name}:{col}") for col in df.columns if col not in skip]
+
+
+@pytest.mark.parametrize("series", columns(STATS_CSV, str) + columns(FORM_CSV, str))
+def test_parse_numbers_matches_parse_number_on_raw_text(series):
+    assert_same(parse_numbers(series), series.map(parse_number).astype(float))
+
+
+@pytest.mark.parametrize("series", columns(STATS_CSV, None) + columns(FORM_CSV, None))
+def test_parse_numbers_matches_parse_number_on_typed_columns(series):
+    assert_same(parse_numbers(series), series.map(parse_number).astype(float))
+
+
+@pytest.mark.parametrize("series", columns(STATS_CSV, str, TEXT_COLUMNS))
+def test_clean_numbers_matches_clean_number(series):
+    expected = pd.to_numeric(series.apply(clean_number), errors="coerce")
+    assert_same(clean_numbers(series), expected)
+
+
+EDGE_CASES = ["1.234,5", "1,234.5", "42%", "41.96%", "1,054", "", "  ", "n/a", None, np.nan, "-3,5", "170"]
+
+
+@pytest.mark.parametrize("value", EDGE_CASES, ids=repr)
+def test_parse_numbers_edge_cases(value):
+    expected = parse_number(value)
+    assert_same(parse_numbers(pd.Series([value], dtype=object)), [np.nan if expected is None else expected])
+
+
+@pytest.mark.parametrize("value", EDGE_CASES, ids=repr)
+def test_clean_numbers_edge_cases(value):
+    series = pd.Series([value], dtype=object)
+    assert_same(clean_numbers(series), pd.to_numeric(series.apply(clean_number), errors="coerce"))
+
+
+def test_parse_number_locales():
+    assert parse_number("1.234,5") == 1234.5
+    assert parse_number("1,234.5") == 1234.5
+    assert parse_number("42%") == 42.0
+    assert parse_number("") is None
+    assert parse_number(np.nan) is None
+    assert parse_number("n/a", default=0.0) == 0.0
+
+
+def test_parse_numbers_default():
+    values = parse_numbers(pd.Series(["12,5", None, "x"]), default=0)
+    assert values.tolist() == [12.5, 0.0, 0.0]